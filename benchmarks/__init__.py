@@ -0,0 +1,3 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+"""``asv`` benchmarks for the ``ipyelk`` python diagram pipeline."""
@@ -0,0 +1,23 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import convert_elkjson, serialize_element, trusted
+
+from .generators import flat_graph
+
+
+class Construction:
+    """Element creation from elk json with and without validation"""
+
+    params = [1_000, 10_000]
+    param_names = ["nodes"]
+    timeout = 300
+
+    def setup(self, size):
+        self.data = serialize_element(flat_graph(size), exclude_none=True)
+
+    def time_validated(self, size):
+        convert_elkjson(self.data)
+
+    def time_trusted(self, size):
+        with trusted:
+            convert_elkjson(self.data)
@@ -0,0 +1,148 @@
+"""Synthetic element hierarchies for benchmarks"""
+
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import random
+from typing import Callable, Dict, Tuple
+
+import networkx as nx
+
+from ipyelk.elements import Edge, Label, Node, Port, iter_elements
+
+
+def deep_tree(size: int, depth: int = 10) -> Node:
+    """Complete tree of `size` nodes, with the smallest branching factor that
+    fits in `depth` levels.
+    """
+    branching = 2
+    while (branching**depth - 1) // (branching - 1) < size:
+        branching += 1
+    nodes = [Node(id="0")]
+    for i in range(1, size):
+        nodes.append(nodes[(i - 1) // branching].add_child(Node(id=str(i))))
+    return nodes[0]
+
+
+def flat_graph(size: int) -> Node:
+    """`size` labeled nodes with a port each, chained together by edges"""
+    root = Node(id="root")
+    previous = None
+    for i in range(size):
+        node = root.add_child(
+            Node(id=f"n{i}", labels=[Label(id=f"n{i}_label", text=f"n{i}")])
+        )
+        port = node.add_port(Port(id=f"n{i}_port"))
+        if previous is not None:
+            root.add_edge(source=port, target=previous)
+        previous = node
+    return root
+
+
+def wide_tree(size: int) -> Node:
+    """Two level tree of `size` nodes with about `sqrt(size)` children per node,
+    and an edge from every leaf to the next one
+    """
+    branching = max(int(size**0.5), 1)
+    root = Node(id="root")
+    group = None
+    previous = None
+    for i in range(1, size):
+        if group is None or len(group.children) >= branching:
+            group = root.add_child(Node(id=f"g{i}"))
+            continue
+        leaf = group.add_child(Node(id=f"l{i}"))
+        if previous is not None:
+            owner = group if previous.get_parent() is group else root
+            owner.add_edge(source=previous, target=leaf)
+        previous = leaf
+    return root
+
+
+def port_graph(size: int, ports: int = 4) -> Node:
+    """`size` nodes with `ports` ports each, every port connected to the same
+    port of the next node
+    """
+    root = Node(id="root")
+    previous = None
+    for i in range(size):
+        node = root.add_child(Node(id=f"n{i}"))
+        for j in range(ports):
+            port = node.add_port(Port(id=f"n{i}_p{j}"))
+            if previous is not None:
+                root.add_edge(source=previous.ports[j], target=port)
+        previous = node
+    return root
+
+
+def label_graph(size: int, labels: int = 4) -> Node:
+    """`size` nodes with `labels` labels each, chained together by labeled
+    edges
+    """
+    root = Node(id="root")
+    previous = None
+    for i in range(size):
+        texts = [f"n{i} {j}" for j in range(labels)]
+        node = root.add_child(
+            Node(
+                id=f"n{i}",
+                labels=[Label(id=f"n{i}_l{j}", text=t) for j, t in enumerate(texts)],
+            )
+        )
+        if previous is not None:
+            root.edges.append(
+                Edge(
+                    id=f"e{i}",
+                    source=previous,
+                    target=node,
+                    labels=[Label(id=f"e{i}_l", text=f"e{i}")],
+                )
+            )
+        previous = node
+    return root
+
+
+# generators of the shapes of diagrams with the number of elements per node
+SHAPES: Dict[str, Tuple[Callable[[int], Node], int]] = {
+    "flat": (flat_graph, 4),
+    "deep": (deep_tree, 1),
+    "wide": (wide_tree, 2),
+    "ports": (port_graph, 9),
+    "labels": (label_graph, 7),
+}
+
+
+def shaped(shape: str, elements: int) -> Node:
+    """Diagram of the shape with about `elements` elements"""
+    generator, per_node = SHAPES[shape]
+    return generator(max(elements // per_node, 2))
+
+
+def hide(root: Node, every: int = 10) -> Node:
+    """Hide every `every`-th node below the root"""
+    nodes = [el for el in iter_elements(root) if isinstance(el, Node)]
+    for node in nodes[1::every]:
+        node.properties.hidden = True
+    return root
+
+
+# share of the `nx_graph` edges that start from a named port
+PORT_EDGES = 0.1
+
+
+def nx_graph(edges: int, seed: int = 0):
+    """Random `MultiDiGraph` with `edges` edges between half as many nodes, a
+    tenth of them from named ports, and a random tree of the nodes as its
+    hierarchy
+    """
+    rng = random.Random(seed)  # noqa: S311 seeded for repeatable benchmarks
+    size = max(edges // 2, 2)
+    graph = nx.MultiDiGraph()
+    graph.add_nodes_from(range(size))
+    for _ in range(edges):
+        port = rng.random() < PORT_EDGES
+        data = {"sourcePort": f"p{rng.randrange(4)}"} if port else {}
+        graph.add_edge(rng.randrange(size), rng.randrange(size), **data)
+    hierarchy = nx.DiGraph()
+    for i in range(1, size):
+        hierarchy.add_edge(rng.randrange(i), i)
+    return graph, hierarchy
@@ -0,0 +1,44 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import ElementIndex, Registry, VisIndex
+
+from .generators import SHAPES, hide, shaped
+from .memory import peak_bytes
+
+
+class Indexing:
+    """Element and visibility indices of diagrams of different shapes, with
+    every tenth node hidden
+    """
+
+    params = [list(SHAPES), [1_000, 10_000, 100_000]]
+    param_names = ["shape", "elements"]
+    timeout = 600
+
+    def setup(self, shape, size):
+        self.context = Registry()
+        self.root = hide(shaped(shape, size))
+        with self.context:
+            self.index = ElementIndex.from_els(self.root)
+
+    def time_element_index(self, shape, size):
+        with self.context:
+            ElementIndex.from_els(self.root)
+
+    def time_live_element_index(self, shape, size):
+        with self.context:
+            ElementIndex.from_els(self.root, live=True)
+
+    def time_check_edges(self, shape, size):
+        with self.context:
+            self.index.check_edges()
+
+    def time_vis_index(self, shape, size):
+        with self.context:
+            VisIndex.from_els(self.root)
+
+    def track_element_index_peak(self, shape, size):
+        with self.context:
+            return peak_bytes(ElementIndex.from_els, self.root)
+
+    track_element_index_peak.unit = "bytes"
@@ -0,0 +1,26 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import Registry, serialize_element
+from ipyelk.pipes.sugiyama import layered_layout
+
+from .generators import deep_tree, flat_graph
+
+GENERATORS = {"flat": flat_graph, "deep": deep_tree}
+
+
+class LayeredLayout:
+    """Python layered layout of elk json"""
+
+    params = [list(GENERATORS), [1_000, 20_000]]
+    param_names = ["graph", "nodes"]
+    timeout = 300
+    # the layout updates the elk json in place
+    number = 1
+    repeat = 3
+
+    def setup(self, graph, size):
+        with Registry():
+            self.data = serialize_element(GENERATORS[graph](size))
+
+    def time_layered_layout(self, graph, size):
+        layered_layout(self.data)
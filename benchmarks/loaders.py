@@ -0,0 +1,34 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.loaders import NXLoader
+
+from .generators import nx_graph
+from .memory import peak_bytes
+
+MODES = {
+    "default": {},
+    "bulk": {"bulk": True},
+    "bulk_trusted": {"bulk": True, "trusted": True},
+}
+
+
+class NXLoading:
+    """Loading random networkx graphs with a hierarchy"""
+
+    params = [list(MODES), [1_000, 10_000, 100_000]]
+    param_names = ["mode", "edges"]
+    timeout = 600
+    number = 1
+    repeat = 3
+
+    def setup(self, mode, size):
+        self.graph, self.hierarchy = nx_graph(size)
+        self.loader = NXLoader(**MODES[mode])
+
+    def time_load(self, mode, size):
+        self.loader.load(self.graph, self.hierarchy)
+
+    def track_load_peak(self, mode, size):
+        return peak_bytes(self.loader.load, self.graph, self.hierarchy)
+
+    track_load_peak.unit = "bytes"
@@ -0,0 +1,27 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import MarkFactory
+
+from .generators import SHAPES, shaped
+from .memory import peak_bytes
+
+
+class Marks:
+    """networkx graphs of marks of the elements of diagrams"""
+
+    params = [list(SHAPES), [1_000, 10_000, 100_000]]
+    param_names = ["shape", "elements"]
+    timeout = 900
+    number = 1
+    repeat = 3
+
+    def setup(self, shape, size):
+        self.root = shaped(shape, size)
+
+    def time_mark_factory(self, shape, size):
+        MarkFactory()(self.root)
+
+    def track_mark_factory_peak(self, shape, size):
+        return peak_bytes(MarkFactory(), self.root)
+
+    track_mark_factory_peak.unit = "bytes"
@@ -0,0 +1,20 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import gc
+import tracemalloc
+from typing import Callable
+
+
+def peak_bytes(func: Callable, *args, **kwargs) -> int:
+    """Peak of the memory allocated by python while calling the function,
+    including what the result still holds
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
@@ -0,0 +1,87 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import Registry, convert_elkjson, serialize_element
+from ipyelk.pipes.patch import flatten
+from ipyelk.schema import ElkCompiledValidator, ElkSchemaValidator
+
+from .generators import SHAPES, flat_graph, shaped
+from .memory import peak_bytes
+
+
+class Serialization:
+    """Elk json serialization of flat graphs"""
+
+    params = [1_000, 10_000]
+    param_names = ["nodes"]
+    timeout = 300
+
+    def setup(self, size):
+        self.root = flat_graph(size)
+
+    def time_pydantic_dict(self, size):
+        self.root.dict(exclude_none=True)
+
+    def time_serialize_element(self, size):
+        serialize_element(self.root, exclude_none=True)
+
+
+class ShapedSerialization:
+    """Elk json round trips of diagrams of different shapes"""
+
+    params = [list(SHAPES), [1_000, 10_000, 100_000]]
+    param_names = ["shape", "elements"]
+    timeout = 600
+
+    def setup(self, shape, size):
+        self.root = shaped(shape, size)
+        with Registry():
+            self.data = serialize_element(self.root, exclude_none=True)
+
+    def time_node_dict(self, shape, size):
+        with Registry():
+            self.root.dict(exclude_none=True)
+
+    def time_serialize_element(self, shape, size):
+        with Registry():
+            serialize_element(self.root, exclude_none=True)
+
+    def time_convert_elkjson(self, shape, size):
+        convert_elkjson(self.data)
+
+    def track_convert_elkjson_peak(self, shape, size):
+        return peak_bytes(convert_elkjson, self.data)
+
+    track_convert_elkjson_peak.unit = "bytes"
+
+    def track_node_dict_peak(self, shape, size):
+        with Registry():
+            return peak_bytes(self.root.dict, exclude_none=True)
+
+    track_node_dict_peak.unit = "bytes"
+
+
+class SchemaValidation:
+    """Elk json schema checks of flat graphs, in full and of a patch"""
+
+    params = [1_000, 10_000]
+    param_names = ["nodes"]
+    timeout = 300
+
+    def setup(self, size):
+        root = flat_graph(size)
+        with Registry():
+            self.data = serialize_element(root, exclude_none=True)
+        self.flat = flatten(self.data)
+        self.types = {self.data["id"]: ElkCompiledValidator.root}
+        list(ElkCompiledValidator.iter_flat_errors(self.flat, self.flat, self.types))
+        key = self.data["children"][0]["id"]
+        self.ops = [{"op": "update", "id": key, "set": {"x": 1.0}, "unset": []}]
+
+    def time_jsonschema(self, size):
+        list(ElkSchemaValidator.iter_errors(self.data))
+
+    def time_compiled(self, size):
+        list(ElkCompiledValidator.iter_errors(self.data))
+
+    def time_compiled_patch(self, size):
+        list(ElkCompiledValidator.iter_patch_errors(self.flat, self.ops, self.types))
@@ -0,0 +1,35 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from collections import deque
+from time import perf_counter
+
+from ipyelk.elements import iter_elements, iter_hierarchy, iter_visible
+
+from .generators import deep_tree
+
+
+class Traversal:
+    """Traversal of 10 level deep trees"""
+
+    params = [1_000, 10_000, 100_000]
+    param_names = ["elements"]
+    timeout = 300
+
+    def setup(self, size):
+        self.root = deep_tree(size, depth=10)
+
+    def time_iter_elements(self, size):
+        deque(iter_elements(self.root), maxlen=0)
+
+    def time_iter_hierarchy(self, size):
+        deque(iter_hierarchy(self.root), maxlen=0)
+
+    def time_iter_visible(self, size):
+        deque(iter_visible(self.root), maxlen=0)
+
+    def track_iter_elements_throughput(self, size):
+        start = perf_counter()
+        deque(iter_elements(self.root), maxlen=0)
+        return size / (perf_counter() - start)
+
+    track_iter_elements_throughput.unit = "elements/s"
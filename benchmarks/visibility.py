@@ -0,0 +1,41 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+
+from ipyelk.elements import Node, iter_elements
+from ipyelk.pipes import MarkElementWidget, VisibilityPipe
+from ipyelk.pipes import flows as F
+
+from .generators import SHAPES, hide, shaped
+
+
+class Visibility:
+    """Projection of diagrams with every tenth node hidden, in full and after
+    toggling a node
+    """
+
+    params = [list(SHAPES), [1_000, 10_000, 100_000]]
+    param_names = ["shape", "elements"]
+    timeout = 600
+
+    def setup(self, shape, size):
+        root = hide(shaped(shape, size))
+        self.pipe = VisibilityPipe()
+        self.pipe.inlet = MarkElementWidget(value=root, flow=(F.Layout,))
+        self.pipe.inlet.build_index()
+        self.pipe.outlet.index = self.pipe.inlet.index
+        self.node = [el for el in iter_elements(root) if isinstance(el, Node)][-1]
+        asyncio.run(self.pipe.run())
+
+    def time_full(self, shape, size):
+        self.pipe.inlet.flow = (F.Layout,)
+        asyncio.run(self.pipe.run())
+
+    def time_toggle(self, shape, size):
+        self.node.properties.hidden = not self.node.properties.hidden
+        self.pipe.inlet.flow = (F.Node.hidden,)
+        asyncio.run(self.pipe.run())
+
+    def peakmem_full(self, shape, size):
+        self.pipe.inlet.flow = (F.Layout,)
+        asyncio.run(self.pipe.run())
@@ -10,12 +10,22 @@ import { Signal } from '@lumino/signaling';
 import { unpack_models as deserialize } from '@jupyter-widgets/base';
 import { DOMWidgetModel } from '@jupyter-widgets/base';
 
+import { ELKMarkElementModel } from './mark_widget';
 import { ElkNode } from './sprotty/json/elkgraph-json';
-import { ELK_DEBUG, IRunMessage, NAME, VERSION } from './tokens';
+import {
+  ELK_DEBUG,
+  IBatchResultMessage,
+  ILayoutColumnsMessage,
+  IRunBatchMessage,
+  IRunMessage,
+  NAME,
+  VERSION,
+} from './tokens';
 
 import Worker from '!!worker-loader!elkjs/lib/elk-worker.js';
 
 export { ELKTextSizerModel, ELKTextSizerView } from './measure_text';
+export { ELKMarkElementModel } from './mark_widget';
 
 const TheElk = new ELK.default({
   workerFactory: () => {
@@ -76,6 +86,63 @@ function applyProperties(node: ElkNode, props: Map<string, any>) {
   return node;
 }
 
+const SHAPE_KEYS = ['x', 'y', 'width', 'height'];
+const POINT_KEYS = ['startPoint', 'bendPoints', 'endPoint'];
+
+/**
+ * Pack the geometry of a laid out graph into float64 buffers, see
+ * `ipyelk.pipes.columns`
+ */
+function packLayout(root: any) {
+  const shapes: string[] = [];
+  const edges: string[] = [];
+  const sections: any[][] = [];
+  const geometry: number[] = [];
+  const counts: number[] = [];
+  const points: number[] = [];
+  const stack = [root];
+  while (stack.length) {
+    const el = stack.pop();
+    if (el.sources != null) {
+      edges.push(el.id);
+      const fields = [];
+      for (const section of el.sections || []) {
+        const rest = { ...section };
+        for (const key of POINT_KEYS) {
+          delete rest[key];
+        }
+        fields.push(rest);
+        const sectionPoints = [
+          section.startPoint,
+          ...(section.bendPoints || []),
+          section.endPoint,
+        ];
+        counts.push(sectionPoints.length);
+        for (const point of sectionPoints) {
+          points.push(point.x, point.y);
+        }
+      }
+      sections.push(fields);
+    } else {
+      shapes.push(el.id);
+      for (const key of SHAPE_KEYS) {
+        geometry.push(el[key] == null ? NaN : el[key]);
+      }
+    }
+    for (const key of ['children', 'ports', 'labels', 'edges']) {
+      if (el[key]) {
+        stack.push(...el[key]);
+      }
+    }
+  }
+  const buffers = [
+    new Float64Array(geometry).buffer,
+    new Uint32Array(counts).buffer,
+    new Float64Array(points).buffer,
+  ];
+  return { shapes, edges, sections, buffers };
+}
+
 export class ELKLayoutModel extends DOMWidgetModel {
   static model_name = 'ELKLayoutModel';
   static serializers = {
@@ -96,6 +163,7 @@ export class ELKLayoutModel extends DOMWidgetModel {
       _model_module_version: VERSION,
       inlet: null,
       outlet: null,
+      binary: false,
     };
     return defaults;
   }
@@ -113,15 +181,47 @@ export class ELKLayoutModel extends DOMWidgetModel {
     }
   }
 
-  handleMessage(content: IRunMessage) {
+  handleMessage(content: IRunMessage | IRunBatchMessage) {
     // check message and decide if should call `measure`
     switch (content.action) {
       case 'run':
         this.layout();
         break;
+      case 'run_batch':
+        void this.layoutBatch(content);
+        break;
     }
   }
 
+  /**
+   * Lay out several independent graphs concurrently and answer with a single
+   * message, in the order the graphs were sent.
+   */
+  async layoutBatch(content: IRunBatchMessage) {
+    this.ensureElk();
+    const errors: (string | null)[] = [];
+    const results = await Promise.all(
+      content.graphs.map(async (graph, i) => {
+        errors[i] = null;
+        let propmap = collectProperties(graph);
+        try {
+          return applyProperties(await this._elk.layout(graph), propmap);
+        } catch (error) {
+          console.error(error);
+          errors[i] = `${error}`;
+          return null;
+        }
+      }),
+    );
+    const reply: IBatchResultMessage = {
+      action: 'batch_result',
+      batch: content.batch,
+      results,
+      errors,
+    };
+    this.send(reply, {});
+  }
+
   async layout() {
     // There looks like a bug with how elkjs failing to process edge properties
     // if they are anything more than simple strings. Elkjs doesnt need to operate
@@ -137,17 +237,56 @@ export class ELKLayoutModel extends DOMWidgetModel {
     // strip properties out
     this.ensureElk();
     let result;
+    let error: string | null = null;
     try {
       result = await this._elk.layout(rootNode);
       // reapply properties
       applyProperties(result, propmap);
-    } catch (error) {
+    } catch (err) {
       result = {};
-      console.error(error);
+      error = `${err}`;
+      console.error(err);
+    }
+
+    if (this.get('binary')) {
+      this.sendColumns(outlet, result, error);
+      return result;
     }
 
-    outlet.set('value', { ...result });
-    outlet.save_changes();
+    if (outlet instanceof ELKMarkElementModel) {
+      // only send the changed elements back
+      outlet.patchValue({ ...result });
+    } else {
+      outlet.set('value', { ...result });
+      outlet.save_changes();
+    }
     return result;
   }
+
+  /**
+   * Show the result and send only its geometry back to the kernel
+   */
+  sendColumns(outlet: DOMWidgetModel, result: any, error: string | null) {
+    const revision = (outlet.get('revision') || 0) + 1;
+    let packed: ReturnType<typeof packLayout> = {
+      shapes: [],
+      edges: [],
+      sections: [],
+      buffers: [],
+    };
+    if (error == null) {
+      outlet.set({ value: { ...result }, revision });
+      packed = packLayout(result);
+    }
+    const { buffers, ...columns } = packed;
+    const message: ILayoutColumnsMessage = {
+      action: 'layout_columns',
+      revision,
+      ...columns,
+    };
+    if (error != null) {
+      message.error = error;
+    }
+    this.send(message, {}, buffers);
+  }
 }
@@ -0,0 +1,174 @@
+/**
+ * Copyright (c) 2024 ipyelk contributors.
+ * Distributed under the terms of the Modified BSD License.
+ */
+import { DOMWidgetModel } from '@jupyter-widgets/base';
+
+import { IPatchMessage, IPatchOperation, IResyncMessage, VERSION } from './tokens';
+
+const NESTED = ['children', 'ports', 'labels', 'edges'];
+
+/** largest share of changed elements that is sent as a patch */
+const MAX_PATCH_RATIO = 0.5;
+
+type TFlat = Map<string, any>;
+
+/**
+ * Index the elements by id, with nested elements replaced by their ids
+ */
+export function flatten(root: any): TFlat | null {
+  if (root == null || root.id == null) {
+    return null;
+  }
+  const flat: TFlat = new Map();
+  const stack = [root];
+  while (stack.length) {
+    const el = stack.pop();
+    if (el.id == null || flat.has(el.id)) {
+      return null;
+    }
+    const entry = { ...el };
+    for (const key of NESTED) {
+      if (el[key] != null) {
+        entry[key] = el[key].map((child: any) => child.id);
+        stack.push(...el[key]);
+      }
+    }
+    flat.set(el.id, entry);
+  }
+  return flat;
+}
+
+export function unflatten(flat: TFlat, root: string): any {
+  const data = { ...flat.get(root) };
+  const stack = [data];
+  while (stack.length) {
+    const el = stack.pop();
+    for (const key of NESTED) {
+      if (el[key] != null) {
+        el[key] = el[key].map((id: string) => ({ ...flat.get(id) }));
+        stack.push(...el[key]);
+      }
+    }
+  }
+  return data;
+}
+
+function isEqual(a: any, b: any): boolean {
+  return a === b || JSON.stringify(a) === JSON.stringify(b);
+}
+
+export function diff(old: TFlat, current: TFlat): IPatchOperation[] {
+  const ops: IPatchOperation[] = [];
+  for (const id of old.keys()) {
+    if (!current.has(id)) {
+      ops.push({ op: 'remove', id });
+    }
+  }
+  for (const [id, entry] of current.entries()) {
+    const previous = old.get(id);
+    if (previous == null) {
+      ops.push({ op: 'add', id, value: entry });
+      continue;
+    }
+    const set = {};
+    let changed = false;
+    for (const key of Object.keys(entry)) {
+      if (!(key in previous) || !isEqual(previous[key], entry[key])) {
+        set[key] = entry[key];
+        changed = true;
+      }
+    }
+    const unset = Object.keys(previous).filter((key) => !(key in entry));
+    if (changed || unset.length) {
+      ops.push({ op: 'update', id, set, unset });
+    }
+  }
+  return ops;
+}
+
+export function applyPatch(flat: TFlat, ops: IPatchOperation[]): TFlat {
+  for (const op of ops) {
+    switch (op.op) {
+      case 'remove':
+        flat.delete(op.id);
+        break;
+      case 'add':
+        flat.set(op.id, { ...op.value });
+        break;
+      case 'update': {
+        const entry = { ...flat.get(op.id), ...(op.set || {}) };
+        for (const key of op.unset || []) {
+          delete entry[key];
+        }
+        flat.set(op.id, entry);
+        break;
+      }
+    }
+  }
+  return flat;
+}
+
+/**
+ * Synced elements of a diagram, which are updated with patches of the changed
+ * elements while both sides agree on the `revision` of the `value`.
+ */
+export class ELKMarkElementModel extends DOMWidgetModel {
+  static model_name = 'ELKMarkElementModel';
+
+  defaults() {
+    let defaults = {
+      ...super.defaults(),
+      _model_name: ELKMarkElementModel.model_name,
+      _model_module_version: VERSION,
+      value: null,
+      revision: 0,
+      flow: [],
+    };
+    return defaults;
+  }
+
+  initialize(attributes: any, options: any) {
+    super.initialize(attributes, options);
+    this.on('msg:custom', this.handleMessage, this);
+  }
+
+  handleMessage(content: IPatchMessage) {
+    if (content.action !== 'patch') {
+      return;
+    }
+    const flat = flatten(this.get('value'));
+    if (flat == null || content.base !== this.get('revision')) {
+      const resync: IResyncMessage = { action: 'resync' };
+      this.send(resync, {});
+      return;
+    }
+    const value = unflatten(applyPatch(flat, content.ops), content.root);
+    this.set({ value, revision: content.revision });
+  }
+
+  /**
+   * Update the value and send only the changed elements to the kernel
+   */
+  patchValue(value: any) {
+    const old = flatten(this.get('value'));
+    const current = flatten(value);
+    const base: number = this.get('revision');
+    const revision = base + 1;
+    const ops = old && current && old.has(value.id) ? diff(old, current) : null;
+    if (ops == null || ops.length > MAX_PATCH_RATIO * current.size) {
+      this.set({ value, revision });
+      this.save_changes();
+      return;
+    }
+    this.set({ value, revision });
+    const patch: IPatchMessage = {
+      action: 'patch',
+      base,
+      revision,
+      root: value.id,
+      ops,
+    };
+    this.send(patch, {});
+  }
+}
@@ -8,7 +8,15 @@ import { DOMWidgetModel, DOMWidgetView } from '@jupyter-widgets/base';
 import { unpack_models as deserialize } from '@jupyter-widgets/base';
 
 import { ElkLabel, ElkNode } from './sprotty/json/elkgraph-json';
-import { ELK_CSS, ELK_DEBUG, IRunMessage, NAME, VERSION } from './tokens';
+import {
+  ELK_CSS,
+  ELK_DEBUG,
+  IMeasureMessage,
+  IMeasuredMessage,
+  IRunMessage,
+  NAME,
+  VERSION,
+} from './tokens';
 
 // import { ElkNode } from './sprotty/sprotty-model';
 
@@ -84,15 +92,50 @@ export class ELKTextSizerModel extends DOMWidgetModel {
     return element;
   }
 
-  handleMessage(content: IRunMessage) {
+  handleMessage(content: IRunMessage | IMeasureMessage) {
     // check message and decide if should call `measure`
     switch (content.action) {
       case 'run':
         this.measure();
         break;
+      case 'measure':
+        this.measureLabels(content);
+        break;
     }
   }
 
+  /**
+   * Measure only the labels of the request and answer with their sizes, in the
+   * order they were sent.
+   * @param content message with the labels to measure
+   */
+  measureLabels(content: IMeasureMessage) {
+    const el: HTMLElement = this.make_container();
+    const view: SVGElement = el.getElementsByTagName('g')[0];
+    const new_g: SVGElement = createSVGElement('g');
+    const elements: SVGElement[] = content.labels.map((label) =>
+      new_g.appendChild(this.make_label(label)),
+    );
+    view.appendChild(new_g);
+    document.body.prepend(el);
+
+    window.requestAnimationFrame(() => {
+      const sizes: [number, number][] = elements.map((element) => {
+        const size: DOMRect = element.getBoundingClientRect();
+        return [size.width, size.height];
+      });
+      const reply: IMeasuredMessage = {
+        action: 'measured',
+        request: content.request,
+        sizes,
+      };
+      this.send(reply, {});
+      if (!ELK_DEBUG) {
+        document.body.removeChild(el);
+      }
+    });
+  }
+
   /**
    * Method to take a list of texts and build SVG Text Elements to attach to the DOM
    * @param content message measure request
@@ -4,6 +4,8 @@
  */
 import PKG from '../package.json';
 
+import { ElkLabel } from './sprotty/json/elkgraph-json';
+
 export const NAME = PKG.name;
 export const VERSION = PKG.version;
 
@@ -28,6 +30,60 @@ export interface IRunMessage {
   action: 'run';
 }
 
+export interface IMeasureMessage {
+  action: 'measure';
+  request: number;
+  labels: ElkLabel[];
+}
+
+export interface IMeasuredMessage {
+  action: 'measured';
+  request: number;
+  sizes: [number, number][];
+}
+
+export interface IRunBatchMessage {
+  action: 'run_batch';
+  batch: number;
+  graphs: any[];
+}
+
+export interface IBatchResultMessage {
+  action: 'batch_result';
+  batch: number;
+  results: any[];
+  errors: (string | null)[];
+}
+
+export interface ILayoutColumnsMessage {
+  action: 'layout_columns';
+  revision: number;
+  shapes: string[];
+  edges: string[];
+  sections: any[][];
+  error?: string;
+}
+
+export interface IPatchOperation {
+  op: 'add' | 'remove' | 'update';
+  id: string;
+  value?: any;
+  set?: any;
+  unset?: string[];
+}
+
+export interface IPatchMessage {
+  action: 'patch';
+  base: number;
+  revision: number;
+  root: string;
+  ops: IPatchOperation[];
+}
+
+export interface IResyncMessage {
+  action: 'resync';
+}
+
 export const ELK_CSS = {
   label: 'elklabel',
   widget_class: 'jp-ElkView',
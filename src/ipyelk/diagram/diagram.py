@@ -37,6 +37,9 @@ class Diagram(StyledWidget):
     symbols: :py:class:`~ipyelk.elements.SymbolSpec`
         additional shape definitions that can be used in rendering the diagram.
         For example unique arrow head shapes or custom node shapes.
+    debounce: float
+        seconds to wait for further refreshes before running the pipe, all
+        refreshes in the window are merged into one run
 
     """
 
@@ -53,6 +56,8 @@ class Diagram(StyledWidget):
     symbols: SymbolSpec = T.Instance(SymbolSpec, kw={}).tag(
         sync=True, **symbol_serialization
     )
+    debounce: float = T.Float(default_value=0.0)
+    _refresh: asyncio.Future = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -95,13 +100,20 @@ class Diagram(StyledWidget):
     def _update_view_sources(self):
         self.source.flow = (F.New,)
         self.pipe.inlet = self.source
+        self.pipe.debounce = self.debounce
         self.view.source = self.pipe.outlet
 
     @T.observe("pipe", "source", "style")
     def _change_pipe(self, change):
+        if change.name == "pipe" and isinstance(change.old, Pipe):
+            change.old.cancel()
         self._update_view_sources()
         self.refresh()
 
+    @T.observe("debounce")
+    def _update_debounce(self, change: T.Bunch):
+        self.pipe.debounce = change.new
+
     @T.default("tools")
     def _default_tools(self) -> List[Tool]:
         return [
@@ -159,18 +171,25 @@ class Diagram(StyledWidget):
         self.tools = tuple([*self.tools, tool])
         return self
 
-    def refresh(self, change: T.Bunch = None) -> asyncio.Task:
-        """Create asynchronous refresh task which will update the view given any
+    def refresh(self, change: T.Bunch = None) -> asyncio.Future:
+        """Schedule an asynchronous refresh which will update the view given any
         changes.
+
+        Refreshes within the `debounce` window of each other are merged into a
+        single run of the pipe, and a refresh during a run is queued behind it.
         """
         self.log.debug("Refreshing diagram")
-        task: asyncio.Task = self.pipe.schedule_run()
+        task: asyncio.Future = self.pipe.schedule_run()
+        if task is self._refresh:
+            # merged into a pending run, which will update the view
+            return task
+        self._refresh = task
 
         def update_view(future: asyncio.Task):
             try:
                 future.exception()
             except asyncio.CancelledError:
-                pass
+                return
             except Exception as E:
                 raise E
             layout = self.pipe.outlet.value
@@ -180,3 +199,7 @@ class Diagram(StyledWidget):
 
         task.add_done_callback(update_view)
         return task
+
+    def close(self):
+        self.pipe.cancel()
+        super().close()
@@ -16,8 +16,11 @@ from .elements import (
     exclude_hidden,
     exclude_layout,
     merge_excluded,
+    trusted,
 )
 from .extended import Compartment, Partition, Record
+from .geometry import GeometryStore
+from .hierarchy import HierarchyIndex
 from .index import (
     EdgeReport,
     ElementIndex,
@@ -30,11 +33,20 @@ from .index import (
     iter_labels,
     iter_visible,
 )
+from .lazy import LazyNode, LazyNodeProperties, LazySource
 from .mark_factory import Mark, MarkFactory
 from .registry import Registry
-from .serialization import convert_elkjson, elk_serialization, symbol_serialization
+from .serialization import (
+    ElkJSONBuilder,
+    convert_elkjson,
+    elk_serialization,
+    load_elkjson,
+    serialize_element,
+    symbol_serialization,
+)
 from .shapes import EdgeShape, LabelShape, NodeShape, PortShape
 from .symbol import EndpointSymbol, Symbol, SymbolSpec
+from .traversal import Order, walk
 
 __all__ = [
     "EMPTY_SENTINEL",
@@ -48,18 +60,25 @@ __all__ = [
     "ElementIndex",
     "ElementMetadata",
     "ElementShape",
+    "ElkJSONBuilder",
     "EndpointSymbol",
+    "GeometryStore",
     "HierarchicalElement",
     "HierarchicalIndex",
+    "HierarchyIndex",
     "IDReport",
     "Label",
     "LabelProperties",
     "LabelShape",
+    "LazyNode",
+    "LazyNodeProperties",
+    "LazySource",
     "Mark",
     "MarkFactory",
     "Node",
     "NodeProperties",
     "NodeShape",
+    "Order",
     "Partition",
     "Port",
     "PortProperties",
@@ -79,6 +98,10 @@ __all__ = [
     "iter_hierarchy",
     "iter_labels",
     "iter_visible",
+    "load_elkjson",
     "merge_excluded",
+    "serialize_element",
     "symbol_serialization",
+    "trusted",
+    "walk",
 ]
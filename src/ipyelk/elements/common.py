@@ -1,10 +1,19 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import gc
 from collections import namedtuple
-from typing import Dict, List
+from contextlib import contextmanager
+from typing import Dict, List, Union
 
 EMPTY_SENTINEL = namedtuple("Sentinel", [])
 
+# value of (a part of) json data
+JSONValue = Union[bool, int, float, str, List, Dict, None]
+
+# pydantic models keep their values in ``__dict__`` and ``__fields_set__``,
+# which only ``object`` can replace without validation
+object_setattr = object.__setattr__
+
 
 def add_excluded_fields(kwargs: Dict, excluded: List) -> Dict:
     """Shim function to help manipulate excluded fields from the `dict`
@@ -20,6 +29,20 @@ def add_excluded_fields(kwargs: Dict, excluded: List) -> Dict:
     return kwargs
 
 
+@contextmanager
+def paused_gc():
+    """Pause garbage collection while many new objects are created, as they
+    would otherwise trigger full collections of the whole diagram
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 class CounterContextManager:
     counter = 0
     active: bool = False
@@ -35,3 +58,80 @@ class CounterContextManager:
             self.active = False
         if self.counter >= 1:
             self.counter -= 1
+
+
+class ElementList(list):  # noqa: FURB189 element fields are validated as lists
+    """List of sub elements that informs its owner's live
+    :py:class:`~ipyelk.elements.ElementIndex` of membership changes
+    """
+
+    __slots__ = ("owner",)
+
+    def __init__(self, iterable=(), owner=None):
+        super().__init__(iterable)
+        self.owner = owner
+
+    def _added(self, *items):
+        index = getattr(self.owner, "_index", None)
+        if index is not None and items:
+            index.add(*items, owner=self.owner)
+
+    def _removed(self, *items):
+        index = getattr(self.owner, "_index", None)
+        if index is not None and items:
+            index.discard(*items)
+
+    def append(self, item):
+        super().append(item)
+        self._added(item)
+
+    def extend(self, items):
+        items = list(items)
+        super().extend(items)
+        self._added(*items)
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def insert(self, i, item):
+        super().insert(i, item)
+        self._added(item)
+
+    def remove(self, item):
+        super().remove(item)
+        self._removed(item)
+
+    def pop(self, *args):
+        item = super().pop(*args)
+        self._removed(item)
+        return item
+
+    def clear(self):
+        items = list(self)
+        super().clear()
+        self._removed(*items)
+
+    def __setitem__(self, key, value):
+        old = self[key]
+        if isinstance(key, slice):
+            value = list(value)
+        else:
+            old, value = [old], [value]
+            key = slice(key, key + 1 or None)
+        super().__setitem__(key, value)
+        index = getattr(self.owner, "_index", None)
+        if index is not None:
+            index._replace(old, value, owner=self.owner)
+
+    def __delitem__(self, key):
+        old = self[key]
+        super().__delitem__(key)
+        if isinstance(key, slice):
+            self._removed(*old)
+        else:
+            self._removed(old)
+
+    def __reduce__(self):
+        # copies and pickles are plain lists detached from any index
+        return list, (list(self),)
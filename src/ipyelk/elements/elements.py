@@ -2,17 +2,111 @@
 # Distributed under the terms of the Modified BSD License.
 import abc
 import textwrap
-from typing import Dict, List, Optional, Type, Union
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Type,
+    Union,
+)
 
 from pydantic.v1 import BaseModel, Field, PrivateAttr
+from pydantic.v1.fields import SHAPE_LIST, SHAPE_SINGLETON, ModelField
+from pydantic.v1.utils import smart_deepcopy
 
 from ..exceptions import NotFoundError, NotUniqueError
-from .common import CounterContextManager, add_excluded_fields
+from .common import (
+    EMPTY_SENTINEL,
+    CounterContextManager,
+    ElementList,
+    add_excluded_fields,
+    object_setattr,
+)
 from .registry import Registry
 from .shapes import BaseShape, EdgeShape, LabelShape, NodeShape, Point, PortShape
 
+if TYPE_CHECKING:
+    from .geometry import GeometryStore
+    from .index import ElementIndex
+
 exclude_hidden = CounterContextManager()
 exclude_layout = CounterContextManager()
+trusted = CounterContextManager()
+
+
+def construct(model: BaseModel, data: Dict) -> BaseModel:
+    """Populate `model` from trusted `data` without validation. Nested
+    dictionaries are converted to the field's model type, but values are
+    otherwise not coerced or copied.
+
+    :param model: uninitialized model instance
+    :param data: field values
+    :return: populated model
+    """
+    values = {}
+    fields_set = set()
+    for name, alias, make, is_list, default in _trusted_plan(type(model)):
+        if alias in data:
+            fields_set.add(name)
+            value = data[alias]
+            if make is not None:
+                if is_list:
+                    if isinstance(value, list):
+                        value = [make(v) if type(v) is dict else v for v in value]
+                elif type(value) is dict:
+                    value = make(value)
+            values[name] = value
+        elif default is not _REQUIRED:
+            values[name] = default() if callable(default) else default
+    object_setattr(model, "__dict__", values)
+    object_setattr(model, "__fields_set__", fields_set)
+    model._init_private_attributes()
+    return model
+
+
+_REQUIRED = object()
+_IMMUTABLE = (type(None), bool, int, float, str, tuple, frozenset)
+_TRUSTED_PLANS: Dict[Type[BaseModel], tuple] = {}
+
+
+def _trusted_plan(cls: Type[BaseModel]) -> tuple:
+    """Cached description of how to populate the fields of `cls`"""
+    plan = _TRUSTED_PLANS.get(cls)
+    if plan is None:
+        plan = _TRUSTED_PLANS[cls] = tuple(
+            _field_plan(field) for field in cls.__fields__.values()
+        )
+    return plan
+
+
+def _field_plan(field: ModelField) -> tuple:
+    model_cls = field.type_
+    make = None
+    is_model = isinstance(model_cls, type) and issubclass(model_cls, BaseModel)
+    if is_model and field.shape in {SHAPE_SINGLETON, SHAPE_LIST}:
+        make = _trusted_factory(model_cls)
+
+    factory = field.default_factory
+    if field.required:
+        default = _REQUIRED
+    elif isinstance(factory, type) and issubclass(factory, BaseModel):
+        default = partial(_trusted_factory(factory), {})
+    elif factory is None and isinstance(field.default, _IMMUTABLE):
+        default = field.default
+    else:
+        default = field.get_default
+    return field.name, field.alias, make, field.shape == SHAPE_LIST, default
+
+
+def _trusted_factory(cls: Type[BaseModel]) -> Callable[[Dict], BaseModel]:
+    """Callable building a `cls` instance from a dictionary of trusted data"""
+    if issubclass(cls, BaseElement):
+        return lambda data: cls(**data)
+    return lambda data: construct(cls.__new__(cls), data)
 
 
 def merge_excluded(cls: Type[BaseModel], *fields: str) -> List[str]:
@@ -135,17 +229,199 @@ class IDElement(BaseModel, abc.ABC):
         display(JSON(self.dict()))
 
 
+# fields of edges whose changes a live index records for validation
+ENDPOINTS = ("source", "target")
+# fields that are only allocated when they are first accessed
+LAZY_FIELDS = ("layoutOptions", "metadata", "properties")
+# factories of the lazy fields by element class
+_LAZY_FACTORIES: Dict[type, Dict[str, Callable[[], Any]]] = {}
+# read only defaults of the lazy fields by element class and field
+_SHARED_DEFAULTS: Dict[tuple, Any] = {}
+# layout options shared by elements, by their items
+_SHARED_OPTIONS: Dict[tuple, Dict] = {}
+_FIELD_POSITIONS: Dict[type, Dict[str, int]] = {}
+# copies of elements leave their lazy fields unallocated as well
+_copying = CounterContextManager()
+
+
+def _deferred() -> object:
+    """Default factory of the lazy fields, the value is dropped by the element
+    and only allocated when it is accessed
+    """
+    return EMPTY_SENTINEL
+
+
+def _defer_defaults(cls: Type["BaseElement"]):
+    """Replace the default factories of the lazy fields of the class"""
+    factories = {}
+    for name in LAZY_FIELDS:
+        field = cls.__fields__[name]
+        factory = field.default_factory
+        if factory is _deferred:
+            # inherited from a base class that was already prepared
+            factory = next(
+                _LAZY_FACTORIES[base][name]
+                for base in cls.__mro__[1:]
+                if base in _LAZY_FACTORIES
+            )
+        elif factory is None:
+            factory = partial(smart_deepcopy, field.default)
+        field.default_factory = _deferred
+        factories[name] = factory
+    _LAZY_FACTORIES[cls] = factories
+
+
+class _LazyField:
+    """Allocates the default of a lazy field of an element when it is first
+    accessed. Elements do not keep unallocated lazy fields in their `__dict__`,
+    so the lookup only falls back to this descriptor for them.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, el: Optional["BaseElement"], cls=None):
+        if el is None:
+            # keep the class attribute hidden from pydantic like other fields
+            raise AttributeError(self.name)
+        options = el._default_options
+        if self.name == "layoutOptions" and options is not None:
+            value = dict(options)
+        else:
+            value = _LAZY_FACTORIES[type(el)][self.name]()
+        values = _in_field_order(el, el.__dict__, {self.name: value})
+        object_setattr(el, "__dict__", values)
+        return value
+
+
+def _in_field_order(el: "BaseElement", data: Dict, stored: Dict) -> Dict:
+    """Insert the values of fields that were not in `data` as if they were
+    there in the order of the fields
+    """
+    position = _field_positions(type(el))
+    pending = sorted(stored, key=position.__getitem__)
+    merged = {}
+    for key, value in data.items():
+        i = position.get(key, len(position))
+        while pending and position[pending[0]] < i:
+            name = pending.pop(0)
+            merged[name] = stored[name]
+        merged[key] = value
+    for name in pending:
+        merged[name] = stored[name]
+    return merged
+
+
+def _field_positions(cls: Type[BaseModel]) -> Dict[str, int]:
+    positions = _FIELD_POSITIONS.get(cls)
+    if positions is None:
+        positions = _FIELD_POSITIONS[cls] = {k: i for i, k in enumerate(cls.__fields__)}
+    return positions
+
+
+def _shared_options(options: Dict) -> Dict:
+    """Single copy of layout options with the same items"""
+    try:
+        key = tuple(sorted(options.items()))
+        hash(key)
+    except TypeError:
+        return dict(options)
+    shared = _SHARED_OPTIONS.get(key)
+    if shared is None:
+        shared = _SHARED_OPTIONS[key] = dict(options)
+    return shared
+
+
 class BaseElement(IDElement, abc.ABC):
     labels: List["Label"] = Field(default_factory=list)
     layoutOptions: Dict = Field(default_factory=dict)
     metadata: ElementMetadata = Field(default_factory=ElementMetadata)
     properties: BaseProperties = Field(default_factory=BaseProperties)
+    _index: Optional["ElementIndex"] = PrivateAttr(None)
+    _default_options: Optional[Dict] = PrivateAttr(None)
 
     class Config:
         copy_on_model_validation = "none"
         validate_assignment = True
         excluded = merge_excluded(IDElement, "metadata", "labels")
 
+        # non-pydantic configs
+        element_lists = ("labels",)
+
+    def __init__(self, **data):  # type: ignore
+        if trusted.active:
+            construct(self, data)
+        else:
+            super().__init__(**data)
+        values = self.__dict__
+        for key in LAZY_FIELDS:
+            if values[key] is EMPTY_SENTINEL:
+                del values[key]
+        for key in self.__config__.element_lists:
+            values[key] = ElementList(values[key], owner=self)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _defer_defaults(cls)
+
+    def __setattr__(self, key, value):
+        index = self._index
+        if key in self.__config__.element_lists:
+            old = self.__dict__[key]
+            if value is old:
+                return  # in place operations (e.g. `+=`) already updated the index
+            super().__setattr__(key, value)
+            self.__dict__[key] = ElementList(self.__dict__[key], owner=self)
+            if index is not None:
+                index._replace(old, self.__dict__[key], owner=self)
+        elif key == "id" and index is not None:
+            with index._rekey(self):
+                super().__setattr__(key, value)
+        elif key in ENDPOINTS and index is not None:
+            super().__setattr__(key, value)
+            index._touch(self)
+        elif key in LAZY_FIELDS and key not in self.__dict__:
+            super().__setattr__(key, value)
+            values = self.__dict__
+            value = values.pop(key)
+            ordered = _in_field_order(self, values, {key: value})
+            object_setattr(self, "__dict__", ordered)
+        else:
+            super().__setattr__(key, value)
+
+    def peek(self, name: str) -> object:
+        """Value of the field without allocating it. Lazy fields that are not
+        allocated yet give a default that is shared by all elements of the
+        class, which must not be modified.
+
+        :param name: field name
+        :return: field value
+        """
+        value = self.__dict__.get(name, EMPTY_SENTINEL)
+        if value is not EMPTY_SENTINEL:
+            return value
+        if name not in LAZY_FIELDS:
+            return getattr(self, name)
+        if name == "layoutOptions" and self._default_options is not None:
+            return self._default_options
+        key = (type(self), name)
+        value = _SHARED_DEFAULTS.get(key, EMPTY_SENTINEL)
+        if value is EMPTY_SENTINEL:
+            value = _SHARED_DEFAULTS[key] = _LAZY_FACTORIES[type(self)][name]()
+        return value
+
+    def set_default_options(self, options: Dict) -> "BaseElement":
+        """Use a copy of the layout options that is shared with other elements
+        with the same options, until the `layoutOptions` of the element are
+        accessed.
+
+        :param options: default layout options
+        :return: this element
+        """
+        self.__dict__.pop("layoutOptions", None)
+        self._default_options = _shared_options(options)
+        return self
+
     def add_class(self, *className: str) -> "BaseElement":
         """Adds a class to the top level element of the widget.
 
@@ -172,9 +448,92 @@ class BaseElement(IDElement, abc.ABC):
         data["labels"] = list_visible(self.labels, **kwargs)
         return data
 
+    def copy(self, **kwargs):
+        with _copying:
+            return super().copy(**kwargs)
+
+    def __getstate__(self):
+        # pickles and deep copies are not part of the live index
+        state = super().__getstate__()
+        if self._index is not None:
+            state["__private_attribute_values__"] = {
+                **state["__private_attribute_values__"],
+                "_index": None,
+            }
+        return state
+
+    def _copy_and_set_values(self, values, fields_set, *, deep):
+        index = self._index
+        if index is None:
+            return super()._copy_and_set_values(values, fields_set, deep=deep)
+        self._index = None
+        try:
+            return super()._copy_and_set_values(values, fields_set, deep=deep)
+        finally:
+            self._index = index
+
+    def _iter(self, *args, **kwargs):
+        """Fields for `dict` and `json`, with the ones that are not in
+        `__dict__` in place as if they were
+        """
+        stored = {} if _copying.active else self._stored_values()
+        if not stored:
+            yield from super()._iter(*args, **kwargs)
+            return
+        # only the fields in `__dict__` are iterated for the element, the
+        # others are converted the same way on a stand-in holding just them
+        stand_in = self.__class__.__new__(self.__class__)
+        object_setattr(stand_in, "__dict__", stored)
+        object_setattr(stand_in, "__fields_set__", self.__fields_set__)
+        items = dict(super()._iter(*args, **kwargs))
+        extra = dict(BaseModel._iter(stand_in, *args, **kwargs))
+        yield from _in_field_order(self, items, extra).items()
+
+    def _stored_values(self) -> Dict:
+        """Values of the fields that are not in `__dict__`, lazy fields are
+        copies of their shared defaults
+        """
+        values = {}
+        for key in LAZY_FIELDS:
+            if key not in self.__dict__:
+                value = self.peek(key)
+                if isinstance(value, BaseModel):
+                    values[key] = value.copy()
+                else:
+                    values[key] = dict(value)
+        return values
+
+
+_defer_defaults(BaseElement)
+for _name in LAZY_FIELDS:
+    setattr(BaseElement, _name, _LazyField(_name))
+
 
 def list_visible(els: List[BaseElement], **kwargs):
-    return [el.dict(**kwargs) for el in els if not el.properties.hidden]
+    return [el.dict(**kwargs) for el in els if not el.peek("properties").hidden]
+
+
+GEOMETRY_KEYS = ("x", "y", "width", "height")
+
+
+class _StoredGeometry:
+    """Reads a geometry field of an element bound to a
+    :py:class:`~ipyelk.elements.GeometryStore`. Bound elements do not keep the
+    field in their `__dict__`, so the lookup only falls back to this
+    descriptor for them.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __get__(self, el: Optional["ShapeElement"], cls=None):
+        if el is None:
+            # keep the class attribute hidden from pydantic like other fields
+            raise AttributeError(self.key)
+        store = el._store
+        if store is None or not store.holds(el):
+            return None
+        return store.get(el, self.key)
 
 
 class ShapeElement(BaseElement, abc.ABC):
@@ -182,6 +541,51 @@ class ShapeElement(BaseElement, abc.ABC):
     y: Optional[float]
     width: Optional[float]
     height: Optional[float]
+    _store: Optional["GeometryStore"] = PrivateAttr(None)
+    _slot: int = PrivateAttr(-1)
+
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+        store = self._store
+        if key in GEOMETRY_KEYS and store is not None and store.holds(self):
+            store.set(self, key, self.__dict__.pop(key))
+
+    def geometry(self) -> Dict[str, Optional[float]]:
+        """Values of the geometry fields, from the store the element is bound
+        to or otherwise from the element itself
+        """
+        return {key: getattr(self, key) for key in GEOMETRY_KEYS}
+
+    def __getstate__(self):
+        # pickles and deep copies carry the geometry rather than the store
+        state = super().__getstate__()
+        if self._store is not None:
+            state["__dict__"] = {**state["__dict__"], **self.geometry()}
+            state["__private_attribute_values__"] = {
+                **state["__private_attribute_values__"],
+                "_store": None,
+                "_slot": -1,
+            }
+        return state
+
+    def _copy_and_set_values(self, values, fields_set, *, deep):
+        store = self._store
+        if store is None:
+            return super()._copy_and_set_values(values, fields_set, deep=deep)
+        values = {**self.geometry(), **values}
+        self._store = None
+        try:
+            copy = super()._copy_and_set_values(values, fields_set, deep=deep)
+        finally:
+            self._store = store
+        copy._slot = -1
+        return copy
+
+    def _stored_values(self) -> Dict:
+        values = super()._stored_values()
+        if self._store is not None:
+            values.update(self.geometry())
+        return values
 
     def dict(self, **kwargs):
         data = super().dict(**kwargs)
@@ -189,8 +593,8 @@ class ShapeElement(BaseElement, abc.ABC):
         # properties
         width = 0
         height = 0
-        if self.properties.shape:
-            shape = self.properties.shape
+        shape = self.peek("properties").shape
+        if shape:
             width = shape.width
             height = shape.height
         # update width if not set
@@ -206,6 +610,10 @@ class ShapeElement(BaseElement, abc.ABC):
         return data
 
 
+for _key in GEOMETRY_KEYS:
+    setattr(ShapeElement, _key, _StoredGeometry(_key))
+
+
 class HierarchicalElement(ShapeElement, abc.ABC):
     _parent: Optional["Node"] = PrivateAttr(None)
 
@@ -221,10 +629,10 @@ class HierarchicalElement(ShapeElement, abc.ABC):
         return self._parent
 
     def set_key(self, key: Optional[str]):
-        assert self.properties.key is None or self.properties.key == key, (
-            "Key has already been set"
-        )
-        self.properties.key = key
+        current = self.peek("properties").key
+        assert current is None or current == key, "Key has already been set"
+        if current != key:
+            self.properties.key = key
         return self
 
 
@@ -319,6 +727,7 @@ class Node(HierarchicalElement):
 
         # non-pydantic configs
         excluded = merge_excluded(HierarchicalElement, "ports", "children", "edges")
+        element_lists = ("labels", "ports", "children", "edges")
 
     def __init__(self, **data):  # type: ignore
         super().__init__(**data)
@@ -372,7 +781,9 @@ class Node(HierarchicalElement):
         :raises NotUniqueError: If found multiple children with the same key
         :return: matching child
         """
-        matches = [child for child in self.children if key == child.properties.key]
+        matches = [
+            child for child in self.children if key == child.peek("properties").key
+        ]
         found = len(matches)
         if found == 1:
             return matches[0]
@@ -392,7 +803,7 @@ class Node(HierarchicalElement):
         :raises NotUniqueError: If found multiple ports with the same key
         :return: matching port
         """
-        matches = [port for port in self.ports if key == port.properties.key]
+        matches = [port for port in self.ports if key == port.peek("properties").key]
         found = len(matches)
         if found == 1:
             return matches[0]
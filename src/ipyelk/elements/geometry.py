@@ -0,0 +1,184 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import math
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence
+
+from .elements import GEOMETRY_KEYS, BaseElement, ShapeElement
+from .traversal import walk
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_COLUMN = {key: i for i, key in enumerate(GEOMETRY_KEYS)}
+
+
+class GeometryStore:
+    """The `x`, `y`, `width` and `height` of shape elements in one NumPy array
+    with a row for every element, `NaN` standing in for `None`. Requires
+    `numpy`.
+
+    Elements are bound to a slot of the store, which holds their geometry from
+    then on: the fields are removed from the elements, reading them looks them
+    up in the store and assigning them writes to the store. The geometry of
+    many elements can then be read or written at once, e.g. with
+    :py:meth:`rows` and :py:meth:`update` or the column views :py:attr:`x`,
+    :py:attr:`y`, :py:attr:`width` and :py:attr:`height`. Column views are
+    only valid until the store grows.
+
+    :param capacity: number of rows to allocate initially
+    """
+
+    def __init__(self, capacity: int = 1024):
+        import numpy as np
+
+        self._data = np.full((max(capacity, 1), len(GEOMETRY_KEYS)), np.nan)
+        self._elements: List[Optional[ShapeElement]] = []
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._elements) - len(self._free)
+
+    def __contains__(self, el: BaseElement) -> bool:
+        return self.holds(el)
+
+    @property
+    def elements(self) -> List[Optional[ShapeElement]]:
+        """Elements by slot, `None` for free slots"""
+        return self._elements
+
+    @property
+    def data(self) -> "np.ndarray":
+        """Rows of the slots in use or free"""
+        return self._data[: len(self._elements)]
+
+    @property
+    def x(self) -> "np.ndarray":
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> "np.ndarray":
+        return self.data[:, 1]
+
+    @property
+    def width(self) -> "np.ndarray":
+        return self.data[:, 2]
+
+    @property
+    def height(self) -> "np.ndarray":
+        return self.data[:, 3]
+
+    def holds(self, el: BaseElement) -> bool:
+        """If the geometry of the element is in this store"""
+        slot = getattr(el, "_slot", -1)
+        return (
+            getattr(el, "_store", None) is self
+            and 0 <= slot < len(self._elements)
+            and self._elements[slot] is el
+        )
+
+    def slot(self, el: ShapeElement) -> int:
+        """Row of the element
+
+        :raises KeyError: if the element is not bound to the store
+        """
+        if not self.holds(el):
+            raise KeyError(f"{el!r} is not bound to the geometry store")
+        return el._slot
+
+    def add(self, el: ShapeElement) -> int:
+        """Move the geometry of the element into the store
+
+        :param el: element to bind
+        :return: slot of the element
+        """
+        if self.holds(el):
+            return el._slot
+        if el._store is not None and el._store.holds(el):
+            el._store.discard(el)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._elements)
+            self._elements.append(None)
+            self._reserve(slot + 1)
+        values = el.__dict__
+        row = self._data[slot]
+        for i, key in enumerate(GEOMETRY_KEYS):
+            value = values.pop(key, None)
+            row[i] = float("nan") if value is None else value
+        self._elements[slot] = el
+        el._store = self
+        el._slot = slot
+        return slot
+
+    def bind(self, *els: BaseElement) -> "GeometryStore":
+        """Bind the shape elements in the hierarchies of the elements
+
+        :param els: root elements
+        :return: this store
+        """
+        shapes = [el for el, _ in walk(*els) if isinstance(el, ShapeElement)]
+        self._reserve(len(self._elements) + len(shapes) - len(self._free))
+        for el in shapes:
+            self.add(el)
+        return self
+
+    def discard(self, el: ShapeElement):
+        """Move the geometry of the element back onto the element"""
+        if not self.holds(el):
+            return
+        slot = el._slot
+        el.__dict__.update(self._values(slot))
+        el._store = None
+        el._slot = -1
+        self._elements[slot] = None
+        self._data[slot] = float("nan")
+        self._free.append(slot)
+
+    def release(self):
+        """Move the geometry of all elements back onto the elements"""
+        for el in self._elements:
+            if el is not None:
+                self.discard(el)
+        self._elements = []
+        self._free = []
+
+    def get(self, el: ShapeElement, key: str) -> Optional[float]:
+        value = self._data[self.slot(el), _COLUMN[key]]
+        return None if math.isnan(value) else float(value)
+
+    def set(self, el: ShapeElement, key: str, value: Optional[float]):
+        self._data[self.slot(el), _COLUMN[key]] = (
+            float("nan") if value is None else value
+        )
+
+    def rows(self, els: Iterable[ShapeElement]) -> "np.ndarray":
+        """Geometry of the elements, as a row of `x`, `y`, `width` and `height`
+        for every element
+        """
+        return self._data[self._slots(els)]
+
+    def update(self, els: Iterable[ShapeElement], rows: "np.ndarray"):
+        """Set the geometry of the elements from rows of `x`, `y`, `width` and
+        `height`, with `NaN` for `None`
+        """
+        self._data[self._slots(els)] = rows
+
+    def _slots(self, els: Iterable[ShapeElement]) -> Sequence[int]:
+        return [self.slot(el) for el in els]
+
+    def _values(self, slot: int):
+        for key, value in zip(GEOMETRY_KEYS, self._data[slot].tolist()):
+            yield key, None if math.isnan(value) else value
+
+    def _reserve(self, size: int):
+        import numpy as np
+
+        capacity = len(self._data)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        data = np.full((capacity, len(GEOMETRY_KEYS)), np.nan)
+        data[: len(self._data)] = self._data
+        self._data = data
@@ -0,0 +1,159 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from collections.abc import Hashable, Iterable, Iterator
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from ..exceptions import NotFoundError
+from .common import EMPTY_SENTINEL
+
+
+class HierarchyIndex:
+    """Lowest common ancestor and ancestry queries over a tree, or a forest, of
+    hashable keys.
+
+    The Euler tour of the tree and the depths along it are computed once, with
+    a sparse table of the shallowest position in every power of two range of
+    the tour. A lowest common ancestor is then the shallowest entry between the
+    first visits of two keys, found in constant time, and a key is an ancestor
+    of another if its visits enclose the visits of the other.
+
+    :param edges: `(parent, child)` pairs of the hierarchy
+    :param nodes: additional keys without a parent or children
+    :raises ValueError: if a key has more than one parent or the hierarchy has
+        a cycle
+    """
+
+    def __init__(
+        self,
+        edges: Iterable[Tuple[Hashable, Hashable]] = (),
+        nodes: Iterable[Hashable] = (),
+    ):
+        children: Dict[Hashable, List[Hashable]] = {}
+        parents: Dict[Hashable, Hashable] = {}
+        for key in nodes:
+            children.setdefault(key, [])
+        for parent, child in edges:
+            if child in parents:
+                if parents[child] == parent:
+                    continue
+                raise ValueError(f"{child!r} has more than one parent")
+            parents[child] = parent
+            children.setdefault(parent, []).append(child)
+            children.setdefault(child, [])
+        self._parents = parents
+        self._children = children
+
+        # euler tour of every tree in the forest, separated by a `None` entry
+        # shallower than all roots so keys in different trees have no ancestor
+        tour: List[Hashable] = []
+        depths: List[int] = []
+        first: Dict[Hashable, int] = {}
+        last: Dict[Hashable, int] = {}
+        for root, kids in children.items():
+            if root in parents:
+                continue
+            if tour:
+                tour.append(None)
+                depths.append(-1)
+            stack = [(root, 0, iter(kids))]
+            first[root] = len(tour)
+            tour.append(root)
+            depths.append(0)
+            while stack:
+                key, depth, remaining = stack[-1]
+                child = next(remaining, EMPTY_SENTINEL)
+                if child is EMPTY_SENTINEL:
+                    stack.pop()
+                    last[key] = len(tour) - 1
+                    if stack:
+                        tour.append(stack[-1][0])
+                        depths.append(stack[-1][1])
+                    continue
+                first[child] = len(tour)
+                tour.append(child)
+                depths.append(depth + 1)
+                stack.append((child, depth + 1, iter(children[child])))
+        if len(first) < len(children):
+            raise ValueError("The hierarchy has a cycle")
+
+        self._tour = tour
+        self._depths = depths
+        self._first = first
+        self._last = last
+        self._table = _sparse_table(depths)
+
+    @classmethod
+    def from_nx(cls, hierarchy: nx.DiGraph) -> "HierarchyIndex":
+        """Index a networkx tree of parent to child edges"""
+        return cls(hierarchy.edges(), hierarchy.nodes())
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._first
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def parent(self, key: Hashable) -> Optional[Hashable]:
+        """Parent of the key or `None` for a root"""
+        self._check(key)
+        return self._parents.get(key)
+
+    def children(self, key: Hashable) -> List[Hashable]:
+        """Children of the key"""
+        self._check(key)
+        return self._children[key]
+
+    def depth(self, key: Hashable) -> int:
+        """Number of ancestors of the key"""
+        return self._depths[self._check(key)]
+
+    def is_ancestor(self, ancestor: Hashable, key: Hashable) -> bool:
+        """If `ancestor` is `key` or one of its ancestors"""
+        start = self._check(ancestor)
+        return start <= self._check(key) and self._last[key] <= self._last[ancestor]
+
+    def subtree(self, key: Hashable) -> Iterator[Hashable]:
+        """The key and its descendants, parents before their children"""
+        start = self._check(key)
+        first = self._first
+        for i in range(start, self._last[key] + 1):
+            el = self._tour[i]
+            if first[el] == i:
+                yield el
+
+    def lca(self, key1: Hashable, key2: Hashable) -> Optional[Hashable]:
+        """Lowest common ancestor of two keys, which is the key itself if one is
+        an ancestor of the other, or `None` if they are in different trees
+        """
+        start, end = self._check(key1), self._check(key2)
+        if start > end:
+            start, end = end, start
+        level = (end - start + 1).bit_length() - 1
+        row = self._table[level]
+        left, right = row[start], row[end - (1 << level) + 1]
+        depths = self._depths
+        return self._tour[left if depths[left] <= depths[right] else right]
+
+    def _check(self, key: Hashable) -> int:
+        try:
+            return self._first[key]
+        except KeyError as e:
+            raise NotFoundError(f"{key!r} is not in the hierarchy") from e
+
+
+def _sparse_table(depths: List[int]) -> List[List[int]]:
+    """Position of the shallowest entry for ranges of `2**level` entries, by
+    level and start position
+    """
+    table = [list(range(len(depths)))]
+    half = 1
+    while 2 * half <= len(depths):
+        previous = table[-1]
+        table.append([
+            left if depths[left] <= depths[right] else right
+            for left, right in zip(previous, previous[half:])
+        ])
+        half *= 2
+    return table
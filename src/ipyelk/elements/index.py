@@ -2,14 +2,25 @@
 # Distributed under the terms of the Modified BSD License.
 from collections import defaultdict
 from collections.abc import Iterator, Mapping
-from typing import Dict, List, Optional, Set, Tuple, Type
+from contextlib import contextmanager, nullcontext
+from itertools import chain
+from typing import TYPE_CHECKING, ClassVar, Dict, List, Optional, Set, Tuple, Type
 
-import networkx as nx
-from pydantic.v1 import BaseModel, Field
+from pydantic.v1 import BaseModel, Field, PrivateAttr
 
-from ..exceptions import NotFoundError
+from ..exceptions import IndexConsistencyError, NotFoundError
 from .common import EMPTY_SENTINEL
 from .elements import BaseElement, Edge, HierarchicalElement, Label, Node, Port
+from .hierarchy import HierarchyIndex
+from .registry import Registry
+from .traversal import sub_edges, sub_labels, walk
+
+if TYPE_CHECKING:
+    from .validation import IncrementalValidation
+
+
+# fewest touched elements that are recorded before giving up
+MIN_TOUCHED = 1024
 
 
 class IDReport(BaseModel):
@@ -116,7 +127,32 @@ class VisIndex(BaseModel):
 
 
 class ElementIndex(BaseModel):
+    """Mapping of element ids to elements.
+
+    A live index (see :py:meth:`from_els`) registers itself on every element
+    it contains and is kept up to date as elements are added, removed or
+    rekeyed so it never needs to be rebuilt by walking the hierarchy.
+    """
+
     elements: Mapping[str, BaseElement] = Field(default_factory=dict)
+    context: Optional[Registry] = Field(
+        None,
+        description="Registry used to generate ids of elements added to a live index",
+    )
+    check_consistency: bool = Field(
+        False,
+        description=(
+            "Verify a live index against a full traversal after every change. "
+            "This is slow and intended for testing."
+        ),
+    )
+
+    element_types: ClassVar[Tuple[Type[BaseElement], ...]] = (BaseElement,)
+    _keys: Dict[BaseElement, str] = PrivateAttr(default_factory=dict)
+    _roots: Tuple[BaseElement, ...] = PrivateAttr(())
+    _touched: Optional[Dict[BaseElement, Optional[BaseElement]]] = PrivateAttr(None)
+    _overflowed: bool = PrivateAttr(False)
+    _validation: Optional["IncrementalValidation"] = PrivateAttr(None)
 
     class Config:
         copy_on_model_validation = "none"
@@ -139,11 +175,187 @@ class ElementIndex(BaseModel):
             yield key, value
 
     @classmethod
-    def from_els(cls, *els: BaseElement) -> "ElementIndex":
-        elements = {el.get_id(): el for el in iter_elements(*els)}
-        return cls(
-            elements=elements,
-        )
+    def from_els(
+        cls,
+        *els: BaseElement,
+        live: bool = False,
+        context: Optional[Registry] = None,
+        check_consistency: bool = False,
+    ) -> "ElementIndex":
+        """Build an index of the given elements and all their sub elements
+
+        :param els: root elements to index
+        :param live: keep the index up to date as the hierarchy changes
+        :param context: registry to generate missing ids with
+        :param check_consistency: verify the live index after every change
+        :return: new index
+        """
+        index = cls(context=context, check_consistency=check_consistency)
+        if live:
+            index._roots = els
+            index.add(*els)
+        else:
+            with index.id_context():
+                index.elements = {
+                    el.get_id(): el
+                    for el in iter_elements(*els)
+                    if isinstance(el, cls.element_types)
+                }
+        return index
+
+    def id_context(self):
+        return nullcontext() if self.context is None else self.context
+
+    def is_live(self, *roots: BaseElement) -> bool:
+        """Test if this index is still being kept up to date with the hierarchy
+        (optionally for exactly the given roots)
+
+        :param roots: expected root elements
+        :return: if the index is live
+        """
+        if roots and roots != self._roots:
+            return False
+        return bool(self._roots) and all(el._index is self for el in self._roots)
+
+    def add(self, *els: BaseElement, owner: Optional[BaseElement] = None):
+        """Add the elements and all their sub elements to a live index
+
+        :param els: elements to add
+        :param owner: element whose list the elements were added to
+        """
+        with self.id_context():
+            for el in iter_elements(*els):
+                self._register(el)
+        self._touch_owned(els, owner)
+        self._check()
+
+    def discard(self, *els: BaseElement):
+        """Remove the elements and all their sub elements from a live index"""
+        for el in iter_elements(*els):
+            self._unregister(el)
+        self._check()
+
+    def _replace(
+        self,
+        old: List[BaseElement],
+        new: List[BaseElement],
+        owner: Optional[BaseElement] = None,
+    ):
+        """Swap the `old` elements (and sub elements) of a live index for `new`"""
+        for el in iter_elements(*old):
+            self._unregister(el)
+        with self.id_context():
+            for el in iter_elements(*new):
+                self._register(el)
+        self._touch_owned(new, owner)
+        self._check()
+
+    @contextmanager
+    def _rekey(self, el: BaseElement):
+        """Key only the given element again after the changes in the context,
+        if this exact element is registered in the live index
+        """
+        if isinstance(el, self.element_types):
+            held = el in self._keys
+        else:
+            held = el._index is self
+        if not held:
+            yield
+            return
+        self._unregister(el)
+        try:
+            yield
+        finally:
+            with self.id_context():
+                self._register(el)
+            self._check()
+
+    def _track(self):
+        """Start recording the elements that are added, removed or rekeyed, and
+        the edges whose endpoints change, see :py:meth:`_take_touched`
+        """
+        if self._touched is None:
+            self._touched = {}
+
+    def _touch(self, el: BaseElement):
+        """Record that the element changed, if recording"""
+        touched = self._touched
+        if touched is None or self._overflowed:
+            return
+        touched.setdefault(el, None)
+        if len(touched) > max(len(self.elements), MIN_TOUCHED):
+            # stop holding on to removed elements, everything is touched
+            touched.clear()
+            self._overflowed = True
+
+    def _take_touched(self) -> Optional[Dict[BaseElement, Optional[BaseElement]]]:
+        """Elements touched since the last call, with the element whose list
+        they were added to if they were added directly, or `None` if too many
+        were touched to record
+        """
+        touched = self._touched
+        if touched is None:
+            return {}
+        overflowed, self._overflowed = self._overflowed, False
+        self._touched = {}
+        return None if overflowed else touched
+
+    def validation(self) -> "IncrementalValidation":
+        """Edge and id reports of this live index that are kept up to date"""
+        from .validation import IncrementalValidation
+
+        if self._validation is None:
+            self._validation = IncrementalValidation(self)
+        return self._validation
+
+    def _touch_owned(self, els, owner: Optional[BaseElement]):
+        touched = self._touched
+        if touched is not None and not self._overflowed and owner is not None:
+            for el in els:
+                touched[el] = owner
+
+    def _register(self, el: BaseElement):
+        el._index = self
+        if self._touched is not None:
+            self._touch(el)
+        if isinstance(el, self.element_types):
+            key = el.get_id()
+            self.elements[key] = el
+            self._keys[el] = key
+
+    def _unregister(self, el: BaseElement):
+        if el._index is self:
+            el._index = None
+        if self._touched is not None:
+            self._touch(el)
+        key = self._keys.pop(el, None)
+        if key is not None and self.elements.get(key) is el:
+            del self.elements[key]
+
+    def _check(self):
+        if self.check_consistency:
+            self.verify()
+
+    def verify(self) -> bool:
+        """Compare the live index against a fresh traversal of its roots
+
+        :raises IndexConsistencyError: if the index has drifted
+        :return: True if consistent
+        """
+        expected = type(self).from_els(*self._roots, context=self.context)
+        missing = expected.elements.keys() - self.elements.keys()
+        extra = self.elements.keys() - expected.elements.keys()
+        changed = [
+            key
+            for key, el in expected.elements.items()
+            if key in self.elements and self.elements[key] is not el
+        ]
+        if missing or extra or changed:
+            raise IndexConsistencyError(
+                f"missing: {sorted(missing)}, extra: {sorted(extra)}, "
+                f"changed: {sorted(changed)}"
+            )
+        return True
 
     def iter_types(self, *types):
         for key, value in self.items():
@@ -172,10 +384,10 @@ class ElementIndex(BaseModel):
         yield from self.iter_types(Port)
 
     def root(self) -> Node:
-        roots = []
-        for key, node in self.nodes():
-            if not node._parent:
-                roots.append(node)
+        if len(self._roots) == 1 and self.is_live():
+            roots = list(self._roots)
+        else:
+            roots = [node for key, node in self.nodes() if not node._parent]
         # TODO handle multiple roots by making one higher level root?
         assert len(roots) >= 1, "Multiple roots"
         root = roots[0]
@@ -251,10 +463,12 @@ class ElementIndex(BaseModel):
                     orphans.add(ancestor)
 
         # check
-        hierarchy = nx.DiGraph()
-        hierarchy.add_edges_from(iter_hierarchy(root, types=(HierarchicalElement,)))
-        hierarchy.add_edges_from(
-            iter_hierarchy(*orphans, root=root, types=(HierarchicalElement,))
+        hierarchy = HierarchyIndex(
+            chain(
+                iter_hierarchy(root, types=(HierarchicalElement,)),
+                iter_hierarchy(*orphans, root=root, types=(HierarchicalElement,)),
+            ),
+            nodes=[root],
         )
         el_map = HierarchicalIndex.from_els(root, *orphans)
         for el, edge in iter_edges(root, *orphans):
@@ -279,21 +493,16 @@ class HierarchicalIndex(ElementIndex):
     elements: Mapping[str, HierarchicalElement] = Field(default_factory=dict)
     vis_index: VisIndex = Field(default_factory=VisIndex)
 
+    element_types: ClassVar[Tuple[Type[BaseElement], ...]] = (HierarchicalElement,)
+
     @classmethod
     def from_els(
-        cls, *els: BaseElement, vis_index: Optional[VisIndex] = None
+        cls, *els: BaseElement, vis_index: Optional[VisIndex] = None, **kwargs
     ) -> "HierarchicalIndex":
-        elements = {
-            el.get_id(): el
-            for el in iter_elements(*els)
-            if isinstance(el, HierarchicalElement)
-        }
-        if vis_index is None:
-            vis_index = VisIndex()
-        return cls(
-            elements=elements,
-            vis_index=vis_index,
-        )
+        index = super().from_els(*els, **kwargs)
+        if vis_index is not None:
+            index.vis_index = vis_index
+        return index
 
     def link_edges(self, edges_map: Dict[str, Tuple[Dict]]):
         for node_id, edges in edges_map.items():
@@ -390,13 +599,8 @@ def iter_elements(*els: BaseElement) -> Iterator[BaseElement]:
     :param el: current element
     :yield: sub element
     """
-    for el in set(els):
+    for el, _ in walk(*els):
         yield el
-        if isinstance(el, Node):
-            yield from iter_elements(*el.children)
-            yield from iter_elements(*el.ports)
-            yield from iter_elements(*el.edges)
-        yield from iter_elements(*el.labels)
 
 
 def iter_visible(
@@ -408,18 +612,16 @@ def iter_visible(
     :param hidden: containing element is hidden
     :yield: sub element and hidden state
     """
-    for el in els:
-        hidden = bool(hidden or el.properties.hidden)
+
+    def step(el, state):
+        hidden, last_visible = state
+        hidden = bool(hidden or el.peek("properties").hidden)
         if not hidden:
             last_visible = el
-        yield el, hidden, last_visible
-        if isinstance(el, Node):
-            yield from iter_visible(
-                *el.children, hidden=hidden, last_visible=last_visible
-            )
-            yield from iter_visible(*el.ports, hidden=hidden, last_visible=last_visible)
-            yield from iter_visible(*el.edges, hidden=hidden, last_visible=last_visible)
-        yield from iter_visible(*el.labels, hidden=hidden, last_visible=last_visible)
+        return hidden, last_visible
+
+    for el, (is_hidden, last) in walk(*els, step=step, state=(hidden, last_visible)):
+        yield el, is_hidden, last
 
 
 def iter_edges(*els: Node) -> Iterator[Tuple[Node, Edge]]:
@@ -429,10 +631,8 @@ def iter_edges(*els: Node) -> Iterator[Tuple[Node, Edge]]:
     :param el: current element
     :yield: owning Node, Edge
     """
-    for el in set(els):
-        for edge in el.edges:
-            yield el, edge
-        yield from iter_edges(*el.children)
+    for edge, el in walk(*els, types=(Edge,), follow=sub_edges):
+        yield el, edge
 
 
 def iter_hierarchy(
@@ -445,15 +645,9 @@ def iter_hierarchy(
     :param el: current element
     :yield: sub element
     """
-    for el in els:
-        if root is not EMPTY_SENTINEL:
-            if isinstance(el, types):
-                yield root, el
-        if isinstance(el, Node):
-            yield from iter_hierarchy(*el.children, root=el, types=types)
-            yield from iter_hierarchy(*el.ports, root=el)
-            yield from iter_hierarchy(*el.edges, root=el)
-        yield from iter_hierarchy(*el.labels, root=el)
+    for el, parent in walk(*els, types=types, state=root):
+        if parent is not EMPTY_SENTINEL:
+            yield parent, el
 
 
 def iter_labels(
@@ -464,16 +658,13 @@ def iter_labels(
     :param els: iterable of elements
     :yield: element and label pair
     """
-    for el in els:
-        if isinstance(el, Node):
-            yield from iter_labels(
-                *el.children,
-            )
-        yield from zip([el], el.labels)
+    for label, el in walk(*els, types=(Label,), follow=sub_labels):
+        if el is not None:
+            yield el, label
 
 
 def get_ancestor(element: HierarchicalElement) -> HierarchicalElement:
     parent = element.get_parent()
-    if parent is None:
-        return element
-    return get_ancestor(parent)
+    while parent is not None:
+        element, parent = parent, parent.get_parent()
+    return element
@@ -0,0 +1,75 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import abc
+from collections.abc import Hashable
+from typing import ClassVar, List, Optional
+
+from pydantic.v1 import Field, PrivateAttr
+
+from .elements import Node, NodeProperties
+
+
+class LazyNodeProperties(NodeProperties):
+    childCount: Optional[int] = Field(
+        None, description="Number of children that are not loaded yet"
+    )
+
+
+class LazySource(abc.ABC):
+    """Source of the children of :py:class:`LazyNode` elements"""
+
+    @abc.abstractmethod
+    def expand(self, node: "LazyNode") -> List[Node]:
+        """Build and add the children of the node
+
+        :param node: node to expand
+        :return: new children
+        """
+
+
+class LazyNode(Node):
+    """Placeholder for a node whose children are only built from the source
+    graph when it is expanded, with the number of its children in
+    `properties.childCount` until then.
+
+    Nodes are expanded by the
+    :py:class:`~ipyelk.tools.ToggleCollapsedTool`, otherwise call
+    :py:meth:`expand` and refresh the diagram.
+    """
+
+    properties: LazyNodeProperties = Field(default_factory=LazyNodeProperties)
+    lazy_style: ClassVar[str] = "lazy-node"
+
+    _source: Optional[LazySource] = PrivateAttr(None)
+    _key: Optional[Hashable] = PrivateAttr(None)
+
+    @property
+    def loaded(self) -> bool:
+        """If the children of the node are built"""
+        return self._source is None
+
+    def defer(self, source: LazySource, key: Hashable, count: int) -> "LazyNode":
+        """Leave building the `count` children of the node to the source
+
+        :param source: source of the children
+        :param key: key of the node in the source
+        :param count: number of children
+        """
+        self._source = source
+        self._key = key
+        self.properties.childCount = count
+        return self.add_class(self.lazy_style)
+
+    def expand(self) -> List[Node]:
+        """Build the children of the node from its source, if they are not
+        built yet
+
+        :return: new children
+        """
+        source = self._source
+        if source is None:
+            return []
+        self._source = None
+        self.properties.childCount = None
+        self.remove_class(self.lazy_style)
+        return source.expand(self)
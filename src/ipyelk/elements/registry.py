@@ -1,25 +1,66 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import string
 from collections import defaultdict
-from typing import ClassVar, List, Optional
+from itertools import count
+from typing import ClassVar, Iterator, List, Optional
 from uuid import uuid4
 
-from pydantic.v1 import BaseModel, Field
+from pydantic.v1 import BaseModel, Field, PrivateAttr
+
+DIGITS = string.digits + string.ascii_lowercase
 
 
 def id_factory():
     return defaultdict(lambda: str(uuid4()))
 
 
+def base36(value: int) -> str:
+    """Compact string representation of a non-negative integer"""
+    digits = []
+    while True:
+        value, digit = divmod(value, 36)
+        digits.append(DIGITS[digit])
+        if not value:
+            return "".join(reversed(digits))
+
+
 class Registry(BaseModel):
-    """Context Manager to generate and maintain a lookup of objects to identifiers"""
+    """Context Manager to generate and maintain a lookup of objects to identifiers
+
+    By default objects are given random uuids. A `compact` registry instead
+    hands out short sequential base-36 identifiers, starting with `namespace`
+    and `prefix`, in the order objects are first looked up, so the same
+    elements get the same identifiers every time they are built. A prefix that
+    ends with a base-36 digit is followed by a `:`, so that registries with
+    different prefixes never hand out the same identifier. Separately built
+    elements that end up in the same diagram need registries with different
+    namespaces, e.g. the id of their root.
+    """
 
     ids: defaultdict = Field(repr=False, default_factory=id_factory)
+    compact: bool = False
+    prefix: str = "_"
+    namespace: str = ""
     stack: ClassVar[List] = []
 
+    _counter: Iterator[int] = PrivateAttr(default_factory=count)
+    _stem: str = PrivateAttr("")
+
     class Config:
         copy_on_model_validation = "none"
 
+    def __init__(self, **data):
+        super().__init__(**data)
+        prefix = f"{self.namespace}{self.prefix}"
+        # otherwise the counter of a shorter prefix could run into this prefix
+        self._stem = f"{prefix}:" if prefix[-1:] in DIGITS else prefix
+        if self.compact:
+            self.ids.default_factory = self.next_id
+
+    def next_id(self) -> str:
+        return f"{self._stem}{base36(next(self._counter))}"
+
     def __enter__(self):
         self.get_contexts().append(self)
         return self
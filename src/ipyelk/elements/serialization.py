@@ -1,47 +1,347 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
 
-from typing import Dict, Optional
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Tuple, Type, Union
 
 from ipywidgets import DOMWidget
 from pydantic.v1 import BaseModel
 
-from .elements import Node
+from .common import EMPTY_SENTINEL, JSONValue
+from .elements import (
+    BaseElement,
+    Edge,
+    IDElement,
+    Node,
+    ShapeElement,
+    exclude_layout,
+)
 from .index import HierarchicalIndex, VisIndex
 
+# kinds of json containers while building from events
+_NODE_JSON = "node"
+_CHILDREN_JSON = "children"
 
-def pop_edges(data: Dict, edges=None):
-    if edges is None:
-        edges = {}
 
-    if "edges" in data:
-        edges[data["id"]] = data.pop("edges")
-    for child in data.get("children", []):
-        pop_edges(child, edges)
-    return edges
+class ElkJSONBuilder:
+    """Builds an element hierarchy from elk json bottom up, indexing the
+    elements as they are built so the hierarchy is only walked once.
 
+    Each node is built as soon as its json object is complete, so when reading
+    from a stream of json events the raw json of a subtree is released as soon
+    as its elements exist.
+    """
+
+    def __init__(self, vis_index: Optional[VisIndex] = None):
+        self.index = HierarchicalIndex()
+        if vis_index is not None:
+            self.index.vis_index = vis_index
+        self.edges: Dict[str, List[Dict]] = {}
+
+    def node(self, data: Dict) -> Node:
+        """Build a node from json whose `children` are already built nodes"""
+        edges = data.pop("edges", None)
+        node = Node(**data)
+        elements = self.index.elements
+        node_id = node.get_id()
+        elements[node_id] = node
+        for port in node.ports:
+            elements[port.get_id()] = port
+        if edges:
+            self.edges[node_id] = edges
+        return node
 
-def apply_edges(data: Dict, edges):
-    node_id = data["id"]
-    if node_id in edges:
-        data["edges"] = edges.get(node_id)
-    for child in data.get("children", []):
-        apply_edges(child, edges)
-    return edges
+    def finish(self, root: Node) -> Node:
+        self.index.link_edges(self.edges)
+        self.edges = {}
+        return root
+
+    def from_dict(self, data: Dict) -> Node:
+        """Build the hierarchy without mutating `data`"""
+        built_root: List[Node] = []
+        stack = [(data, iter(data.get("children") or ()), [], built_root)]
+        while stack:
+            data, pending, children, siblings = stack[-1]
+            child = next(pending, None)
+            if child is not None:
+                stack.append((child, iter(child.get("children") or ()), [], children))
+                continue
+            stack.pop()
+            siblings.append(self.node({**data, "children": children}))
+        return self.finish(built_root[0])
+
+    def from_events(self, events: Iterable[Tuple[str, Any]]) -> Node:
+        """Build the hierarchy from `ijson.basic_parse` style events"""
+        root = None
+        # stack of [container, current key, kind of container]
+        stack: List[List] = []
+        for event, value in events:
+            if event == "map_key":
+                stack[-1][1] = value
+                continue
+            if event == "start_map":
+                is_node = not stack or stack[-1][2] is _CHILDREN_JSON
+                stack.append([{}, None, _NODE_JSON if is_node else None])
+                continue
+            if event == "start_array":
+                top = stack[-1] if stack else [None, None, None]
+                kind = (
+                    _CHILDREN_JSON
+                    if top[2] is _NODE_JSON and top[1] == "children"
+                    else None
+                )
+                stack.append([[], None, kind])
+                continue
+            if event in {"end_map", "end_array"}:
+                value, _, kind = stack.pop()
+                if kind is _NODE_JSON:
+                    value = self.node(value)
+            if not stack:
+                root = value
+            else:
+                container, key, _ = stack[-1]
+                if isinstance(container, list):
+                    container.append(value)
+                else:
+                    container[key] = value
+        if not isinstance(root, Node):
+            raise TypeError("Elk json root is not a node")
+        return self.finish(root)
 
 
 def convert_elkjson(data: Dict, vis_index: VisIndex = None) -> Node:
-    # pop_edges currently mutates `data` by popping the edge dict
-    edges_map = pop_edges(data)  # dict of node.id to edge list
-    root = Node(**data)  # new element hierarchy without edges
-    el_map = HierarchicalIndex.from_els(
-        root, vis_index=vis_index
-    )  # get mapping of ids to elements
-    el_map.link_edges(edges_map)
-    # reapplies edges to `data`
-    apply_edges(data, edges_map)
+    return ElkJSONBuilder(vis_index=vis_index).from_dict(data)
+
+
+class _ChunkReader:
+    """File-like wrapper over an iterator of `str` or `bytes` chunks"""
+
+    def __init__(self, chunks: Iterable[Union[str, bytes]]):
+        self.chunks = iter(chunks)
+
+    def read(self, size: int = -1) -> bytes:
+        if size != 0:
+            for chunk in self.chunks:
+                if chunk:
+                    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        return b""
+
+
+def _iter_chunks(source: Union[IO, Iterable], size: int = 2**16) -> Iterable:
+    if hasattr(source, "read"):
+        return iter(lambda: source.read(size), source.read(0))
+    return source
+
+
+def load_elkjson(
+    source: Union[str, Path, IO, Iterable[Union[str, bytes]]],
+    vis_index: Optional[VisIndex] = None,
+) -> Node:
+    """Load an element hierarchy from a file path, file object or iterator of
+    json chunks.
+
+    If `ijson <https://github.com/ICRAR/ijson>`_ is installed the json is
+    parsed incrementally and the raw json is never held in memory at the same
+    time as the element hierarchy, otherwise the whole document is parsed
+    first.
+
+    :param source: elk json source
+    :param vis_index: index of hidden elements used to build slack ports
+    :return: root node
+    """
+    if isinstance(source, (str, Path)):
+        with Path(source).open("rb") as fp:
+            return load_elkjson(fp, vis_index=vis_index)
+    reader = _ChunkReader(_iter_chunks(source))
+    builder = ElkJSONBuilder(vis_index=vis_index)
+    try:
+        import ijson
+    except ImportError:
+        data = b"".join(iter(reader.read, b""))
+        return builder.from_dict(json.loads(data))
+    return builder.from_events(ijson.basic_parse(reader, use_float=True))
+
+
+# `dict` implementations that `serialize_element` knows how to reproduce
+FAST_ELEMENT_DICTS = {
+    IDElement.dict,
+    BaseElement.dict,
+    ShapeElement.dict,
+    Edge.dict,
+    Node.dict,
+}
+FAST_MODEL_DICTS = {BaseModel.dict, IDElement.dict}
+PRIMITIVES = {str, int, float, bool, type(None)}
+
+# kinds of values
+_PRIMITIVE, _MODEL, _CUSTOM_MODEL, _DICT, _SEQUENCE, _OTHER = range(6)
+# kinds of elements
+_CUSTOM, _LABELED, _SHAPE, _EDGE, _NODE = range(5)
+
+
+class _Plan(NamedTuple):
+    """How to serialize a particular model class"""
+
+    kind: int
+    keys: Tuple[str, ...]
+    has_id: bool
+
+
+_value_plans: Dict[type, _Plan] = {}
+_element_plans: Dict[type, _Plan] = {}
+
+
+def _value_plan(cls: type) -> _Plan:
+    plan = _value_plans.get(cls)
+    if plan is None:
+        if cls in PRIMITIVES:
+            kind = _PRIMITIVE
+        elif issubclass(cls, BaseModel):
+            custom = cls.dict not in FAST_MODEL_DICTS or getattr(
+                cls.__config__, "to_list", None
+            )
+            kind = _CUSTOM_MODEL if custom else _MODEL
+        elif issubclass(cls, dict):
+            kind = _DICT
+        elif issubclass(cls, (list, tuple, set)):
+            kind = _SEQUENCE
+        else:
+            kind = _OTHER
+        has_id = issubclass(cls, IDElement)
+        keys = _keys(cls, has_id) if kind is _MODEL else ()
+        plan = _value_plans[cls] = _Plan(kind, keys, has_id)
+    return plan
+
+
+def _keys(cls: Type[BaseModel], has_excluded: bool) -> Tuple[str, ...]:
+    """Fields in the order pydantic would serialize them"""
+    excluded = getattr(cls.__config__, "excluded", []) if has_excluded else []
+    return tuple(key for key in cls.__fields__ if key not in excluded)
+
+
+def _element_plan(cls: type) -> _Plan:
+    plan = _element_plans.get(cls)
+    if plan is None:
+        if cls.dict not in FAST_ELEMENT_DICTS or getattr(
+            cls.__config__, "to_list", None
+        ):
+            kind = _CUSTOM
+        elif issubclass(cls, Node):
+            kind = _NODE
+        elif issubclass(cls, Edge):
+            kind = _EDGE
+        elif issubclass(cls, ShapeElement):
+            kind = _SHAPE
+        else:
+            kind = _LABELED
+        plan = _element_plans[cls] = _Plan(kind, _keys(cls, True), True)
+    return plan
+
+
+def _value(value: object, exclude_none: bool) -> JSONValue:
+    plan = _value_plan(type(value))
+    kind = plan.kind
+    if kind is _PRIMITIVE or kind is _OTHER:
+        return value
+    if kind is _MODEL:
+        data = _fields(value, plan.keys, exclude_none)
+        if plan.has_id:
+            data["id"] = value.get_id()
+        return data
+    if kind is _CUSTOM_MODEL:
+        return value.dict(exclude_none=exclude_none)
+    if kind is _DICT:
+        if not value:
+            return {}
+        return {
+            k: v if type(v) in PRIMITIVES else _value(v, exclude_none)
+            for k, v in value.items()
+        }
+    return value.__class__(_value(v, exclude_none) for v in value)
+
+
+def _fields(
+    model: BaseModel,
+    keys: Tuple[str, ...],
+    exclude_none: bool,
+    values: Optional[Dict] = None,
+) -> Dict:
+    data = {}
+    if values is None:
+        values = model.__dict__
+    for key in keys:
+        value = values.get(key, EMPTY_SENTINEL)
+        if value is EMPTY_SENTINEL:
+            # lazy fields of elements fall back to their shared defaults
+            value = model.peek(key)
+        if value is None:
+            if not exclude_none:
+                data[key] = None
+        elif type(value) in PRIMITIVES:
+            data[key] = value
+        else:
+            data[key] = _value(value, exclude_none)
+    return data
+
+
+def _visible(els, exclude_none: bool):
+    return [
+        serialize_element(el, exclude_none=exclude_none)
+        for el in els
+        if not el.peek("properties").hidden
+    ]
+
+
+def serialize_element(el: BaseElement, exclude_none: bool = False) -> Dict:
+    """Serialize the element to elk json without going through pydantic.
+
+    The result is equivalent to ``el.dict(exclude_none=exclude_none)``
+    (including honoring :py:data:`~ipyelk.elements.exclude_layout`). Element
+    classes that customize their ``dict`` method are serialized with it.
+
+    :param el: element to serialize
+    :param exclude_none: drop fields with a value of `None`
+    :return: elk json dictionary
+    """
+    plan = _element_plan(type(el))
+    kind = plan.kind
+    if kind is _CUSTOM:
+        return el.dict(exclude_none=exclude_none)
+
+    values = None
+    if (kind is _SHAPE or kind is _NODE) and el._store is not None:
+        # the geometry of elements bound to a store is not in their `__dict__`
+        values = {**el.__dict__, **el.geometry()}
+    data = _fields(el, plan.keys, exclude_none, values)
+    data["id"] = el.get_id()
+    data["labels"] = _visible(el.labels, exclude_none)
+
+    if kind is _EDGE:
+        data["sources"] = [el.source.get_id()]
+        data["targets"] = [el.target.get_id()]
+        if exclude_layout.active:
+            data["sections"] = None
+        return data
+
+    if kind is _SHAPE or kind is _NODE:
+        width = 0
+        height = 0
+        shape = el.peek("properties").shape
+        if shape:
+            width = shape.width
+            height = shape.height
+        if data.get("width", None) is None and width is not None:
+            data["width"] = width
+        if data.get("height", None) is None and height is not None:
+            data["height"] = height
 
-    return root
+    if kind is _NODE:
+        data["ports"] = _visible(el.ports, exclude_none)
+        data["children"] = _visible(el.children, exclude_none)
+        data["edges"] = _visible(el.edges, exclude_none)
+    return data
 
 
 def to_json(model: Optional[BaseModel], widget: DOMWidget) -> Optional[Dict]:
@@ -53,6 +353,8 @@ def to_json(model: Optional[BaseModel], widget: DOMWidget) -> Optional[Dict]:
     """
     if model is None:
         return None
+    if isinstance(model, BaseElement):
+        return serialize_element(model, exclude_none=True)
     return model.dict(exclude_none=True)
 
 
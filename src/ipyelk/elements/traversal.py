@@ -0,0 +1,101 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from collections.abc import Iterator, Sequence
+from enum import Enum
+from itertools import repeat
+from typing import Any, Callable, Optional, Tuple, Type, TypeVar
+
+from .elements import BaseElement, Label, Node
+
+# state of the elements in a traversal
+S = TypeVar("S")
+
+SubElements = Callable[[BaseElement], Tuple[Sequence[BaseElement], ...]]
+Step = Callable[[BaseElement, S], S]
+
+
+class Order(Enum):
+    pre = "pre"
+    post = "post"
+
+
+def sub_elements(el: BaseElement) -> Tuple[Sequence[BaseElement], ...]:
+    """Sub elements that follow the `Node` hierarchy"""
+    if isinstance(el, Node):
+        return el.children, el.ports, el.edges, el.labels
+    return (el.labels,)
+
+
+def sub_edges(el: BaseElement) -> Tuple[Sequence[BaseElement], ...]:
+    """Nested nodes and the edges they own"""
+    if isinstance(el, Node):
+        return el.children, el.edges
+    return ()
+
+
+def sub_labels(el: BaseElement) -> Tuple[Sequence[BaseElement], ...]:
+    """Nested nodes and their labels without descending into the labels"""
+    if isinstance(el, Node):
+        return el.children, el.labels
+    if isinstance(el, Label):
+        return ()
+    return (el.labels,)
+
+
+_EXIT = object()
+
+
+def walk(
+    *els: BaseElement,
+    types: Tuple[Type[BaseElement], ...] = (BaseElement,),
+    order: Order = Order.pre,
+    follow: SubElements = sub_elements,
+    step: Optional[Step[S]] = None,
+    state: Optional[S] = None,
+) -> Iterator[Tuple[BaseElement, Any]]:
+    """Stack based traversal of the element hierarchy that is not limited by the
+    recursion depth of the hierarchy. Elements reachable along multiple paths
+    are only visited once.
+
+    Every element is paired with a state. By default the state of an element is
+    its parent (or `state` for the given `els`), otherwise it is the result of
+    calling `step` with the element and its parent's state.
+
+    :param els: elements to start from
+    :param types: only yield elements of these types (all elements are still
+        traversed)
+    :param order: yield parents before (`pre`) or after (`post`) their sub
+        elements
+    :param follow: callable returning the sequences of sub elements to descend
+        into
+    :param step: callable to calculate the state of an element from its
+        parent's state
+    :param state: state given to the starting elements
+    :yield: element and state pairs
+    """
+    post = order is Order.post
+    seen = set()
+    stack = list(zip(reversed(els), repeat(state)))
+    pop = stack.pop
+    push = stack.extend
+    while stack:
+        el, value = pop()
+        if el is _EXIT:
+            yield value
+            continue
+        key = id(el)
+        if key in seen:
+            continue
+        seen.add(key)
+        if step is None:
+            inner = el
+        else:
+            value = inner = step(el, value)
+        if isinstance(el, types):
+            if post:
+                stack.append((_EXIT, (el, value)))
+            else:
+                yield el, value
+        for members in reversed(follow(el)):
+            if members:
+                push(zip(reversed(members), repeat(inner)))
@@ -0,0 +1,221 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from typing import Dict, List, Optional, Set, Tuple
+
+from .elements import BaseElement, Edge, HierarchicalElement, Node, Port
+from .index import EdgeReport, ElementIndex, IDReport, iter_edges, iter_elements
+
+
+class IncrementalValidation:
+    """Edge and id reports of a live :py:class:`~ipyelk.elements.ElementIndex`
+    that are kept up to date by only rechecking the elements touched since the
+    last check.
+
+    The index records the elements it adds, removes or rekeys and the edges
+    whose endpoints change. Those elements, and the edges to and from them, are
+    rechecked, which updates the reports in place, e.g. after applying fixes.
+    The reports are computed in full the first time, if the index stopped being
+    live, while there are orphans or if the parent of an added node is not set.
+
+    Owners of edges are found from the parents of their endpoints rather than a
+    :py:class:`~ipyelk.elements.HierarchyIndex` of the whole hierarchy.
+
+    :param index: live index to validate
+    """
+
+    def __init__(self, index: ElementIndex):
+        self.index = index
+        self.edge_report = EdgeReport()
+        self.id_report = IDReport()
+        self.checked = 0
+        self._full = True
+        self._keys: Dict[BaseElement, Optional[str]] = {}
+        self._ids: Dict[str, List[BaseElement]] = {}
+        self._ends: Dict[Edge, Tuple[HierarchicalElement, HierarchicalElement]] = {}
+        self._owners: Dict[Edge, Node] = {}
+        self._incident: Dict[HierarchicalElement, Set[Edge]] = {}
+        index._track()
+
+    def reports(self) -> Tuple[EdgeReport, IDReport]:
+        """Update the reports with the touched elements
+
+        :return: copies of the reports, which are not updated further
+        """
+        index = self.index
+        touched = index._take_touched()
+        if (
+            touched is None
+            or self._full
+            or self.edge_report.orphans
+            or not index.is_live()
+        ):
+            self.rebuild()
+        elif touched and not self._update(touched):
+            # e.g. an edge from outside the hierarchy needs the orphans
+            self.rebuild()
+        else:
+            self.checked = len(touched)
+        edges, ids = self.edge_report, self.id_report
+        return (
+            EdgeReport.construct(
+                orphans=set(edges.orphans), lca_mismatch=dict(edges.lca_mismatch)
+            ),
+            IDReport.construct(
+                duplicated=dict(ids.duplicated), null_ids=list(ids.null_ids)
+            ),
+        )
+
+    def rebuild(self):
+        """Compute the reports of the whole hierarchy"""
+        index = self.index
+        index._take_touched()
+        self.edge_report, self.id_report = index.get_reports()
+        self._keys.clear()
+        self._ids.clear()
+        self._ends.clear()
+        self._incident.clear()
+        self._owners.clear()
+        root = index.root()
+        with index.id_context():
+            for el in iter_elements(root):
+                self._add_key(el)
+        for owner, edge in iter_edges(root):
+            self._owners[edge] = owner
+            self._add_ends(edge)
+        self.checked = len(self._keys)
+        self._full = False
+
+    def _update(self, touched: Dict[BaseElement, Optional[BaseElement]]) -> bool:
+        index = self.index
+        edges: Set[Edge] = set()
+        with index.id_context():
+            for el, holder in touched.items():
+                self._discard_key(el)
+                present = el._index is index
+                if present:
+                    self._add_key(el)
+                if isinstance(el, Edge):
+                    edges.add(el)
+                    self._update_owner(el, holder, present)
+                elif not self._update_element(el, holder, present, edges):
+                    return False
+        return all(self._recheck(edge) for edge in edges)
+
+    def _update_owner(self, edge: Edge, holder: Optional[BaseElement], present: bool):
+        if holder is not None:
+            self._owners[edge] = holder
+        elif not present:
+            self._owners.pop(edge, None)
+
+    def _update_element(
+        self,
+        el: BaseElement,
+        holder: Optional[BaseElement],
+        present: bool,
+        edges: Set[Edge],
+    ) -> bool:
+        """Collect the edges to and from a touched element that is not an edge
+
+        :return: if the owners of the edges still follow from the parents
+        """
+        edges.update(self._incident.get(el, ()))
+        if not present:
+            return True
+        if (
+            holder is not None
+            and isinstance(el, (Node, Port))
+            and el.get_parent() is not holder
+        ):
+            # the owners of edges come from the parents
+            return False
+        if isinstance(el, Node):
+            # edges added along with their node
+            for edge in el.edges:
+                self._owners[edge] = el
+        return True
+
+    def _recheck(self, edge: Edge) -> bool:
+        """Update the ends and owner of the edge
+
+        :return: if the edge could be checked without the whole hierarchy
+        """
+        index = self.index
+        lca_mismatch = self.edge_report.lca_mismatch
+        self._discard_ends(edge)
+        lca_mismatch.pop(edge, None)
+        if edge._index is not index:
+            return True
+        ends = (edge.source, edge.target)
+        if any(end.get_id() not in index.elements for end in ends):
+            return False
+        self._add_ends(edge)
+        parent, owner = self._owners.get(edge), _owner(edge)
+        if parent is None or owner is None:
+            return False
+        if parent is not owner:
+            lca_mismatch[edge] = (parent, owner)
+        return True
+
+    def _add_key(self, el: BaseElement):
+        if el.id is None:
+            self._keys[el] = None
+            self.id_report.null_ids.append(el)
+            return
+        key = self._keys[el] = el.get_id()
+        same = self._ids.setdefault(key, [])
+        same.append(el)
+        if len(same) > 1:
+            # the first element with the id comes last, as in `check_ids`
+            self.id_report.duplicated[key] = [*same[1:], same[0]]
+
+    def _discard_key(self, el: BaseElement):
+        if el not in self._keys:
+            return
+        key = self._keys.pop(el)
+        if key is None:
+            self.id_report.null_ids.remove(el)
+            return
+        same = self._ids[key]
+        same.remove(el)
+        duplicated = self.id_report.duplicated
+        if len(same) > 1:
+            duplicated[key] = [*same[1:], same[0]]
+        else:
+            duplicated.pop(key, None)
+            if not same:
+                del self._ids[key]
+
+    def _add_ends(self, edge: Edge):
+        ends = self._ends[edge] = (edge.source, edge.target)
+        for end in ends:
+            self._incident.setdefault(end, set()).add(edge)
+
+    def _discard_ends(self, edge: Edge):
+        for end in self._ends.pop(edge, ()):
+            edges = self._incident.get(end)
+            if edges is not None:
+                edges.discard(edge)
+                if not edges:
+                    del self._incident[end]
+
+
+def _owner(edge: Edge) -> Optional[Node]:
+    """Lowest common ancestor of the endpoints of the edge from their parents,
+    as with :py:func:`~ipyelk.loaders.nx.nxutils.get_owner`
+    """
+    source, target = edge.source, edge.target
+    if source is target:
+        # self loops need to be owned by their parent
+        owner = source.get_parent()
+    else:
+        ancestors = set()
+        el = source
+        while el is not None:
+            ancestors.add(id(el))
+            el = el.get_parent()
+        owner = target
+        while owner is not None and id(owner) not in ancestors:
+            owner = owner.get_parent()
+    if isinstance(owner, Port):
+        owner = owner.get_parent()
+    return owner
@@ -18,3 +18,11 @@ class NotUniqueError(Exception):
 
 class BrokenPipe(Exception):
     pass
+
+
+class IndexConsistencyError(Exception):
+    """Live element index has drifted from the element hierarchy"""
+
+
+class LayoutError(Exception):
+    """Layout engine failed to lay out a graph"""
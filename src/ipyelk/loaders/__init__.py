@@ -3,12 +3,15 @@
 
 from .element_loader import ElementLoader, from_element
 from .json import ElkJSONLoader, from_elkjson
+from .lazy import LazyEdge, LazyHierarchy
 from .loader import Loader
 from .nx import NXLoader, from_nx
 
 __all__ = [
     "ElementLoader",
     "ElkJSONLoader",
+    "LazyEdge",
+    "LazyHierarchy",
     "Loader",
     "NXLoader",
     "from_element",
@@ -1,20 +1,63 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
-from typing import Dict
+import json
+from collections.abc import Iterable
+from pathlib import Path
+from typing import IO, Dict, Union
+
+import traitlets as T
 
 from ..diagram import Diagram
 
 # from ..schema.validator import validate_elk_json
-from ..elements import convert_elkjson
+from ..elements import Node, convert_elkjson, load_elkjson
 from ..pipes import MarkElementWidget
+from .lazy import LazyHierarchy
 from .loader import Loader
 
 
 class ElkJSONLoader(Loader):
-    def load(self, data: Dict) -> MarkElementWidget:
+    lazy: bool = T.Bool(
+        False,
+        help=(
+            "only build the children of nodes when they are expanded, see "
+            ":py:class:`~ipyelk.elements.LazyNode`"
+        ),
+    )
+
+    def load(self, data: Union[Dict, str, Path, IO, Iterable]) -> MarkElementWidget:
+        """Load elk json from a dictionary, or stream it from a file path, file
+        object or iterator of json chunks.
+        """
+        if self.lazy:
+            return MarkElementWidget(value=self.load_lazy(data))
+        with self.construction():
+            if isinstance(data, dict):
+                root = convert_elkjson(data)
+            else:
+                root = load_elkjson(data)
         return MarkElementWidget(
-            value=self.apply_layout_defaults(convert_elkjson(data)),
+            value=self.apply_layout_defaults(root),
+        )
+
+    def load_lazy(self, data: Union[Dict, str, Path, IO, Iterable]) -> Node:
+        """Build the root and its children, leaving the children of nodes
+        further down to be built when they are expanded. The json is read in
+        full, as the nodes are built from it later.
+        """
+        if isinstance(data, (str, Path)):
+            data = json.loads(Path(data).read_bytes())
+        elif hasattr(data, "read"):
+            data = json.load(data)
+        elif not isinstance(data, dict):
+            data = json.loads(
+                b"".join(c.encode("utf-8") if isinstance(c, str) else c for c in data)
+            )
+        source = LazyHierarchy.from_elkjson(
+            data,
+            loader=self,
         )
+        return source.root()
 
 
 def from_elkjson(data, **kwargs):
@@ -0,0 +1,308 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from collections import defaultdict
+from collections.abc import Hashable
+from contextlib import nullcontext
+from typing import (
+    ContextManager,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import networkx as nx
+
+from ..elements import (
+    BaseElement,
+    Edge,
+    HierarchicalElement,
+    HierarchyIndex,
+    Label,
+    Node,
+    Port,
+    Registry,
+)
+from ..elements.lazy import LazyNode, LazySource
+from ..exceptions import NotFoundError
+from .loader import Loader
+
+Pair = Tuple[Hashable, Hashable]
+
+
+class LazyEdge(NamedTuple):
+    """Edge of the source graph between the nodes `source` and `target`, from
+    the port `source_port` and to the port `target_port` of those nodes if they
+    are not `None`
+    """
+
+    source: Hashable
+    target: Hashable
+    data: Dict
+    source_port: Optional[Hashable] = None
+    target_port: Optional[Hashable] = None
+
+
+class LazyHierarchy(LazySource):
+    """Builds the nodes of a hierarchy only when their parent is expanded.
+
+    Nodes with children are built as :py:class:`~ipyelk.elements.LazyNode`
+    placeholders. An edge of the source graph is built once both its endpoints
+    are built, otherwise it is represented by a single `proxy_style` edge
+    between the closest built ancestors of its endpoints, for all the edges
+    between them.
+
+    :param nodes: element data of the nodes by key
+    :param hierarchy: index of the parent to child relations of the keys
+    :param edges: edges between the keys
+    :param labeled: give nodes without labels one with their id
+    :param loader: loader whose construction context the elements are built in
+        and whose layout defaults every new node, port and edge gets
+    """
+
+    proxy_style = "lazy-edge"
+
+    def __init__(
+        self,
+        nodes: Dict[Hashable, Dict],
+        hierarchy: HierarchyIndex,
+        edges: List[LazyEdge],
+        *,
+        labeled: bool = False,
+        loader: Optional[Loader] = None,
+    ):
+        self.data = nodes
+        self.hierarchy = hierarchy
+        self.edges = edges
+        self.labeled = labeled
+        self.loader = loader
+        # hierarchies loaded into the same diagram keep their ids apart
+        top = next((nodes[k] for k in nodes if hierarchy.parent(k) is None), None)
+        namespace = top.id if isinstance(top, Node) else (top or {}).get("id")
+        self.context = Registry(compact=True, prefix="_l", namespace=namespace or "")
+        self.nodes: Dict[Hashable, Node] = {}
+        self._incident: Dict[Hashable, List[int]] = defaultdict(list)
+        for i, edge in enumerate(edges):
+            self._incident[edge.source].append(i)
+            if edge.target != edge.source:
+                self._incident[edge.target].append(i)
+        # edges that are built and the proxies that stand in for the others
+        self._built: Dict[int, Tuple[Node, Edge]] = {}
+        self._proxies: Dict[Pair, Tuple[Node, Edge, Set[int]]] = {}
+        self._proxy_of: Dict[int, Pair] = {}
+
+    @classmethod
+    def from_nx(
+        cls, graph: nx.MultiDiGraph, hierarchy: nx.DiGraph, **kwargs
+    ) -> "LazyHierarchy":
+        """Source for a graph and a single rooted `hierarchy` of its nodes, with
+        `sourcePort`, `targetPort` or `port` keys in the edge data
+        """
+        nodes = {}
+        for n, d in hierarchy.nodes(data=True):
+            if isinstance(n, Node):
+                nodes[n] = n
+                continue
+            d = graph.nodes[n] if n in graph else d
+            nodes[n] = {**d, "id": str(n) if d.get("id") is None else d["id"]}
+        edges = []
+        for u, v, d in graph.edges(data=True):
+            port = d.get("port")
+            edges.append(
+                LazyEdge(u, v, d, d.get("sourcePort", port), d.get("targetPort", port))
+            )
+        return cls(nodes, HierarchyIndex.from_nx(hierarchy), edges, **kwargs)
+
+    @classmethod
+    def from_elkjson(cls, data: Dict, **kwargs) -> "LazyHierarchy":
+        """Source for elk json, with the nodes keyed by id"""
+        context = Registry(compact=True, prefix="_j", namespace=data.get("id") or "")
+        nodes = {}
+        pairs = []
+        ports = {}
+        raw_edges = []
+        stack = [(data, None)]
+        while stack:
+            node, parent = stack.pop()
+            key = node.get("id")
+            if key is None:
+                key = context.next_id()
+            nodes[key] = {
+                **{k: v for k, v in node.items() if k not in {"children", "edges"}},
+                "id": key,
+            }
+            if parent is not None:
+                pairs.append((parent, key))
+            for port in node.get("ports") or ():
+                if port.get("id") is not None:
+                    ports[port["id"]] = key
+            raw_edges.extend(node.get("edges") or ())
+            stack.extend((child, key) for child in reversed(node.get("children") or ()))
+
+        def end(edge: Dict, name: str) -> Tuple[Hashable, Optional[Hashable]]:
+            key = edge.get(name)
+            if key is None:
+                key = edge[f"{name}s"][0]
+            if key in nodes:
+                return key, None
+            if key in ports:
+                return ports[key], key
+            raise NotFoundError(f"Edge endpoint {key} is not in the elk json")
+
+        edges = []
+        for edge in raw_edges:
+            source, source_port = end(edge, "source")
+            target, target_port = end(edge, "target")
+            edges.append(LazyEdge(source, target, edge, source_port, target_port))
+        hierarchy = HierarchyIndex(pairs, nodes=[next(iter(nodes))])
+        return cls(nodes, hierarchy, edges, **kwargs)
+
+    def root(self) -> Node:
+        """Build the root node with its children"""
+        (key,) = (k for k in self.data if self.hierarchy.parent(k) is None)
+        root = self._build(key, None)
+        if isinstance(root, LazyNode):
+            root.expand()
+        elif self.hierarchy.children(key):
+            self._expand(key, root)
+        return root
+
+    def expand(self, node: LazyNode) -> List[Node]:
+        return self._expand(node._key, node)
+
+    def _expand(self, key: Hashable, node: Node) -> List[Node]:
+        keys = self.hierarchy.children(key)
+        children = [self._build(k, node) for k in keys]
+        node.children.extend(children)
+        for k, child in zip(keys, children):
+            if not isinstance(child, LazyNode) and self.hierarchy.children(k):
+                # nodes given as elements can not be placeholders
+                self._expand(k, child)
+        self._link(key)
+        return children
+
+    def _build(self, key: Hashable, parent: Optional[Node]) -> Node:
+        data = self.data[key]
+        count = len(self.hierarchy.children(key))
+        if isinstance(data, Node):
+            node = data
+            if node.id is None:
+                with self.context:
+                    node.id = node.get_id()
+            if self.labeled and parent is not None and not node.labels:
+                node.labels.append(Label(text=node.id))
+        else:
+            if self.labeled and parent is not None and not data.get("labels"):
+                data = {**data, "labels": [Label(text=data["id"])]}
+            with self._construction():
+                node = (LazyNode if count else Node)(**data)
+            if count:
+                node.defer(self, key, count)
+        if parent is not None:
+            node.set_parent(parent)
+        self.nodes[key] = node
+        self._apply_defaults(node)
+        return node
+
+    def _construction(self) -> ContextManager:
+        if self.loader is None:
+            return nullcontext()
+        return self.loader.construction()
+
+    def _apply_defaults(self, el: BaseElement):
+        if self.loader is not None:
+            self.loader.apply_layout_defaults(el)
+
+    def _closest(self, key: Hashable) -> Hashable:
+        """Closest built ancestor of the key, or the key itself"""
+        nodes = self.nodes
+        while key not in nodes:
+            key = self.hierarchy.parent(key)
+        return key
+
+    def _link(self, key: Hashable):
+        """Build or reroute the edges from and to the descendants of `key`"""
+        hierarchy = self.hierarchy
+        affected = set()
+        for k in hierarchy.subtree(key):
+            if k != key:
+                affected.update(self._incident.get(k, ()))
+
+        stale: Dict[Node, Set[int]] = defaultdict(set)
+        added: Dict[Node, List[Edge]] = defaultdict(list)
+        for i in sorted(affected):
+            if i in self._built:
+                continue
+            # drop the edge from the proxy that stands in for it
+            pair = self._proxy_of.pop(i, None)
+            if pair is not None:
+                owner, proxy, members = self._proxies[pair]
+                members.discard(i)
+                if not members:
+                    del self._proxies[pair]
+                    stale[owner].add(id(proxy))
+
+            edge = self.edges[i]
+            source = self._closest(edge.source)
+            target = self._closest(edge.target)
+            if source == edge.source and target == edge.target:
+                owner = self._owner(source, target)
+                built = self._build_edge(edge)
+                self._built[i] = owner, built
+                added[owner].append(built)
+            elif source != target:
+                pair = (source, target)
+                if pair not in self._proxies:
+                    owner = self._owner(source, target)
+                    with self._construction():
+                        proxy = Edge(
+                            id=self.context.next_id(),
+                            source=self.nodes[source],
+                            target=self.nodes[target],
+                        )
+                    proxy.add_class(self.proxy_style)
+                    self._proxies[pair] = owner, proxy, set()
+                    added[owner].append(proxy)
+                self._proxies[pair][2].add(i)
+                self._proxy_of[i] = pair
+
+        for owner, removed in stale.items():
+            owner.edges[:] = [e for e in owner.edges if id(e) not in removed]
+        for owner, edges in added.items():
+            owner.edges.extend(edges)
+            for edge in edges:
+                self._apply_defaults(edge)
+
+    def _owner(self, source: Hashable, target: Hashable) -> Node:
+        if source == target:
+            # self loops need to be owned by their parent
+            node = self.nodes[source]
+            return node.get_parent() or node
+        return self.nodes[self.hierarchy.lca(source, target)]
+
+    def _build_edge(self, edge: LazyEdge) -> Edge:
+        with self._construction():
+            return Edge(**{
+                **edge.data,
+                "id": edge.data.get("id") or self.context.next_id(),
+                "source": self._endpoint(edge.source, edge.source_port),
+                "target": self._endpoint(edge.target, edge.target_port),
+            })
+
+    def _endpoint(self, key: Hashable, port_key) -> HierarchicalElement:
+        node = self.nodes[key]
+        if port_key is None:
+            return node
+        if isinstance(port_key, Port):
+            return port_key
+        for port in node.ports:
+            if port.id == port_key or port.peek("properties").key == str(port_key):
+                return port
+        port = node.add_port(
+            Port(id=f"{node.id}.{self.context.next_id()}", width=5.0, height=5.0),
+            key=str(port_key),
+        )
+        self._apply_defaults(port)
+        return port
@@ -1,12 +1,13 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
-from typing import Dict, Optional
+from contextlib import nullcontext
+from typing import ContextManager, Dict, Optional
 
 import traitlets as T
 
 from ipyelk.elements.elements import BaseElement
 
-from ..elements import Edge, Label, Node, Port, index
+from ..elements import Edge, Label, Node, Port, index, trusted
 from ..elements import layout_options as opt
 from ..pipes import MarkElementWidget
 from ..tools import Tool
@@ -30,14 +31,24 @@ class Loader(Tool):
     default_label_opts: Optional[Dict[str, str]] = T.Dict(LABEL_OPTS, allow_none=True)
     default_port_opts: Optional[Dict[str, str]] = T.Dict(PORT_OPTS, allow_none=True)
     default_edge_opts: Optional[Dict[str, str]] = T.Dict(EDGE_OPTS, allow_none=True)
+    trusted: bool = T.Bool(
+        False, help="build elements without validating the loaded data"
+    )
 
     def load(self) -> MarkElementWidget:
         raise NotImplementedError("Subclasses should implement their behavior")
 
+    def construction(self) -> ContextManager:
+        """Context for building elements from the loaded data"""
+        return trusted if self.trusted else nullcontext()
+
     def apply_layout_defaults(self, root: Node) -> Node:
+        """Give elements without layout options the default options, which
+        are shared between the elements until they are changed
+        """
         for el in index.iter_elements(root):
-            if not el.layoutOptions:
-                el.layoutOptions = self.get_default_opts(el)
+            if not el.peek("layoutOptions"):
+                el.set_default_options(self.get_default_opts(el))
         return root
 
     def get_default_opts(self, element: BaseElement) -> Dict:
@@ -1,14 +1,28 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+from collections import defaultdict
 from collections.abc import Hashable
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 import networkx as nx
 import traitlets as T
 
 from ...diagram import Diagram
-from ...elements import HierarchicalIndex, Label, Node, Registry, index
+from ...elements import (
+    EMPTY_SENTINEL,
+    Edge,
+    HierarchicalElement,
+    HierarchicalIndex,
+    HierarchyIndex,
+    Label,
+    Node,
+    Port,
+    Registry,
+    index,
+)
+from ...elements.common import paused_gc
 from ...pipes import MarkElementWidget
+from ..lazy import LazyHierarchy
 from ..loader import Loader
 from .nxutils import (
     from_nx_node,
@@ -20,7 +34,28 @@ from .nxutils import (
 
 
 class NXLoader(Loader):
-    root_id: str = T.Unicode(allow_none=True)
+    root_id: str = T.Unicode(
+        allow_none=True,
+        help=(
+            "id of the root node, which also keeps the generated ids of graphs "
+            "loaded into the same diagram apart"
+        ),
+    )
+    bulk: bool = T.Bool(
+        False,
+        help=(
+            "build the elements of all nodes, ports and edges in batches, with "
+            "their ids and defaults, instead of one at a time"
+        ),
+    )
+
+    lazy: bool = T.Bool(
+        False,
+        help=(
+            "only build the children of nodes when they are expanded, see "
+            ":py:class:`~ipyelk.elements.LazyNode`"
+        ),
+    )
 
     def load(
         self,
@@ -28,20 +63,25 @@ class NXLoader(Loader):
         hierarchy: Optional[nx.DiGraph] = None,
     ) -> MarkElementWidget:
         hierarchy = process_hierarchy(graph, hierarchy)
+        if self.lazy:
+            return MarkElementWidget(value=self.load_lazy(graph, hierarchy))
+        if self.bulk:
+            return MarkElementWidget(value=self.build(graph, hierarchy))
 
         # add graph nodes
         nx_node_map: Dict[Node, Hashable] = {}
-        for n in graph.nodes():
-            el = from_nx_node(n, graph)
-            nx_node_map[el] = n
-
-        # add hierarchy nodes
-        for n in hierarchy.nodes():
-            if n not in graph:
-                el = from_nx_node(n, hierarchy)
+        with self.construction():
+            for n in graph.nodes():
+                el = from_nx_node(n, graph)
                 nx_node_map[el] = n
 
-        context = Registry()
+            # add hierarchy nodes
+            for n in hierarchy.nodes():
+                if n not in graph:
+                    el = from_nx_node(n, hierarchy)
+                    nx_node_map[el] = n
+
+        context = Registry(compact=True, prefix="_n", namespace=self.root_id or "")
         with context:
             el_map = HierarchicalIndex.from_els(*nx_node_map.keys())
 
@@ -51,10 +91,13 @@ class NXLoader(Loader):
                 child = v if isinstance(v, Node) else el_map.get(v)
                 parent.add_child(child)
 
-            # add element edges
+            # add element edges, owned by the lowest common ancestor of their
+            # endpoints
+            ancestors = HierarchyIndex.from_nx(hierarchy)
             for u, v, d in graph.edges(data=True):
-                edge = process_endpoints(u, v, d, el_map)
-                owner = get_owner(edge, hierarchy, el_map, nx_node_map)
+                with self.construction():
+                    edge = process_endpoints(u, v, d, el_map)
+                owner = get_owner(edge, ancestors, el_map, nx_node_map)
                 owner.edges.append(edge)
 
             root: Node = get_root(hierarchy)
@@ -75,6 +118,224 @@ class NXLoader(Loader):
             value=self.apply_layout_defaults(root),
         )
 
+    def load_lazy(self, graph: nx.MultiDiGraph, hierarchy: nx.DiGraph) -> Node:
+        """Build the root and its children, leaving the children of nodes
+        further down to be built when they are expanded
+
+        :param graph: graph of edges
+        :param hierarchy: tree of nodes from :py:func:`process_hierarchy`
+        :return: root node
+        """
+        top = get_root(hierarchy)
+        if isinstance(top, Node) and top.id is None:
+            top.id = self.root_id
+        source = LazyHierarchy.from_nx(
+            graph,
+            hierarchy,
+            labeled=True,
+            loader=self,
+        )
+        return source.root()
+
+    @paused_gc()
+    def build(self, graph: nx.MultiDiGraph, hierarchy: nx.DiGraph) -> Node:
+        """Build the diagram in one pass over the nodes, the hierarchy and the
+        edges of the graph.
+
+        Elements are created with their ids, default labels and shared default
+        layout options in place rather than updating them afterwards,
+        endpoints are looked up by their networkx node, and the edges are
+        assigned to their owners in one batch per owner. Port keys are resolved
+        against the keys and ids of the ports of the endpoint node, otherwise a
+        new port is added for the key. Garbage collection is paused while the
+        elements are created.
+
+        :param graph: graph of edges
+        :param hierarchy: tree of nodes from :py:func:`process_hierarchy`
+        :return: root node
+        """
+        context = Registry(compact=True, prefix="_n", namespace=self.root_id or "")
+        top = get_root(hierarchy)
+        opts = {
+            "root": self.default_root_opts or {},
+            "node": self.default_node_opts or {},
+            "port": self.default_port_opts or {},
+            "label": self.default_label_opts or {},
+            "edge": self.default_edge_opts or {},
+        }
+
+        with self.construction():
+            nodes, instances = _build_nodes(graph, hierarchy, top, context, opts)
+        root = nodes[top]
+        with context:
+            self._complete_instances(root, instances, opts)
+            for node in nodes.values():
+                for label in node.labels:
+                    _complete(label, context, opts["label"])
+
+        # nest elements based on hierarchical edges
+        children: Dict[Node, List[Node]] = defaultdict(list)
+        for u, v in hierarchy.edges():
+            children[nodes[u]].append(nodes[v].set_parent(nodes[u]))
+        for parent, kids in children.items():
+            parent.children.extend(kids)
+
+        # add element edges, owned by the lowest common ancestor of their
+        # endpoints
+        ancestors = HierarchyIndex(
+            ((parent, child) for parent, kids in children.items() for child in kids),
+            nodes=[root],
+        )
+        ports = _Ports(context, opts["port"])
+        owned: Dict[Node, List[Edge]] = defaultdict(list)
+        with self.construction():
+            for u, v, d in graph.edges(data=True):
+                source, target = nodes[u], nodes[v]
+                edge = _build_edge(
+                    d,
+                    ports.endpoint(source, _port_key(d, "source")),
+                    ports.endpoint(target, _port_key(d, "target")),
+                    context,
+                    opts,
+                )
+                owned[_owner(ancestors, source, target)].append(edge)
+
+        ports.attach()
+        for owner, edges in owned.items():
+            owner.edges.extend(edges)
+        return root
+
+    def _complete_instances(self, root: Node, instances: List[Node], opts: Dict):
+        """Complete the elements passed as nodes as in `load`"""
+        if root.id is None and self.root_id is not None:
+            root.id = self.root_id
+        for node in instances:
+            if not node.labels and node is not root:
+                node.labels.append(Label(text=node.get_id()))
+            for el in index.iter_elements(node):
+                el.id = el.get_id()
+                if el.peek("layoutOptions"):
+                    continue
+                if el is node:
+                    el.set_default_options(opts["root" if el is root else "node"])
+                else:
+                    el.set_default_options(self.get_default_opts(el))
+
+
+def _build_nodes(
+    graph: nx.MultiDiGraph,
+    hierarchy: nx.DiGraph,
+    top: Hashable,
+    context: Registry,
+    opts: Dict,
+) -> Tuple[Dict[Hashable, Node], List[Node]]:
+    """Nodes of the hierarchy by their networkx node, with their ids, default
+    labels and layout options
+
+    :return: nodes by networkx node and the nodes that were passed as elements
+    """
+    nodes: Dict[Hashable, Node] = {}
+    instances: List[Node] = []
+    for n, d in hierarchy.nodes(data=True):
+        if isinstance(n, Node):
+            nodes[n] = n
+            instances.append(n)
+            continue
+        data = graph.nodes[n] if n in graph else d
+        node_id = data.get("id")
+        if node_id is None:
+            node_id = str(n)
+        data = {**data, "id": node_id}
+        if n != top:
+            data["labels"] = data.get("labels") or [
+                Label(id=context.next_id(), text=node_id).set_default_options(
+                    opts["label"]
+                )
+            ]
+        node = nodes[n] = Node(**data)
+        if not node.peek("layoutOptions"):
+            node.set_default_options(opts["root" if n == top else "node"])
+    return nodes, instances
+
+
+class _Ports:
+    """Resolve port keys against the keys and ids of the ports of endpoint
+    nodes, collecting new ports for unknown keys
+    """
+
+    def __init__(self, context: Registry, opts: Dict):
+        self.context = context
+        self.opts = opts
+        self.keyed: Dict[Node, Dict[str, Port]] = {}
+        self.added: Dict[Node, List[Port]] = defaultdict(list)
+
+    def endpoint(self, node: Node, key) -> HierarchicalElement:
+        if key is EMPTY_SENTINEL:
+            return node
+        if isinstance(key, Port):
+            assert key.get_parent() is node, "Expected port parent to be given endpoint"
+            return key
+        key = str(key)
+        keyed = self.keyed.get(node)
+        if keyed is None:
+            keyed = self.keyed[node] = {}
+            for port in node.ports:
+                keyed.setdefault(port.id, port)
+                keyed.setdefault(port.peek("properties").key, port)
+        port = keyed.get(key)
+        if port is None:
+            port = keyed[key] = Port(
+                id=f"{node.id}.{self.context.next_id()}",
+                width=5.0,
+                height=5.0,
+                properties={"key": key},
+            ).set_default_options(self.opts)
+            self.added[node].append(port.set_parent(node))
+        return port
+
+    def attach(self):
+        """Add the new ports to their nodes in one batch per node"""
+        for node, added in self.added.items():
+            node.ports.extend(added)
+
+
+def _port_key(data: Dict, name: str):
+    return data.get(f"{name}Port", data.get("port", EMPTY_SENTINEL))
+
+
+def _owner(ancestors: HierarchyIndex, source: Node, target: Node) -> Node:
+    if source is target:
+        # self loops need to be owned by their parent
+        return source.get_parent() or source
+    return ancestors.lca(source, target)
+
+
+def _build_edge(
+    data: Dict,
+    source: HierarchicalElement,
+    target: HierarchicalElement,
+    context: Registry,
+    opts: Dict,
+) -> Edge:
+    edge = Edge(**{
+        **data,
+        "source": source,
+        "target": target,
+        "id": data.get("id") or context.next_id(),
+    })
+    if not edge.peek("layoutOptions"):
+        edge.set_default_options(opts["edge"])
+    for label in edge.labels:
+        _complete(label, context, opts["label"])
+    return edge
+
+
+def _complete(label: Label, context: Registry, opts: Dict):
+    if label.id is None:
+        label.id = context.next_id()
+    if not label.peek("layoutOptions"):
+        label.set_default_options(opts)
+
 
 def from_nx(graph, hierarchy=None, **kwargs):
     diagram = Diagram(
@@ -2,7 +2,7 @@
 # Distributed under the terms of the Modified BSD License.
 
 from collections.abc import Hashable, Iterator
-from typing import Dict, Optional
+from typing import Dict, Optional, Union
 
 import networkx as nx
 
@@ -11,6 +11,7 @@ from ...elements import (
     Edge,
     HierarchicalElement,
     HierarchicalIndex,
+    HierarchyIndex,
     Node,
     Port,
 )
@@ -170,7 +171,7 @@ def as_in_hierarchy(
 
 
 def lca(
-    hierarchy: nx.DiGraph,
+    hierarchy: Union[nx.DiGraph, HierarchyIndex],
     node1: HierarchicalElement,
     node2: HierarchicalElement,
     el_map: HierarchicalIndex,
@@ -180,7 +181,8 @@ def lca(
     is used to assign the correct edge owner based on it's source and target
     endpoints
 
-    :param hierarchy: networkx tree hierarchy of nodes
+    :param hierarchy: networkx tree hierarchy of nodes, or its
+        :py:class:`~ipyelk.elements.HierarchyIndex` to answer many queries
     :param node1: node one
     :param node2: node two
     :param el_map: element map of string ids to nodes
@@ -196,6 +198,8 @@ def lca(
         else:
             node = node1
         ancestor = node.get_parent()
+    elif isinstance(hierarchy, HierarchyIndex):
+        ancestor = hierarchy.lca(node1, node2)
     else:
         ancestor = nx.lowest_common_ancestor(hierarchy, node1, node2)
     if not isinstance(ancestor, HierarchicalElement):
@@ -205,7 +209,7 @@ def lca(
 
 def get_owner(
     edge: Edge,
-    hierarchy: nx.DiGraph,
+    hierarchy: Union[nx.DiGraph, HierarchyIndex],
     el_map: HierarchicalIndex,
     nx_node_map: Optional[Dict[Node, Hashable]] = None,
 ) -> Node:
@@ -2,7 +2,10 @@
 # Distributed under the terms of the Modified BSD License.
 
 from .base import Pipe, PipeDisposition, SyncedInletPipe, SyncedOutletPipe, SyncedPipe
-from .elkjs import ElkJS
+from .batch import BatchLayout
+from .elkjs import ElkJS, LayoutPipe
+from .headless import ElkWorkerPool, HeadlessElkJS
+from .layered import LayeredLayout
 from .marks import MarkElementWidget, MarkIndex
 from .pipeline import Pipeline
 from .text_sizer import BrowserTextSizer, TextSizer
@@ -10,8 +13,13 @@ from .valid import ValidationPipe
 from .visibility import VisibilityPipe
 
 __all__ = [
+    "BatchLayout",
     "BrowserTextSizer",
     "ElkJS",
+    "ElkWorkerPool",
+    "HeadlessElkJS",
+    "LayeredLayout",
+    "LayoutPipe",
     "MarkElementWidget",
     "MarkIndex",
     "Pipe",
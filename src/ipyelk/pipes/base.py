@@ -1,7 +1,6 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
 import asyncio
-import re
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Callable, Optional, Tuple
@@ -10,7 +9,9 @@ import ipywidgets as W
 import traitlets as T
 from ipywidgets.widgets.trait_types import TypedTuple
 
+from .flows import FlowMatcher, compile_flows
 from .marks import MarkElementWidget
+from .scheduler import RunScheduler
 
 
 class PipeDisposition(Enum):
@@ -24,6 +25,8 @@ class PipeStatus(W.Widget):
     disposition = T.Instance(PipeDisposition, default_value=PipeDisposition.done)
     elapsed: Optional[timedelta] = T.Instance(timedelta, allow_none=True)
     exception = T.Instance(Exception, allow_none=True)
+    cache_hits: Optional[int] = T.Int(default_value=None, allow_none=True)
+    cache_misses: Optional[int] = T.Int(default_value=None, allow_none=True)
     _task: asyncio.Future = None
 
     STEPS = {
@@ -119,6 +122,15 @@ class PipeStatusView(W.VBox):
     def update_children(self, pipe: "Pipe"):
         self.children = [self.html]
 
+    def cache_info(self, status: PipeStatus) -> str:
+        if status.cache_hits is None:
+            return ""
+        return (
+            '<span class="elk-pipe-cache">'
+            f"cache {status.cache_hits} hits {status.cache_misses} misses"
+            "</span>"
+        )
+
     def update(self, pipe: "Pipe"):
         """Method to update the status given changes in the pipe."""
         error = ""
@@ -137,6 +149,7 @@ class PipeStatusView(W.VBox):
             '<span class="elk-pipe-elapsed">{elapsed}</span>'
             '<span class="elk-pipe-status">{status}</span>'
             '<span class="elk-pipe-name">{name}</span>'
+            "{cache}"
             "{error}"
             "</pre>"
         ).format(
@@ -146,6 +159,7 @@ class PipeStatusView(W.VBox):
             name=pipe.__class__.__name__,
             title=pipe.__class__,
             css_cls=f"elk-pipe elk-pipe-disposition-{status.disposition.value}",
+            cache=self.cache_info(status),
             error=error,
         )
         self.html.value = value
@@ -174,6 +188,11 @@ class Pipe(W.Widget):
         Widget to show pipe status as it updates.
     enabled: bool
         whether the processing step can be run
+    debounce: float
+        seconds to wait for further requests before a scheduled run
+    timeout: float
+        seconds after which a scheduled run is taken to be stuck and a new
+        request cancels it, or `None` to always wait for it
 
     """
 
@@ -183,7 +202,10 @@ class Pipe(W.Widget):
     observes: Tuple[str] = TypedTuple(T.Unicode(), kw={})
     reports: Tuple[str] = TypedTuple(T.Unicode(), kw={})
     on_progress: Optional[Callable] = T.Any(allow_none=True)
+    debounce: float = T.Float(default_value=0.0)
+    timeout: Optional[float] = T.Float(default_value=30.0, allow_none=True)
     _task: asyncio.Future = None
+    _scheduler: RunScheduler = None
     status: PipeStatus = T.Instance(PipeStatus, kw={})
     status_widget: W.DOMWidget = T.Instance(W.DOMWidget, allow_none=True)
 
@@ -206,15 +228,42 @@ class Pipe(W.Widget):
             raise NotImplementedError
         return self.status_widget._repr_mimebundle_(**kwargs)
 
-    def schedule_run(self, change: T.Bunch = None) -> asyncio.Task:
-        """Schedule rerunning the pipe on the event loop."""
-        # schedule task on loop
-        if self._task:
-            self._task.cancel()
-        self._task = asyncio.create_task(self.run())
+    @property
+    def scheduler(self) -> RunScheduler:
+        if self._scheduler is None:
+            self._scheduler = RunScheduler(
+                self, debounce=self.debounce, timeout=self.timeout
+            )
+        return self._scheduler
+
+    @T.observe("debounce", "timeout")
+    def _update_scheduler(self, change: T.Bunch):
+        if self._scheduler is not None:
+            setattr(self._scheduler, change.name, change.new)
+
+    def cancel(self):
+        """Cancel the run in flight and the runs scheduled after it"""
+        if self._scheduler is not None:
+            self._scheduler.cancel()
 
-        self._task.add_done_callback(self._post_run)
-        return self._task
+    def close(self):
+        self.cancel()
+        super().close()
+
+    def schedule_run(self, change: T.Bunch = None) -> asyncio.Future:
+        """Schedule rerunning the pipe on the event loop.
+
+        Requests made before the run starts are merged into it, with their
+        inlet flows, and requests made while it is in flight are queued for
+        the next run.
+
+        :return: future of the run, shared by the requests merged into it
+        """
+        future = self.scheduler.request()
+        if future is not self._task:
+            self._task = future
+            future.add_done_callback(self._post_run)
+        return future
 
     def _post_run(self, future: asyncio.Future):
         try:
@@ -233,6 +282,11 @@ class Pipe(W.Widget):
         # do work
         self.outlet.value = self.inlet.value
 
+    @property
+    def flow_matcher(self) -> FlowMatcher:
+        """Compiled matcher of the flows this pipe observes"""
+        return compile_flows(tuple(self.observes))
+
     def check_dirty(self) -> bool:
         """Method to test is this pipe should be run given the set of changes.
 
@@ -241,7 +295,7 @@ class Pipe(W.Widget):
         """
         flow = self.inlet.flow
 
-        if any(any(re.match(f"^{obs}$", f) for f in flow) for obs in self.observes):
+        if self.flow_matcher.any(flow):
             # mark this pipe as dirty so will run
             self.status = PipeStatus.waiting()
             # add this pipes reporting to the outlet flow
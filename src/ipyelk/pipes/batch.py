@@ -0,0 +1,97 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from datetime import datetime
+from typing import List, Tuple
+
+import traitlets as T
+from ipywidgets.widgets.trait_types import TypedTuple
+
+from ..elements import Node, Registry, convert_elkjson, serialize_element, trusted
+from .base import Pipe, PipeDisposition, PipeStatus
+from .elkjs import LayoutPipe
+from .headless import HeadlessElkJS
+
+
+class BatchLayout(Pipe):
+    """Lay out many independent diagrams concurrently with a layout engine.
+
+    The graphs are handed to the engine in chunks: a
+    :py:class:`~ipyelk.pipes.HeadlessElkJS` engine spreads them over its worker
+    processes, an :py:class:`~ipyelk.pipes.ElkJS` engine sends each chunk to
+    the browser in a single message and a
+    :py:class:`~ipyelk.pipes.LayeredLayout` engine runs them on its executor.
+    Progress is reported through `on_progress` after every chunk, e.g. to
+    :py:meth:`~ipyelk.tools.PipelineProgressBar.update`.
+
+    Attributes
+    ----------
+    engine: :py:class:`~ipyelk.pipes.LayoutPipe`
+        layout engine
+    roots: tuple of :py:class:`~ipyelk.elements.Node`
+        diagrams to lay out
+    results: tuple of :py:class:`~ipyelk.elements.Node`
+        laid out diagrams, in the order of `roots`
+    chunk_size: int
+        number of diagrams sent to the engine at once
+    completed: int
+        number of diagrams laid out so far
+
+    """
+
+    engine: LayoutPipe = T.Instance(LayoutPipe)
+    roots: Tuple[Node] = TypedTuple(T.Instance(Node), kw={})
+    results: Tuple[Node] = TypedTuple(T.Instance(Node), kw={})
+    chunk_size: int = T.Int(default_value=32, min=1)
+    completed: int = T.Int(default_value=0)
+
+    @T.default("engine")
+    def _default_engine(self):
+        return HeadlessElkJS()
+
+    async def run(self):
+        start_time = datetime.now()
+        self.completed = 0
+        self.status_update(PipeStatus.running())
+        results: List[Node] = []
+        try:
+            for start in range(0, len(self.roots), self.chunk_size):
+                chunk = self.roots[start : start + self.chunk_size]
+                results.extend(await self._layout_chunk(chunk))
+                self.completed += len(chunk)
+                self.status_update(PipeStatus.running())
+        except Exception as E:
+            self.status_update(PipeStatus.error(start_time, E))
+            raise
+        self.results = tuple(results)
+        self.status_update(PipeStatus.finished(start_time))
+
+    async def _layout_chunk(self, chunk: Tuple[Node, ...]) -> List[Node]:
+        # every diagram gets its own compact ids
+        contexts = [Registry(compact=True) for _ in chunk]
+        graphs = []
+        for root, context in zip(chunk, contexts):
+            with context:
+                graphs.append(serialize_element(root))
+        laid_out = await self.engine.layout_many(graphs)
+        results = []
+        for data, context in zip(laid_out, contexts):
+            with context, trusted:
+                results.append(convert_elkjson(data))
+        return results
+
+    async def layout(self, *roots: Node) -> List[Node]:
+        """Lay out the diagrams and return the laid out copies
+
+        :param roots: diagrams to lay out
+        :return: laid out diagrams in the same order
+        """
+        self.roots = roots
+        await self.run()
+        return list(self.results)
+
+    def get_progress_value(self) -> float:
+        if self.status.disposition == PipeDisposition.done:
+            return 1.0
+        if not self.roots:
+            return 0.0
+        return self.completed / len(self.roots)
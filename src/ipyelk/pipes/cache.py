@@ -0,0 +1,129 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import traitlets as T
+
+from ..elements import Edge, Node, index
+from ..elements.elements import ShapeElement
+
+# elk json keys that can change the result of a layout
+STRUCTURE_KEYS = (
+    "id",
+    "width",
+    "height",
+    "layoutOptions",
+    "children",
+    "ports",
+    "labels",
+    "edges",
+    "sources",
+    "targets",
+)
+SHAPE_KEYS = ("x", "y", "width", "height")
+
+Layout = Dict[str, Dict]
+
+
+def structure(data: Dict) -> Dict:
+    """Subset of the elk json that is relevant for the layout"""
+    result = {}
+    for key in STRUCTURE_KEYS:
+        value = data.get(key)
+        if value is None:
+            continue
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            value = [structure(v) for v in value]
+        elif key in SHAPE_KEYS:
+            # sizes that were given as ints come back from a layout as floats
+            value = float(value)
+        result[key] = value
+    return result
+
+
+def structure_hash(data: Dict) -> str:
+    """Content hash of the layout relevant parts of the elk json"""
+    text = json.dumps(structure(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def extract_layout(root: Node) -> Layout:
+    """Collect the layout results of the elements by id"""
+    layout = {}
+    for el in index.iter_elements(root):
+        key = el.get_id()
+        if key is None:
+            continue
+        if isinstance(el, ShapeElement):
+            layout[key] = {attr: getattr(el, attr) for attr in SHAPE_KEYS}
+        elif isinstance(el, Edge) and el.sections is not None:
+            layout[key] = {"sections": [s.dict(exclude_none=True) for s in el.sections]}
+    return layout
+
+
+def apply_layout(data: Dict, layout: Layout) -> Dict:
+    """Update the elk json in place with the cached layout results"""
+    stack = [data]
+    while stack:
+        el = stack.pop()
+        result = layout.get(el.get("id"))
+        if result:
+            el.update(result)
+        for key in ("children", "ports", "labels", "edges"):
+            stack.extend(el.get(key) or [])
+    return data
+
+
+class LayoutCache(T.HasTraits):
+    """Least recently used cache of layout results keyed by the structural hash
+    of the elk json that was laid out.
+
+    Attributes
+    ----------
+    maxsize: int
+        number of layouts to keep, `0` disables the cache
+    hits: int
+        number of lookups that found a layout
+    misses: int
+        number of lookups that did not find a layout
+
+    """
+
+    maxsize: int = T.Int(default_value=32, min=0)
+    hits: int = T.Int(default_value=0)
+    misses: int = T.Int(default_value=0)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._layouts: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._layouts)
+
+    def get(self, key: str) -> Optional[Layout]:
+        layout = self._layouts.get(key)
+        if layout is None:
+            self.misses += 1
+        else:
+            self._layouts.move_to_end(key)
+            self.hits += 1
+        return layout
+
+    def put(self, key: str, layout: Layout):
+        if not self.maxsize:
+            return
+        self._layouts[key] = layout
+        self._layouts.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        self._layouts.clear()
+        self.hits = self.misses = 0
+
+    @T.observe("maxsize")
+    def _evict(self, change=None):
+        while len(self._layouts) > self.maxsize:
+            self._layouts.popitem(last=False)
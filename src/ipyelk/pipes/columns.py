@@ -0,0 +1,153 @@
+"""Columnar transport of layout results as packed binary buffers.
+
+The geometry of a laid out elk json tree is sent as
+
+* ``shapes``: ids of nodes, ports and labels, in the order of the ``geometry``
+  buffer of float64 ``x, y, width, height`` rows (`NaN` for missing values)
+* ``edges``: ids of edges and, aligned with them, ``sections``: the list of
+  section fields without their points for every edge
+* a uint32 ``counts`` buffer with the number of points of every section and a
+  float64 ``points`` buffer of the ``x, y`` pairs of all start, bend and end
+  points
+"""
+
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import math
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from ..elements import ElementIndex
+from ..elements.common import object_setattr, paused_gc
+from ..elements.elements import EdgeSection, construct
+from ..elements.shapes import Point
+from .patch import NESTED
+
+if TYPE_CHECKING:
+    from ..elements.geometry import GeometryStore
+
+SHAPE_KEYS = ("x", "y", "width", "height")
+POINT_KEYS = ("startPoint", "bendPoints", "endPoint")
+
+
+def pack_layout(data: Dict) -> Tuple[Dict, List[bytes]]:
+    """Pack the geometry of laid out elk json
+
+    :param data: laid out elk json
+    :return: header and buffers
+    """
+    shapes, edges, sections = [], [], []
+    geometry, counts, points = array("d"), array("I"), array("d")
+    stack = [data]
+    while stack:
+        el = stack.pop()
+        if "sources" in el:
+            edges.append(el["id"])
+            fields = []
+            for section in el.get("sections") or []:
+                fields.append({k: v for k, v in section.items() if k not in POINT_KEYS})
+                section_points = [
+                    section["startPoint"],
+                    *(section.get("bendPoints") or []),
+                    section["endPoint"],
+                ]
+                counts.append(len(section_points))
+                for point in section_points:
+                    points.extend((point["x"], point["y"]))
+            sections.append(fields)
+        else:
+            shapes.append(el["id"])
+            geometry.extend(_float(el.get(key)) for key in SHAPE_KEYS)
+        for key in NESTED:
+            stack.extend(el.get(key) or [])
+    header = {"shapes": shapes, "edges": edges, "sections": sections}
+    return header, [geometry.tobytes(), counts.tobytes(), points.tobytes()]
+
+
+def apply_columns(elements: ElementIndex, header: Dict, buffers: List) -> None:
+    """Set the packed geometry on the indexed elements in place, without
+    validation, or in their :py:class:`~ipyelk.elements.GeometryStore` if they
+    are bound to one. Garbage collection is paused while the edge sections are
+    created, as the many new objects would otherwise trigger full collections
+    of the whole diagram.
+
+    :param elements: index of the elements that were laid out
+    :param header: ids and section fields from :py:func:`pack_layout`
+    :param buffers: geometry, counts and points buffers
+    """
+    geometry = _cast(buffers[0], "d")
+    counts = _cast(buffers[1], "I")
+    points = _cast(buffers[2], "d")
+
+    stored: Dict[GeometryStore, Tuple[List, List[int]]] = {}
+    for i, key in enumerate(header["shapes"]):
+        el = elements.get(key)
+        store = el._store
+        if store is not None and store.holds(el):
+            els, rows = stored.setdefault(store, ([], []))
+            els.append(el)
+            rows.append(i)
+            continue
+        row = geometry[4 * i : 4 * i + 4]
+        el.__dict__.update(zip(SHAPE_KEYS, map(_value, row)))
+        el.__fields_set__.update(SHAPE_KEYS)
+
+    if stored:
+        # elements bound to a geometry store are updated in one go per store
+        import numpy as np
+
+        table = np.frombuffer(geometry, dtype="d").reshape(-1, len(SHAPE_KEYS))
+        for store, (els, rows) in stored.items():
+            store.update(els, table[rows])
+            for el in els:
+                el.__fields_set__.update(SHAPE_KEYS)
+
+    with paused_gc():
+        _apply_sections(elements, header, counts, points)
+
+
+def _apply_sections(
+    elements: ElementIndex, header: Dict, counts: memoryview, points: memoryview
+):
+    section_index = 0
+    offset = 0
+    for key, fields in zip(header["edges"], header["sections"]):
+        el = elements.get(key)
+        sections = []
+        for data in fields:
+            count = counts[section_index]
+            section_index += 1
+            xy = points[offset : offset + 2 * count]
+            offset += 2 * count
+            pairs = list(map(_point, xy[0::2], xy[1::2]))
+            data = dict(
+                data,
+                startPoint=pairs[0],
+                bendPoints=pairs[1:-1] or None,
+                endPoint=pairs[-1],
+            )
+            sections.append(construct(EdgeSection.__new__(EdgeSection), data))
+        el.__dict__["sections"] = sections
+        el.__fields_set__.add("sections")
+
+
+def _point(x: float, y: float) -> Point:
+    point = Point.__new__(Point)
+    object_setattr(point, "__dict__", {"x": x, "y": y})
+    object_setattr(point, "__fields_set__", {"x", "y"})
+    return point
+
+
+def _float(value) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _value(value: float):
+    return None if math.isnan(value) else value
+
+
+def _cast(buffer, fmt: str) -> memoryview:
+    view = memoryview(buffer).cast("B")
+    if not len(view):
+        return memoryview(array(fmt))
+    return view.cast(fmt)
@@ -1,17 +1,117 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import asyncio
+from itertools import count
+from typing import Dict, List, Optional
+
 import traitlets as T
 from ipywidgets.widgets.trait_types import TypedTuple
 
 from ..constants import EXTENSION_NAME, EXTENSION_SPEC_VERSION
+from ..elements import (
+    ElementIndex,
+    GeometryStore,
+    convert_elkjson,
+    serialize_element,
+    trusted,
+)
+from ..exceptions import LayoutError
 from . import flows as F
-from .base import SyncedPipe
+from .base import Pipe, PipeStatus, SyncedPipe
+from .cache import LayoutCache, apply_layout, extract_layout, structure_hash
+from .columns import apply_columns
+from .tracing import json_bytes, tracer
 from .util import wait_for_change
 
 
-class ElkJS(SyncedPipe):
+class LayoutPipe(Pipe):
+    """Base pipe for layout engines that reuses previous layout results of the
+    same graph structure.
+
+    Attributes
+    ----------
+    cache: :py:class:`~ipyelk.pipes.cache.LayoutCache`
+        previous layout results
+
+    """
+
+    observes = TypedTuple(T.Unicode(), default_value=(F.Anythinglayout,))
+    reports = TypedTuple(T.Unicode(), default_value=(F.Layout,))
+    cache: LayoutCache = T.Instance(LayoutCache, kw={})
+
+    async def run(self):
+        # watch once
+        if self.outlet is None:
+            return
+
+        key = data = None
+        if self.inlet.value is not None and self.cache.maxsize:
+            with tracer.span("serialize", "serialize"):
+                data = self.serialize_inlet()
+            with tracer.span("hash", "cache"):
+                key = structure_hash(data)
+            layout = self.cache.get(key)
+            self._refresh_cache_status()
+            tracer.annotate(cached=layout is not None)
+            if layout is not None:
+                # reuse the previous layout without running the engine
+                span = tracer.span("apply cached layout", "deserialize")
+                with span, self.inlet.index.context, trusted:
+                    data = apply_layout(data, layout)
+                    self.outlet.value = convert_elkjson(data)
+                self.outlet.persist()
+                return
+
+        await self.layout(data)
+        self.outlet.persist()
+        if key is not None:
+            with self.outlet.index.context:
+                self.cache.put(key, extract_layout(self.outlet.value))
+
+    async def layout(self, data: Optional[Dict]):
+        """Lay out the inlet and set the outlet value
+
+        :param data: serialized inlet, if it was already needed for the cache
+        """
+        raise NotImplementedError("Subclasses should implement their behavior")
+
+    async def layout_many(self, graphs: List[Dict]) -> List[Dict]:
+        """Lay out independent elk json graphs concurrently
+
+        :param graphs: elk json of root nodes
+        :return: laid out elk json in the same order
+        """
+        raise NotImplementedError("Subclasses should implement their behavior")
+
+    def serialize_inlet(self) -> Dict:
+        with self.inlet.index.context:
+            return serialize_element(self.inlet.value)
+
+    @T.observe("status")
+    def _update_cache_status(self, change):
+        self._copy_cache_counts(change.new)
+
+    def _refresh_cache_status(self):
+        """Show the counts of the latest lookup in the current status"""
+        status = self.status
+        self._copy_cache_counts(status)
+        self._notify_trait("status", status, status)
+
+    def _copy_cache_counts(self, status: PipeStatus):
+        status.cache_hits = self.cache.hits
+        status.cache_misses = self.cache.misses
+
+
+class ElkJS(SyncedPipe, LayoutPipe):
     """Jupyterlab widget for calling `elkjs <https://github.com/kieler/elkjs>`_
     layout given a valid elkjson dictionary
+
+    Attributes
+    ----------
+    binary: bool
+        return the layout geometry as packed binary buffers, which are applied
+        to a copy of the inlet, instead of a full elk json tree
+
     """
 
     _model_name = T.Unicode("ELKLayoutModel").tag(sync=True)
@@ -19,18 +119,92 @@ class ElkJS(SyncedPipe):
     _model_module_version = T.Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
     _view_module = T.Unicode(EXTENSION_NAME).tag(sync=True)
 
-    observes = TypedTuple(T.Unicode(), default_value=(F.Anythinglayout,))
-    reports = TypedTuple(T.Unicode(), default_value=(F.Layout,))
+    binary: bool = T.Bool(default_value=False).tag(sync=True)
 
-    async def run(self):
-        # watch once
-        if self.outlet is None:
-            return
+    _columns: Optional[asyncio.Future] = None
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._batches: Dict[int, asyncio.Future] = {}
+        self._batch_ids = count()
+        self.on_msg(self._handle_batch_result)
+        self.on_msg(self._handle_columns)
+
+    async def layout(self, data: Optional[Dict]):
+        if self.binary:
+            await self.layout_columns(data)
+            return
         # signal to browser and wait for done
         future_value = wait_for_change(self.outlet, "value")
-        self.send({"action": "run"})
+        # the round trip includes the transfer of the result and the layout in
+        # the browser, the result is deserialized before it completes
+        with tracer.span("browser", "browser"):
+            self.send({"action": "run"})
 
-        # wait to return until
-        await future_value
-        self.outlet.persist()
+            # wait to return until
+            await future_value
+
+    async def layout_many(self, graphs: List[Dict]) -> List[Dict]:
+        """Send all graphs to the browser in a single message"""
+        batch = next(self._batch_ids)
+        future = self._batches[batch] = asyncio.get_running_loop().create_future()
+        try:
+            with tracer.span(
+                "browser", "browser", graphs=len(graphs), bytes=json_bytes(graphs)
+            ):
+                self.send({"action": "run_batch", "batch": batch, "graphs": graphs})
+                results, errors = await future
+        finally:
+            self._batches.pop(batch, None)
+        for error in errors:
+            if error:
+                raise LayoutError(error)
+        return results
+
+    def _handle_batch_result(self, _, content, buffers):
+        if content.get("action") != "batch_result":
+            return
+        future = self._batches.get(content.get("batch"))
+        if future is not None and not future.done():
+            future.set_result((content["results"], content["errors"]))
+
+    async def layout_columns(self, data: Optional[Dict] = None):
+        """Lay out the inlet in the browser and apply the returned geometry
+        buffers to a copy of the inlet, which becomes the outlet value
+
+        :param data: serialized inlet, if it was already needed for the cache
+        """
+        if self.inlet.value is None:
+            self.outlet.value = None
+            return
+        if data is None:
+            with tracer.span("serialize", "serialize"):
+                data = self.serialize_inlet()
+        future = self._columns = asyncio.get_running_loop().create_future()
+        try:
+            with tracer.span("browser", "browser"):
+                self.send({"action": "run"})
+                header, buffers = await future
+                tracer.annotate(bytes=sum(memoryview(b).nbytes for b in buffers))
+        finally:
+            self._columns = None
+        if header.get("error"):
+            raise LayoutError(header["error"])
+        # the inlet keeps its elements, and the live index that tracks them
+        with tracer.span("copy", "deserialize"), self.inlet.index.context, trusted:
+            value = convert_elkjson(data)
+        if self.inlet.value._store is not None:
+            GeometryStore().bind(value)
+        context = self.outlet.index.context
+        elements = ElementIndex.from_els(value, live=True, context=context)
+        count = len(elements.elements)
+        with tracer.span("apply columns", "deserialize", elements=count):
+            apply_columns(elements, header, buffers)
+        self.outlet.set_synced_value(value, header["revision"])
+
+    def _handle_columns(self, _, content, buffers):
+        if content.get("action") != "layout_columns":
+            return
+        future = self._columns
+        if future is not None and not future.done():
+            future.set_result((content, buffers))
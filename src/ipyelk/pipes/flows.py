@@ -1,5 +1,8 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Pattern, Sequence, Tuple
 
 
 class Text:
@@ -50,3 +53,86 @@ ColorCSS = ".*.cssClasses-colors"
 Anythinglayout = "((?!.*cssClasses-colors).)*"  # exclude matches on css color
 Layout = "layout"
 New = "new"
+
+
+class FlowMatcher:
+    """Matches flows against the `observes` of a pipe, each a regular
+    expression for whole flows.
+
+    The expressions are compiled once: the ones without special characters are
+    looked up in a set and the others are combined into a single expression.
+    The result for every flow is remembered, as the same few flows are checked
+    on every refresh.
+
+    :param observes: expressions of the flows to match
+    """
+
+    def __init__(self, observes: Iterable[str] = ()):
+        observes = tuple(observes)
+        patterns = [obs for obs in observes if not _is_literal(obs)]
+        self.observes = observes
+        self.literals = frozenset(obs for obs in observes if _is_literal(obs))
+        self.pattern: Optional[Pattern] = (
+            re.compile("|".join(f"(?:{obs})" for obs in patterns)) if patterns else None
+        )
+        self._matches: Dict[str, bool] = {}
+
+    def match(self, flow: str) -> bool:
+        """If the flow matches one of the expressions"""
+        matched = self._matches.get(flow)
+        if matched is None:
+            matched = flow in self.literals or (
+                self.pattern is not None and self.pattern.fullmatch(flow) is not None
+            )
+            if len(self._matches) >= _MAX_FLOWS:
+                self._matches.clear()
+            self._matches[flow] = matched
+        return matched
+
+    def any(self, flows: Iterable[str]) -> bool:
+        """If any of the flows matches one of the expressions"""
+        return any(self.match(flow) for flow in flows)
+
+
+class FlowDependencies:
+    """Which of a sequence of pipes observe each flow, as a bit mask with bit
+    `i` set if the matcher of pipe `i` matches the flow
+
+    :param matchers: flow matchers of the pipes
+    """
+
+    def __init__(self, matchers: Sequence[FlowMatcher]):
+        self.matchers = tuple(matchers)
+        self._masks: Dict[str, int] = {}
+
+    def mask(self, flows: Iterable[str]) -> int:
+        """Pipes that observe any of the flows"""
+        masks = self._masks
+        mask = 0
+        for flow in flows:
+            bits = masks.get(flow)
+            if bits is None:
+                bits = 0
+                for i, matcher in enumerate(self.matchers):
+                    if matcher.match(flow):
+                        bits |= 1 << i
+                if len(masks) >= _MAX_FLOWS:
+                    masks.clear()
+                masks[flow] = bits
+            mask |= bits
+        return mask
+
+
+@lru_cache(maxsize=256)
+def compile_flows(observes: Tuple[str, ...]) -> FlowMatcher:
+    """Shared matcher for a tuple of `observes`"""
+    return FlowMatcher(observes)
+
+
+_MAX_FLOWS = 4096
+_SPECIAL = frozenset("\\.^$*+?{}[]|()")
+
+
+def _is_literal(obs: str) -> bool:
+    """If the expression only matches itself"""
+    return _SPECIAL.isdisjoint(obs)
@@ -0,0 +1,238 @@
+"""Layout with elkjs in local Node.js processes, without a browser"""
+
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+import json
+import os
+from collections import deque
+from itertools import count
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+import traitlets as T
+
+from ..elements import convert_elkjson
+from ..exceptions import LayoutError
+from .elkjs import LayoutPipe
+
+HERE = Path(__file__).parent
+WORKER_SCRIPT = HERE / "headless_elk.js"
+
+# json lines for large graphs exceed the default stream buffer
+STREAM_LIMIT = 2**30
+
+# lines of the error output kept to report why a worker exited
+STDERR_LINES = 20
+
+
+class ElkWorker:
+    """A Node.js process running elkjs that lays out one graph at a time"""
+
+    def __init__(self, command: List[str], env: Dict[str, str]):
+        self.command = command
+        self.env = env
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._ids = count()
+        self._stderr: Deque[bytes] = deque(maxlen=STDERR_LINES)
+        self._stderr_task: Optional[asyncio.Future] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> "ElkWorker":
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self.env,
+            limit=STREAM_LIMIT,
+        )
+        # keep reading the error output, a full pipe would block the worker
+        self._stderr = deque(maxlen=STDERR_LINES)
+        self._stderr_task = asyncio.ensure_future(
+            _read_lines(self.process.stderr, self._stderr)
+        )
+        return self
+
+    async def layout(self, graph: Dict) -> Dict:
+        if not self.alive:
+            await self.start()
+        request_id = next(self._ids)
+        request = json.dumps({"id": request_id, "graph": graph})
+        try:
+            line = await self._exchange(request)
+        except asyncio.CancelledError:
+            # the response would be read as the answer to the next request
+            await self.kill()
+            raise
+        if not line:
+            await self.process.wait()
+            await self._stderr_task
+            stderr = b"".join(self._stderr)
+            raise LayoutError(
+                f"elk worker exited with {self.process.returncode}: "
+                f"{stderr.decode('utf-8', 'replace').strip()}"
+            )
+        response = json.loads(line)
+        if response.get("id") != request_id:
+            await self.kill()
+            raise LayoutError(f"elk worker answered request {response.get('id')}")
+        if "error" in response:
+            raise LayoutError(response["error"])
+        return response["result"]
+
+    async def _exchange(self, request: str) -> bytes:
+        try:
+            self.process.stdin.write(request.encode("utf-8") + b"\n")
+            await self.process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # the exit is reported from reading the response
+            pass
+        return await self.process.stdout.readline()
+
+    async def kill(self):
+        """Stop the process, a new one is started for the next layout"""
+        if self.alive:
+            self.process.kill()
+            await self.process.wait()
+        await self._stopped()
+
+    async def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+        await self._stopped()
+
+    async def _stopped(self):
+        if self._stderr_task is not None:
+            # the error output ends with the process
+            await self._stderr_task
+        self.process = self._stderr_task = None
+
+
+async def _read_lines(stream: asyncio.StreamReader, lines: Deque[bytes]):
+    async for line in stream:
+        lines.append(line)
+
+
+class ElkWorkerPool(T.HasTraits):
+    """Reusable Node.js processes running elkjs
+
+    Workers are started on demand, up to `size` layouts run concurrently.
+
+    Attributes
+    ----------
+    size: int
+        maximum number of worker processes
+    node: str
+        Node.js executable
+    elkjs: str
+        module path of the elkjs bundle, resolved by Node.js. Defaults to the
+        `IPYELK_ELKJS` environment variable or the `elkjs` package.
+
+    """
+
+    size: int = T.Int(min=1)
+    node: str = T.Unicode("node")
+    elkjs: str = T.Unicode()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._workers: List[ElkWorker] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @T.default("size")
+    def _default_size(self):
+        return min(4, os.cpu_count() or 1)
+
+    @T.default("elkjs")
+    def _default_elkjs(self):
+        return os.environ.get("IPYELK_ELKJS", "elkjs/lib/elk.bundled.js")
+
+    def worker_env(self) -> Dict[str, str]:
+        env = dict(os.environ)
+        env["IPYELK_ELKJS"] = self.elkjs
+        # find elkjs installed next to the current working directory
+        node_path = [str(Path.cwd() / "node_modules")]
+        if env.get("NODE_PATH"):
+            node_path.append(env["NODE_PATH"])
+        env["NODE_PATH"] = os.pathsep.join(node_path)
+        return env
+
+    async def layout(self, graph: Dict) -> Dict:
+        """Lay out an elk json graph on the next idle worker
+
+        :param graph: elk json
+        :return: elk json with layout results
+        """
+        idle = self._get_idle()
+        if idle.empty() and len(self._workers) < self.size:
+            worker = ElkWorker([self.node, str(WORKER_SCRIPT)], self.worker_env())
+            self._workers.append(worker)
+        else:
+            worker = await idle.get()
+        try:
+            return await worker.layout(graph)
+        finally:
+            idle.put_nowait(worker)
+
+    async def close(self):
+        """Stop all worker processes"""
+        workers, self._workers = self._workers, []
+        self._idle = self._loop = None
+        for worker in workers:
+            await worker.close()
+
+    def _get_idle(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # processes and queues are bound to the loop they were created in
+            for worker in self._workers:
+                if worker.alive:
+                    worker.process.kill()
+            self._workers = []
+            self._idle = asyncio.Queue()
+            self._loop = loop
+        return self._idle
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, typ, value, traceback):
+        await self.close()
+
+
+class HeadlessElkJS(LayoutPipe):
+    """Layout pipe that runs elkjs in local Node.js processes, so diagrams can
+    be laid out without a live frontend.
+
+    Attributes
+    ----------
+    pool: :py:class:`~ipyelk.pipes.headless.ElkWorkerPool`
+        worker processes, which can be shared between pipes
+
+    """
+
+    pool: ElkWorkerPool = T.Instance(ElkWorkerPool, kw={})
+
+    async def layout(self, data: Optional[Dict]):
+        if self.inlet.value is None:
+            self.outlet.value = None
+            return
+        if data is None:
+            data = self.serialize_inlet()
+        result = await self.pool.layout(data)
+        with self.inlet.index.context:
+            self.outlet.value = convert_elkjson(result)
+
+    async def layout_many(self, graphs: List[Dict]) -> List[Dict]:
+        """Lay out the graphs on all workers of the pool"""
+        return await asyncio.gather(*map(self.pool.layout, graphs))
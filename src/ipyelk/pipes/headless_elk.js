@@ -0,0 +1,75 @@
+/**
+ * Copyright (c) 2024 ipyelk contributors.
+ * Distributed under the terms of the Modified BSD License.
+ *
+ * Layout worker for `ipyelk.pipes.HeadlessElkJS`.
+ *
+ * Reads one json request per line from stdin, `{"id": 0, "graph": {...}}`,
+ * and writes one json response per line to stdout, either
+ * `{"id": 0, "result": {...}}` or `{"id": 0, "error": "..."}`.
+ *
+ * The elkjs module is resolved from the `IPYELK_ELKJS` environment variable.
+ */
+const readline = require('readline');
+
+const ELK = require(process.env.IPYELK_ELKJS || 'elkjs/lib/elk.bundled.js');
+
+const elk = new ELK();
+
+const NESTED = ['children', 'ports', 'labels', 'edges'];
+
+// elkjs does not need the ipyelk `properties` and fails on nested values, so
+// they are stripped before the layout and reapplied afterwards
+function collectProperties(root) {
+  const props = {};
+  const stack = [root];
+  while (stack.length) {
+    const node = stack.pop();
+    props[node.id] = node.properties;
+    delete node.properties;
+    for (const key of NESTED) {
+      if (node[key]) {
+        stack.push(...node[key]);
+      }
+    }
+  }
+  return props;
+}
+
+function applyProperties(root, props) {
+  const stack = [root];
+  while (stack.length) {
+    const node = stack.pop();
+    if (props[node.id] !== undefined) {
+      node.properties = props[node.id];
+    }
+    for (const key of NESTED) {
+      if (node[key]) {
+        stack.push(...node[key]);
+      }
+    }
+  }
+  return root;
+}
+
+async function handle(line) {
+  let request = { id: null };
+  try {
+    request = JSON.parse(line);
+    const props = collectProperties(request.graph);
+    const result = await elk.layout(request.graph);
+    return { id: request.id, result: applyProperties(result, props) };
+  } catch (error) {
+    return { id: request.id, error: String((error && error.message) || error) };
+  }
+}
+
+const lines = readline.createInterface({ input: process.stdin, terminal: false });
+
+lines.on('line', async (line) => {
+  if (!line.trim()) {
+    return;
+  }
+  const response = await handle(line);
+  process.stdout.write(JSON.stringify(response) + '\n');
+});
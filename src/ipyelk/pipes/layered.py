@@ -0,0 +1,50 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Dict, List, Optional
+
+import traitlets as T
+
+from ..elements import convert_elkjson, trusted
+from .elkjs import LayoutPipe
+
+
+class LayeredLayout(LayoutPipe):
+    """Layout pipe with a Sugiyama style layered layout computed in Python,
+    for previews and exports of large diagrams without a frontend. Requires
+    `numpy`.
+
+    Attributes
+    ----------
+    options: dict
+        layout options for graphs that do not set them. Supports direction,
+        node spacing, node spacing between layers and padding.
+    executor: :py:class:`~concurrent.futures.Executor`
+        runs the layout, e.g. a process pool to lay out many graphs in
+        parallel. Defaults to the event loop's thread pool.
+
+    """
+
+    options: Dict = T.Dict()
+    executor: Optional[Executor] = T.Instance(Executor, allow_none=True)
+
+    async def layout(self, data: Optional[Dict]):
+        if self.inlet.value is None:
+            self.outlet.value = None
+            return
+        if data is None:
+            data = self.serialize_inlet()
+        (result,) = await self.layout_many([data])
+        with self.inlet.index.context, trusted:
+            self.outlet.value = convert_elkjson(result)
+
+    async def layout_many(self, graphs: List[Dict]) -> List[Dict]:
+        from .sugiyama import layered_layout
+
+        loop = asyncio.get_running_loop()
+        run = partial(layered_layout, options=self.options)
+        return await asyncio.gather(*[
+            loop.run_in_executor(self.executor, run, graph) for graph in graphs
+        ])
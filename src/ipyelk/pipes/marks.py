@@ -1,11 +1,13 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
-from typing import Tuple
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
 
 import ipywidgets as W
 import traitlets as T
 from ipywidgets.widgets.trait_types import TypedTuple
 
+from ..constants import EXTENSION_NAME, EXTENSION_SPEC_VERSION
 from ..elements import (
     BaseElement,
     ElementIndex,
@@ -14,11 +16,15 @@ from ..elements import (
     Registry,
     elk_serialization,
 )
+from ..elements.common import paused_gc
+from ..schema import ElkCompiledValidator
+from .patch import Flat, apply_patch, diff, flatten, unflatten
+from .tracing import json_bytes, tracer
 
 
 class MarkIndex(W.DOMWidget):
     elements: ElementIndex = T.Instance(ElementIndex, allow_none=True)
-    context: Registry = T.Instance(Registry, kw={})
+    context: Registry = T.Instance(Registry, kw={"compact": True})
 
     _root: Node = None
 
@@ -41,26 +47,246 @@ class MarkIndex(W.DOMWidget):
             self._root = self.elements.root()
 
 
+def value_to_json(value: Optional[Node], widget: "MarkElementWidget") -> Optional[Dict]:
+    pending, widget._pending = widget._pending, None
+    with paused_gc(), tracer.span("serialize", "serialize") as span:
+        if pending is not None and pending[0] is value:
+            data = pending[1]
+        else:
+            data = elk_serialization["to_json"](value, widget)
+        # remember what the frontend has to patch it later
+        widget._synced = flatten(data)
+        if span is not None:
+            span.args.update(elements=len(widget._synced or ()), bytes=json_bytes(data))
+    widget._check_schema(data)
+    return data
+
+
+def value_from_json(js: Optional[Dict], manager) -> Optional[Node]:
+    with tracer.span("deserialize", "deserialize", bytes=json_bytes(js)):
+        return elk_serialization["from_json"](js, manager)
+
+
 class MarkElementWidget(W.DOMWidget):
-    value: Node = T.Instance(Node, allow_none=True).tag(sync=True, **elk_serialization)
+    """Synced elements of a diagram.
+
+    Changes of the `value` are sent as a patch of the changed elements, keyed by
+    id, unless too many elements changed. Both sides count the `revision` of the
+    value and fall back to a full sync if a patch does not apply to the
+    revision they have.
+
+    Attributes
+    ----------
+    value: :py:class:`~ipyelk.elements.Node`
+        root of the elements
+    revision: int
+        number of the last synced change of the `value`
+    max_patch_ratio: float
+        largest share of changed elements that is sent as a patch, `0` always
+        syncs the full `value`
+    validate_schema: bool
+        check the synced elk json against the schema, a patch only for the
+        elements it changes
+    schema_errors: dict
+        messages of the schema errors of the synced `value`, by element id
+        and path within the element. Elements without an id are all checked,
+        by their path from the root under the `None` key.
+
+    """
+
+    _model_name = T.Unicode("ELKMarkElementModel").tag(sync=True)
+    _model_module = T.Unicode(EXTENSION_NAME).tag(sync=True)
+    _model_module_version = T.Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
+
+    value: Node = T.Instance(Node, allow_none=True).tag(
+        sync=True, to_json=value_to_json, from_json=value_from_json
+    )
+    revision: int = T.Int(default_value=0).tag(sync=True)
     index: MarkIndex = T.Instance(MarkIndex, kw={}).tag(
         sync=True, **W.widget_serialization
     )
     flow: Tuple[str] = TypedTuple(T.Unicode(), kw={}).tag(sync=True)
+    max_patch_ratio: float = T.Float(default_value=0.5, min=0)
+    validate_schema: bool = T.Bool(default_value=True)
+    schema_errors: Dict[Optional[str], Dict[str, str]] = T.Dict(kw={})
+
+    _synced: Optional[Flat] = None
+    _pending: Optional[Tuple[Node, Dict]] = None
+    # schema definitions of the synced elements by id
+    _types: Optional[Dict[str, str]] = None
+    _quiet: bool = False
+    # the value changed while syncing was held
+    _held_value: bool = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_msg(self._handle_patch_msg)
+
+    def resync(self):
+        """Send the full `value` to the frontend"""
+        with self._silence():
+            self.revision += 1
+        self.send_state(["revision", "value"])
+
+    def notify_value_changed(self):
+        """Sync the `value` and notify observers after it was changed in place"""
+        value = self.value
+        self.notify_change(
+            T.Bunch(name="value", old=value, new=value, owner=self, type="change")
+        )
+
+    def set_synced_value(self, value: Optional[Node], revision: int):
+        """Take a value the frontend already has, without sending it back. The
+        next change of the value is synced in full.
+        """
+        with self._silence():
+            self.value = value
+            self.revision = revision
+        self._synced = None
+
+    @contextmanager
+    def _silence(self):
+        """Change the value and revision without syncing them"""
+        quiet, self._quiet = self._quiet, True
+        try:
+            yield
+        finally:
+            self._quiet = quiet
+
+    def _should_send_property(self, key, value):
+        if key in {"value", "revision"} and self._quiet:
+            return False
+        if key == "value" and key not in self._property_lock:
+            if self._holding_sync:
+                # sent along with the rest of the held state
+                self._held_value = True
+            else:
+                self._sync_value(value)
+            return False
+        return super()._should_send_property(key, value)
+
+    def send_state(self, key=None):
+        super().send_state(key)
+        if self._held_value and not self._holding_sync:
+            self._held_value = False
+            self._sync_value(self.value)
+
+    def _sync_value(self, value: Optional[Node]):
+        if not self._send_patch(value):
+            self.resync()
+
+    def _send_patch(self, value: Optional[Node]) -> bool:
+        """Try to send the changes of the value as a patch"""
+        old = self._synced
+        if value is None or old is None or not self.max_patch_ratio:
+            return False
+        data = elk_serialization["to_json"](value, self)
+        new = flatten(data)
+        ops = None
+        if new is not None and data["id"] in old:
+            ops = diff(old, new)
+        if ops is None or len(ops) > self.max_patch_ratio * len(new):
+            # reuse the serialized value for the full sync
+            self._pending = (value, data)
+            return False
+        with self._silence():
+            self.revision += 1
+        self._synced = new
+        self._check_schema(data, ops)
+        self.send({
+            "action": "patch",
+            "base": self.revision - 1,
+            "revision": self.revision,
+            "root": data["id"],
+            "ops": ops,
+        })
+        return True
+
+    def _check_schema(self, data: Optional[Dict], ops: Optional[List[Dict]] = None):
+        """Update the `schema_errors` of the synced elk json, only checking the
+        elements changed by the patch `ops` if given
+        """
+        if not self.validate_schema or data is None:
+            self._types = None
+            self.schema_errors = {}
+            return
+        validator = ElkCompiledValidator
+        flat = self._synced
+        errors: Dict[Optional[str], Dict[str, str]] = {}
+        with tracer.span("schema", "validate") as span:
+            if flat is None:
+                # elements without ids are only known by their path
+                self._types = None
+                checked = ()
+                found = (
+                    ((None, *e.path), e.message) for e in validator.iter_errors(data)
+                )
+            else:
+                if ops is None or self._types is None:
+                    checked = list(flat)
+                    self._types = {data["id"]: validator.root}
+                    found = validator.iter_flat_errors(flat, checked, self._types)
+                else:
+                    checked = [op["id"] for op in ops]
+                    stale = set(checked)
+                    errors.update(
+                        (k, v) for k, v in self.schema_errors.items() if k not in stale
+                    )
+                    found = validator.iter_patch_errors(flat, ops, self._types)
+                found = ((tuple(e.path), e.message) for e in found)
+            for (key, *path), message in found:
+                errors.setdefault(key, {})["/".join(map(str, path))] = message
+            if span is not None:
+                span.args["elements"] = len(checked)
+        self.schema_errors = errors
+
+    def _handle_patch_msg(self, _, content, buffers):
+        action = content.get("action")
+        if action == "resync":
+            self.resync()
+        elif action == "patch":
+            if self._synced is None or content["base"] != self.revision:
+                # the frontend patched an outdated value
+                self.resync()
+                return
+            flat = apply_patch(self._synced, content["ops"])
+            self._types = None
+            value = elk_serialization["from_json"](
+                unflatten(flat, content["root"]), None
+            )
+            with self._silence():
+                self.value = value
+                self.revision = content["revision"]
+
+    def set_state(self, sync_data):
+        if "value" in sync_data:
+            self._synced = flatten(sync_data["value"])
+            self._types = None
+        super().set_state(sync_data)
 
     def persist(self):
-        if self.index.elements is None:
-            self.build_index()
-        else:
-            self.index.elements.update(ElementIndex.from_els(self.value))
+        with tracer.span("persist", "index") as span:
+            if self.index.elements is None:
+                self.build_index()
+            else:
+                self.index.elements.update(get_index(self.value))
+            if span is not None:
+                span.args["elements"] = len(self.index.elements.elements)
         return self
 
     def build_index(self) -> MarkIndex:
+        """Get the live index of the current value, only walking the hierarchy
+        if the value is not already being tracked by a live index.
+        """
         if self.value is None:
             index = ElementIndex()
         else:
-            with self.index.context:
-                index = ElementIndex.from_els(self.value)
+            context = self.index.context
+            index = self.value._index
+            if index is None or index.context is not context:
+                index = None
+            if index is None or not index.is_live(self.value):
+                index = ElementIndex.from_els(self.value, live=True, context=context)
         self.index.elements = index
         return self.index
 
@@ -68,3 +294,13 @@ class MarkElementWidget(W.DOMWidget):
         from IPython.display import JSON, display
 
         display(JSON(self.value.dict()))
+
+
+def get_index(root: Node) -> ElementIndex:
+    """Reuse the live index that tracks `root` if there is one otherwise build a
+    new index.
+    """
+    index = root._index
+    if index is not None and index.is_live(root):
+        return index
+    return ElementIndex.from_els(root)
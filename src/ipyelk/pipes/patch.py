@@ -0,0 +1,94 @@
+"""Patches between two versions of an elk json tree, keyed by element id"""
+
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from typing import Dict, List, Optional
+
+NESTED = ("children", "ports", "labels", "edges")
+
+Flat = Dict[str, Dict]
+Patch = List[Dict]
+
+
+def flatten(data: Optional[Dict]) -> Optional[Flat]:
+    """Index the elements of the elk json by id, with nested elements replaced
+    by the list of their ids.
+
+    :param data: elk json of the root node
+    :return: flat elements or `None` if the elements can not be keyed by id
+    """
+    if not data:
+        return None
+    flat = {}
+    stack = [data]
+    while stack:
+        el = stack.pop()
+        key = el.get("id")
+        if key is None or key in flat:
+            return None
+        entry = {}
+        for name, value in el.items():
+            if name in NESTED and value is not None:
+                entry[name] = [child.get("id") for child in value]
+                stack.extend(value)
+            else:
+                entry[name] = value
+        flat[key] = entry
+    return flat
+
+
+def unflatten(flat: Flat, root: str) -> Dict:
+    """Rebuild the nested elk json from the flat elements"""
+    data = dict(flat[root])
+    stack = [data]
+    while stack:
+        el = stack.pop()
+        for name in NESTED:
+            ids = el.get(name)
+            if ids is None:
+                continue
+            children = el[name] = [dict(flat[key]) for key in ids]
+            stack.extend(children)
+    return data
+
+
+def diff(old: Flat, new: Flat) -> Patch:
+    """Operations that turn the `old` flat elements into the `new` ones
+
+    * ``{"op": "add", "id": ..., "value": {...}}``
+    * ``{"op": "remove", "id": ...}``
+    * ``{"op": "update", "id": ..., "set": {...}, "unset": [...]}``
+    """
+    ops = [{"op": "remove", "id": key} for key in old if key not in new]
+    for key, entry in new.items():
+        previous = old.get(key)
+        if previous is None:
+            ops.append({"op": "add", "id": key, "value": entry})
+        elif previous != entry:
+            changed = {
+                name: value
+                for name, value in entry.items()
+                if name not in previous or previous[name] != value
+            }
+            removed = [name for name in previous if name not in entry]
+            ops.append({"op": "update", "id": key, "set": changed, "unset": removed})
+    return ops
+
+
+def apply_patch(flat: Flat, ops: Patch) -> Flat:
+    """Update the flat elements in place with the operations from `diff`"""
+    for op in ops:
+        key = op["id"]
+        kind = op["op"]
+        if kind == "remove":
+            flat.pop(key, None)
+        elif kind == "add":
+            flat[key] = dict(op["value"])
+        elif kind == "update":
+            entry = flat[key] = dict(flat[key])
+            entry.update(op.get("set") or {})
+            for name in op.get("unset") or []:
+                entry.pop(name, None)
+        else:
+            raise ValueError(f"Unknown patch operation {kind!r}")
+    return flat
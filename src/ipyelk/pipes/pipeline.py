@@ -8,6 +8,10 @@ import traitlets as T
 
 from ..exceptions import BrokenPipe
 from .base import Pipe, PipeStatus, PipeStatusView, SyncedOutletPipe
+from .flows import FlowDependencies, FlowMatcher
+from .tracing import tracer
+
+NO_FLOWS = FlowMatcher()
 
 
 class PipelineStatusView(PipeStatusView):
@@ -62,6 +66,7 @@ class Pipeline(SyncedOutletPipe):
     pipes: Tuple[Pipe] = T.List(T.Instance(Pipe), kw={}).tag(
         sync=True, **W.widget_serialization
     )
+    _dependencies: FlowDependencies = None
 
     @T.default("status_widget")
     def _default_status_widget(self):
@@ -86,6 +91,10 @@ class Pipeline(SyncedOutletPipe):
         # self.schedule_run()
 
     async def run(self):
+        with tracer.span(type(self).__name__, flow=list(self.inlet.flow)):
+            await self._run_pipes()
+
+    async def _run_pipes(self):
         start = datetime.now()
         self.check_dirty()
 
@@ -95,11 +104,7 @@ class Pipeline(SyncedOutletPipe):
             pipe_start_time = datetime.now()
             p_name = f"pipe {i}: {type(pipe)}"
             try:
-                if pipe.status.dirty():
-                    self.status_update(PipeStatus.running(), pipe=pipe)
-                    await pipe.run()
-                else:
-                    pipe.outlet.value = pipe.inlet.value
+                await self._run_pipe(i, pipe)
             except Exception as err:
                 self.log.exception(f"Error running {p_name}")
                 self.status_update(
@@ -114,14 +119,52 @@ class Pipeline(SyncedOutletPipe):
             pipe.status_update(PipeStatus.finished(start_time=pipe_start_time))
         self.status_update(PipeStatus.finished(start_time=start))
 
+    async def _run_pipe(self, i: int, pipe: Pipe):
+        if pipe.status.dirty():
+            self.status_update(PipeStatus.running(), pipe=pipe)
+            with tracer.span(type(pipe).__name__, index=i):
+                await pipe.run()
+        else:
+            pipe.outlet.value = pipe.inlet.value
+
+    def dependencies(self) -> FlowDependencies:
+        """Map of the flows to the pipes that observe them, rebuilt when the
+        pipes or what they observe change
+        """
+        matchers = tuple(
+            pipe.flow_matcher if _plain(pipe) else NO_FLOWS for pipe in self.pipes
+        )
+        dependencies = self._dependencies
+        if dependencies is None or dependencies.matchers != matchers:
+            dependencies = self._dependencies = FlowDependencies(matchers)
+        return dependencies
+
     def check_dirty(self) -> bool:
-        # check pipes and propagate flow to downstream pipes
+        # check pipes and propagate flow to downstream pipes, in one pass over
+        # the flows collecting the pipes that observe them
+        dependencies = self.dependencies()
+        flow = self.inlet.flow
+        pending = dependencies.mask(flow)
         observes = set()
         reports = set()
-        for pipe in self.pipes:
-            if pipe.check_dirty():
+        for i, pipe in enumerate(self.pipes):
+            if not _plain(pipe):
+                # e.g. nested pipelines decide for themselves
+                if pipe.check_dirty():
+                    observes |= set(pipe.observes)
+                    reports |= set(pipe.reports)
+                flow = pipe.outlet.flow
+                pending |= dependencies.mask(flow)
+                continue
+            if pending >> i & 1:
+                pipe.status = PipeStatus.waiting()
+                flow = tuple(set([*flow, *pipe.reports]))
+                pending |= dependencies.mask(pipe.reports)
                 observes |= set(pipe.observes)
                 reports |= set(pipe.reports)
+            else:
+                pipe.status = PipeStatus.finished()
+            pipe.outlet.flow = flow
         # pipeline is dirty if flows are added to reports from subpipes
         if len(reports):
             self.status = PipeStatus.waiting()
@@ -155,3 +198,8 @@ class Pipeline(SyncedOutletPipe):
 
     def get_progress_value(self) -> float:
         return sum(pipe.get_progress_value() for pipe in self.pipes) / len(self.pipes)
+
+
+def _plain(pipe: Pipe) -> bool:
+    """If the pipe decides if it is dirty with :py:meth:`Pipe.check_dirty`"""
+    return type(pipe).check_dirty is Pipe.check_dirty
@@ -0,0 +1,114 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .base import Pipe
+
+
+class RunScheduler:
+    """Coalesces requests to run a pipe.
+
+    Requests that arrive while the pipe waits to run are merged into a single
+    run, with the inlet flows of all of them. At most one run is in flight,
+    requests made during a run are queued for one more run after it. A run
+    starts once no request has been made for `debounce` seconds. A run that is
+    in flight for longer than `timeout` seconds is taken to be stuck, and is
+    cancelled by the next request instead of holding it back.
+
+    :param pipe: pipe to run
+    :param debounce: seconds to wait for further requests before a run
+    :param timeout: seconds after which a new request supersedes the run in
+        flight, or `None` to always wait for it
+    """
+
+    def __init__(
+        self, pipe: "Pipe", debounce: float = 0.0, timeout: Optional[float] = None
+    ):
+        self.pipe = pipe
+        self.debounce = debounce
+        self.timeout = timeout
+        self.runs = 0
+        self._flows: Dict[str, None] = {}
+        self._next: Optional[asyncio.Future] = None
+        self._last = 0.0
+        self._started: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        """If a run has been requested that has not started yet"""
+        return self._next is not None
+
+    @property
+    def running(self) -> bool:
+        """If the scheduler is waiting for or doing runs"""
+        return self._task is not None and not self._task.done()
+
+    def request(self) -> asyncio.Future:
+        """Request a run with the current inlet flows of the pipe
+
+        :return: future of the run that will include the request, shared by
+            all the requests merged into it
+        """
+        loop = asyncio.get_running_loop()
+        self._flows.update(dict.fromkeys(self.pipe.inlet.flow))
+        self._last = loop.time()
+        if self._next is None:
+            self._next = loop.create_future()
+        if self.running and self._stuck(loop):
+            self._task.cancel()
+            self._task = self._started = None
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+        return self._next
+
+    def cancel(self):
+        """Cancel the run in flight and the pending run"""
+        if self._task is not None:
+            self._task.cancel()
+        if self._next is not None:
+            self._next.cancel()
+        self._next = self._started = None
+        self._flows = {}
+
+    def _stuck(self, loop: asyncio.AbstractEventLoop) -> bool:
+        started = self._started
+        if self.timeout is None or started is None:
+            return False
+        return loop.time() - started > self.timeout
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._next is not None:
+                # let the callbacks of the previous run finish, and wait until
+                # no request has been made for the debounce window
+                await asyncio.sleep(0)
+                remaining = self._last + self.debounce - loop.time()
+                while remaining > 0:
+                    await asyncio.sleep(remaining)
+                    remaining = self._last + self.debounce - loop.time()
+
+                waiter, self._next = self._next, None
+                flows, self._flows = tuple(self._flows), {}
+                self.pipe.inlet.flow = flows
+                self.runs += 1
+                self._started = loop.time()
+                try:
+                    await self.pipe.run()
+                except Exception as err:
+                    if not waiter.done():
+                        waiter.set_exception(err)
+                else:
+                    if not waiter.done():
+                        waiter.set_result(self.pipe.outlet)
+                finally:
+                    # only still pending if the run was cancelled
+                    waiter.cancel()
+                    if asyncio.current_task() is self._task:
+                        self._started = None
+        finally:
+            if asyncio.current_task() is self._task:
+                self._task = None
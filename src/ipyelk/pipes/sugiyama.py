@@ -0,0 +1,664 @@
+"""Sugiyama style layered layout of elk json, vectorized with NumPy.
+
+The layout follows the classic phases: cycles are broken and nodes are
+assigned to layers along their longest path, long edges are split by dummy
+nodes, the order within layers is improved with barycenter sweeps and finally
+coordinates are assigned by aligning nodes with their neighbors. Compound nodes
+are laid out bottom up, every node with children is an independent layered
+graph of its children.
+
+It does not try to reproduce ELK, but produces comparable pictures quickly for
+large graphs.
+"""
+
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+DIRECTION = "org.eclipse.elk.direction"
+NODE_SPACING = "org.eclipse.elk.spacing.nodeNode"
+LAYER_SPACING = "org.eclipse.elk.layered.spacing.nodeNodeBetweenLayers"
+PADDING = "org.eclipse.elk.padding"
+
+DEFAULT_OPTIONS = {
+    DIRECTION: "RIGHT",
+    NODE_SPACING: 20.0,
+    LAYER_SPACING: 20.0,
+    PADDING: "[top=12,left=12,bottom=12,right=12]",
+}
+
+# space between labels and the border of their node
+LABEL_SPACING = 5.0
+# number of barycenter and alignment sweeps
+SWEEPS = 8
+
+PADDING_PATTERN = re.compile(r"(top|bottom|left|right)\s*=\s*([-+\d.eE]+)")
+
+
+def layered_layout(root: Dict, options: Optional[Dict] = None) -> Dict:
+    """Lay out the elk json in place.
+
+    Sets `x`, `y`, `width` and `height` of nodes, ports and labels and a single
+    section for every edge, in the coordinate systems elkjs uses.
+
+    :param root: elk json of the root node
+    :param options: layout options used where the graph does not set them
+    :return: the laid out root
+    """
+    graph = _Graph(root, {**DEFAULT_OPTIONS, **(options or {})})
+    for i in reversed(range(len(graph.nodes))):
+        if graph.children[i]:
+            graph.layout_children(i)
+        graph.place_ports(i)
+        graph.place_labels(i)
+    graph.route_edges()
+    for key in ("x", "y"):
+        if root.get(key) is None:
+            root[key] = 0.0
+    return root
+
+
+class _Graph:
+    """Flat arrays of the nodes in the elk json hierarchy, in pre-order"""
+
+    def __init__(self, root: Dict, options: Dict):
+        self.nodes: List[Dict] = []
+        self.parent: List[int] = []
+        self.depth: List[int] = []
+        self.options: List[Dict] = []
+        self.children: List[List[int]] = []
+        self.index: Dict[str, int] = {}
+        self.ports: Dict[str, Tuple[int, Dict]] = {}
+        self.edges: List[Tuple[int, Dict]] = []
+
+        stack = [(root, -1, options)]
+        while stack:
+            node, parent, inherited = stack.pop()
+            i = len(self.nodes)
+            layout_options = node.get("layoutOptions") or {}
+            opts = {key: layout_options.get(key, inherited[key]) for key in inherited}
+            self.nodes.append(node)
+            self.parent.append(parent)
+            self.depth.append(0 if parent < 0 else self.depth[parent] + 1)
+            self.options.append(opts)
+            self.children.append([])
+            if parent >= 0:
+                self.children[parent].append(i)
+            if node.get("id") is not None:
+                self.index[node["id"]] = i
+            for port in node.get("ports") or []:
+                self.ports[port.get("id")] = (i, port)
+            for edge in node.get("edges") or []:
+                self.edges.append((i, edge))
+            stack.extend(
+                (child, i, opts) for child in reversed(node.get("children") or [])
+            )
+
+        n = len(self.nodes)
+        self.width = np.array([_size(node, "width") for node in self.nodes])
+        self.height = np.array([_size(node, "height") for node in self.nodes])
+        for i, node in enumerate(self.nodes):
+            labels = node.get("labels")
+            if labels and not self.children[i]:
+                # grow leaves to fit their labels
+                widths = [_size(label, "width") for label in labels]
+                heights = [_size(label, "height") for label in labels]
+                self.width[i] = max(self.width[i], max(widths) + 2 * LABEL_SPACING)
+                self.height[i] = max(
+                    self.height[i], sum(heights) + (len(labels) + 1) * LABEL_SPACING
+                )
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+
+        self.sources = {_endpoint(edge, "source") for _, edge in self.edges}
+
+        # resolve edge endpoints and the graph each edge is laid out in
+        self.endpoints: List[Optional[Tuple[int, int]]] = []
+        self.local_edges: Dict[int, List[Tuple[int, int, int]]] = {}
+        for e, (owner, edge) in enumerate(self.edges):
+            source = self.resolve(_endpoint(edge, "source"))
+            target = self.resolve(_endpoint(edge, "target"))
+            if source is None or target is None:
+                self.endpoints.append(None)
+                continue
+            self.endpoints.append((source, target))
+            container, u, v = self.siblings(source, target)
+            if container is not None:
+                self.local_edges.setdefault(container, []).append((u, v, e))
+
+        # bend points of edges in the coordinates of the graph they are laid
+        # out in
+        self.bends: Dict[int, Tuple[int, List[Tuple[float, float]]]] = {}
+
+    def resolve(self, key: Optional[str]) -> Optional[int]:
+        if key in self.index:
+            return self.index[key]
+        if key in self.ports:
+            return self.ports[key][0]
+        return None
+
+    def siblings(self, u: int, v: int) -> Tuple[Optional[int], int, int]:
+        """Lowest common ancestor of `u` and `v` and their ancestors among its
+        children
+        """
+        if u == v:
+            return None, u, v
+        depth, parent = self.depth, self.parent
+        while depth[u] > depth[v]:
+            if parent[u] == v:
+                return None, u, v
+            u = parent[u]
+        while depth[v] > depth[u]:
+            if parent[v] == u:
+                return None, u, v
+            v = parent[v]
+        while parent[u] != parent[v]:
+            u, v = parent[u], parent[v]
+        if u == v or parent[u] < 0:
+            return None, u, v
+        return parent[u], u, v
+
+    def layout_children(self, container: int):
+        """Layered layout of the children of `container`, which also sets its
+        size
+        """
+        kids = self.children[container]
+        direction = str(self.options[container][DIRECTION]).upper()
+        vertical = direction in {"DOWN", "UP"}
+        placement = self.place_children(container, vertical)
+        if direction in {"LEFT", "UP"}:
+            placement = placement.mirrored()
+
+        # offset the content by the padding and the labels of the container
+        top, left, bottom, right = self.padding(container)
+        xs, ys, ws, hs = placement.boxes(vertical)
+        xs, ys = xs + left, ys + top
+        k = len(kids)
+        self.x[kids] = xs[:k]
+        self.y[kids] = ys[:k]
+        self.width[container] = max(self.width[container], (xs + ws).max() + right)
+        self.height[container] = max(self.height[container], (ys + hs).max() + bottom)
+
+        # dummy nodes become the bend points of long edges
+        self.bend_edges(container, placement, xs[k:] + ws[k:] / 2, ys[k:] + hs[k:] / 2)
+        for node in kids:
+            self.nodes[node]["x"] = float(self.x[node])
+            self.nodes[node]["y"] = float(self.y[node])
+
+    def place_children(self, container: int, vertical: bool) -> "_Placement":
+        """Coordinates of the children of `container` along and across the
+        layers, before the padding is added
+        """
+        kids = self.children[container]
+        opts = self.options[container]
+        if vertical:
+            major, minor = self.height[kids], self.width[kids]
+        else:
+            major, minor = self.width[kids], self.height[kids]
+        edges = self.local_edges.get(container)
+        if not edges:
+            return place_grid(major, minor, opts)
+        local = {node: j for j, node in enumerate(kids)}
+        src = np.array([local[u] for u, _, _ in edges], dtype=int)
+        dst = np.array([local[v] for _, v, _ in edges], dtype=int)
+        return place_layers(src, dst, major, minor, opts)
+
+    def padding(self, container: int) -> Tuple[float, float, float, float]:
+        """Space around the children of `container`, the top includes its
+        labels
+        """
+        top, left, bottom, right = _padding(self.options[container][PADDING])
+        top += sum(
+            _size(label, "height") + LABEL_SPACING
+            for label in self.nodes[container].get("labels") or []
+        )
+        return top, left, bottom, right
+
+    def bend_edges(
+        self,
+        container: int,
+        placement: "_Placement",
+        dummy_x: np.ndarray,
+        dummy_y: np.ndarray,
+    ):
+        """Keep the centers of the dummy nodes as bend points of their edges"""
+        dummy_edge = placement.dummy_edge
+        if not len(dummy_edge):
+            return
+        edges = self.local_edges[container]
+        bounds = np.flatnonzero(np.diff(dummy_edge)) + 1
+        points = np.stack([dummy_x, dummy_y], axis=1).tolist()
+        starts = [0, *bounds.tolist()]
+        ends = [*bounds.tolist(), len(points)]
+        for e, start, end in zip(dummy_edge[starts].tolist(), starts, ends):
+            bends = points[start:end]
+            if placement.flipped[e]:
+                bends.reverse()
+            self.bends[edges[e][2]] = (container, bends)
+
+    def place_ports(self, i: int):
+        """Spread outgoing ports on the far side of the node and the other
+        ports on the near side
+        """
+        node = self.nodes[i]
+        node["width"] = float(self.width[i])
+        node["height"] = float(self.height[i])
+        ports = node.get("ports")
+        if not ports:
+            return
+        opts = self.options[self.parent[i]] if self.parent[i] >= 0 else self.options[i]
+        direction = str(opts[DIRECTION]).upper()
+        sides = ([], [])
+        for port in ports:
+            sides[port.get("id") in self.sources].append(port)
+        w, h = float(self.width[i]), float(self.height[i])
+        for far, side in enumerate(sides):
+            if direction in {"LEFT", "UP"}:
+                far = not far
+            for j, port in enumerate(side):
+                pw, ph = _size(port, "width"), _size(port, "height")
+                port["width"], port["height"] = pw, ph
+                if direction in {"DOWN", "UP"}:
+                    port["x"] = w * (j + 1) / (len(side) + 1) - pw / 2
+                    port["y"] = h if far else -ph
+                else:
+                    port["x"] = w if far else -pw
+                    port["y"] = h * (j + 1) / (len(side) + 1) - ph / 2
+                for label in port.get("labels") or []:
+                    _fill_size(label)
+                    label["x"], label["y"] = pw, ph
+
+    def place_labels(self, i: int):
+        """Stack the labels of the node centered at its top"""
+        y = LABEL_SPACING
+        w = float(self.width[i])
+        for label in self.nodes[i].get("labels") or []:
+            lw, lh = _fill_size(label)
+            label["x"] = (w - lw) / 2
+            label["y"] = y
+            y += lh + LABEL_SPACING
+
+    def route_edges(self):
+        """A single section from the source to the target of every edge,
+        through the bend points of its dummy nodes
+        """
+        absolute = np.zeros((len(self.nodes), 2))
+        for i in range(1, len(self.nodes)):
+            absolute[i] = absolute[self.parent[i]] + (self.x[i], self.y[i])
+
+        for e, (_, edge) in enumerate(self.edges):
+            if self.endpoints[e] is None:
+                continue
+            start, *bend_points, end = self.route(e, absolute)
+            edge["sections"] = [
+                {
+                    "id": f"{edge.get('id')}_s0",
+                    "startPoint": {"x": start[0], "y": start[1]},
+                    "endPoint": {"x": end[0], "y": end[1]},
+                    "bendPoints": [{"x": x, "y": y} for x, y in bend_points],
+                }
+            ]
+            _place_edge_labels(edge, [start, *bend_points, end])
+
+    def route(self, e: int, absolute: np.ndarray) -> List[Tuple[float, float]]:
+        """Points of the edge in the coordinates of its owner"""
+        owner, edge = self.edges[e]
+        source, target = self.endpoints[e]
+        ox, oy = absolute[owner].tolist()
+        container, bends = self.bends.get(e, (owner, []))
+        cx, cy = (absolute[container] - absolute[owner]).tolist()
+        bend_points = [(x + cx, y + cy) for x, y in bends]
+
+        source_key, target_key = _endpoint(edge, "source"), _endpoint(edge, "target")
+        start = self.anchor(source_key, source, absolute)
+        end = self.anchor(target_key, target, absolute)
+        start = (start[0] - ox, start[1] - oy)
+        end = (end[0] - ox, end[1] - oy)
+        if source_key not in self.ports:
+            start = self.border(source, start, (bend_points or [end])[0])
+        if target_key not in self.ports:
+            end = self.border(target, end, (bend_points or [start])[-1])
+        return [start, *bend_points, end]
+
+    def anchor(self, key: str, node: int, absolute: np.ndarray) -> Tuple[float, float]:
+        """Absolute center of the endpoint"""
+        x, y = absolute[node].tolist()
+        if key in self.ports:
+            _, port = self.ports[key]
+            return (
+                x + port["x"] + port["width"] / 2,
+                y + port["y"] + port["height"] / 2,
+            )
+        return (
+            float(x + self.width[node] / 2),
+            float(y + self.height[node] / 2),
+        )
+
+    def border(self, node: int, center, towards) -> Tuple[float, float]:
+        """Point on the border of the node box on the way from its center
+        towards another point
+        """
+        dx, dy = towards[0] - center[0], towards[1] - center[1]
+        hw, hh = self.width[node] / 2, self.height[node] / 2
+        if dx == 0 and dy == 0:
+            return center
+        scale = min(
+            hw / abs(dx) if dx else np.inf,
+            hh / abs(dy) if dy else np.inf,
+        )
+        scale = min(scale, 1)
+        return (float(center[0] + dx * scale), float(center[1] + dy * scale))
+
+
+class _Placement(NamedTuple):
+    """Sizes and coordinates of the children of a container followed by its
+    dummy nodes, along the layers (major) and within them (minor)
+    """
+
+    major: np.ndarray
+    minor: np.ndarray
+    major_pos: np.ndarray
+    minor_pos: np.ndarray
+    # the edge of each dummy node, and whether each edge points against the
+    # layers
+    dummy_edge: np.ndarray
+    flipped: np.ndarray
+
+    def mirrored(self) -> "_Placement":
+        extent = (self.major_pos + self.major).max(initial=0)
+        return self._replace(major_pos=extent - self.major_pos - self.major)
+
+    def boxes(self, vertical: bool) -> Tuple[np.ndarray, ...]:
+        """x, y, width and height of the nodes"""
+        if vertical:
+            return self.minor_pos, self.major_pos, self.minor, self.major
+        return self.major_pos, self.minor_pos, self.major, self.minor
+
+
+def place_grid(major: np.ndarray, minor: np.ndarray, opts: Dict) -> _Placement:
+    """Place unconnected nodes"""
+    major_pos, minor_pos = grid_coordinates(
+        major, minor, float(opts[LAYER_SPACING]), float(opts[NODE_SPACING])
+    )
+    none = np.zeros(0, dtype=int)
+    return _Placement(major, minor, major_pos, minor_pos, none, none.astype(bool))
+
+
+def place_layers(
+    src: np.ndarray, dst: np.ndarray, major: np.ndarray, minor: np.ndarray, opts: Dict
+) -> _Placement:
+    """Place nodes connected by edges from `src` to `dst` in layers"""
+    k = len(major)
+    layer, flipped = assign_layers(k, src, dst)
+    src, dst = np.where(flipped, dst, src), np.where(flipped, src, dst)
+    layer, segments, dummy_edge = split_long_edges(k, layer, src, dst)
+    n = len(layer)
+    major = np.concatenate([major, np.zeros(n - k)])
+    minor = np.concatenate([minor, np.zeros(n - k)])
+    # dummy nodes only need to keep edges apart
+    spacing = np.full(n, float(opts[NODE_SPACING]))
+    spacing[k:] /= 2
+
+    pos = order_layers(layer, segments)
+    major_pos = layer_coordinates(layer, major, float(opts[LAYER_SPACING]))
+    minor_pos = align_coordinates(layer, pos, segments, minor, spacing)
+    return _Placement(major, minor, major_pos, minor_pos, dummy_edge, flipped)
+
+
+def assign_layers(k: int, src: np.ndarray, dst: np.ndarray):
+    """Layer of every node along its longest path from a source.
+
+    Cycles are broken by placing nodes with the fewest unplaced predecessors
+    first, the edges that point against the resulting order are flipped.
+
+    :return: layer of each node and whether each edge is flipped
+    """
+    loops = src == dst
+    layer, stuck = longest_path(k, src[~loops], dst[~loops])
+    flipped = np.zeros(len(src), dtype=bool)
+    if stuck:
+        # orient all edges along the placement order, which is acyclic
+        key = layer * k + np.arange(k)
+        flipped = key[src] > key[dst]
+        a, b = np.where(flipped, dst, src), np.where(flipped, src, dst)
+        layer, _ = longest_path(k, a[~loops], b[~loops])
+    return layer, flipped
+
+
+def longest_path(k: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, bool]:
+    """Kahn's algorithm processing a whole frontier of sources at a time
+
+    :return: layer of each node and whether cycles had to be broken
+    """
+    indegree = np.bincount(dst, minlength=k)
+    order = np.argsort(src, kind="stable")
+    targets = dst[order]
+    ptr = np.zeros(k + 1, dtype=int)
+    np.cumsum(np.bincount(src, minlength=k), out=ptr[1:])
+
+    layer = np.full(k, -1)
+    frontier = np.flatnonzero(indegree == 0)
+    placed = 0
+    level = 0
+    stuck = False
+    while placed < k:
+        if not frontier.size:
+            stuck = True
+            unplaced = np.flatnonzero(layer < 0)
+            remaining = indegree[unplaced]
+            frontier = unplaced[remaining == remaining.min()][:1]
+        layer[frontier] = level
+        placed += frontier.size
+        level += 1
+
+        next_nodes = targets[_ranges(ptr, frontier)]
+        next_nodes = next_nodes[layer[next_nodes] < 0]
+        if not next_nodes.size:
+            frontier = next_nodes
+            continue
+        nodes, counts = np.unique(next_nodes, return_counts=True)
+        indegree[nodes] -= counts
+        frontier = nodes[indegree[nodes] == 0]
+    return layer, stuck
+
+
+def _ranges(ptr: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Concatenated `range(ptr[i], ptr[i + 1])` for the nodes"""
+    starts = ptr[nodes]
+    counts = ptr[nodes + 1] - starts
+    total = counts.sum()
+    if not total:
+        return np.zeros(0, dtype=int)
+    offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return offsets + np.arange(total)
+
+
+def split_long_edges(k: int, layer: np.ndarray, src: np.ndarray, dst: np.ndarray):
+    """Insert dummy nodes so every segment connects adjacent layers
+
+    :return: layer of real and dummy nodes, sources and targets of the
+        segments and the edge of each dummy node
+    """
+    keep = src != dst
+    span = np.where(keep, layer[dst] - layer[src], 0)
+    long = np.flatnonzero(span > 1)
+    counts = span[long] - 1
+    total = int(counts.sum())
+
+    dummies = k + np.arange(total)
+    dummy_edge = np.repeat(long, counts)
+    starts = np.cumsum(counts) - counts
+    step = np.arange(total) - np.repeat(starts, counts)
+    dummy_layer = layer[src[dummy_edge]] + step + 1
+    previous = np.where(step == 0, src[dummy_edge], dummies - 1)
+    last = k + starts + counts - 1
+
+    short = np.flatnonzero(keep & (span <= 1))
+    segments = (
+        np.concatenate([src[short], previous, last]),
+        np.concatenate([dst[short], dummies, dst[long]]),
+    )
+    return np.concatenate([layer, dummy_layer]), segments, dummy_edge
+
+
+def order_layers(layer: np.ndarray, segments: Tuple[np.ndarray, np.ndarray]):
+    """Barycenter crossing minimization, alternating downward and upward
+    sweeps that reorder all layers at once
+
+    :return: position of every node within its layer
+    """
+    n = len(layer)
+    starts = np.zeros(layer.max(initial=0) + 2, dtype=int)
+    np.cumsum(np.bincount(layer, minlength=len(starts) - 1), out=starts[1:])
+    starts = starts[:-1]
+
+    order = np.argsort(layer, kind="stable")
+    pos = _positions(order, layer, starts)
+    if not len(segments[0]):
+        return pos
+    # barycenters are smaller than the widest layer, so a single key sorts by
+    # layer first and the stable sort of the current order breaks ties
+    width = np.diff(np.append(starts, n)).max() + 1
+    for sweep in range(SWEEPS):
+        a, b = segments if sweep % 2 == 0 else segments[::-1]
+        sums = np.bincount(b, weights=pos[a], minlength=n)
+        counts = np.bincount(b, minlength=n)
+        bary = np.where(counts > 0, sums / np.maximum(counts, 1), pos)
+        key = layer * width + bary
+        order = order[np.argsort(key[order], kind="stable")]
+        pos = _positions(order, layer, starts)
+    return pos
+
+
+def _positions(order: np.ndarray, layer: np.ndarray, starts: np.ndarray):
+    pos = np.empty(len(order))
+    pos[order] = np.arange(len(order)) - starts[layer[order]]
+    return pos
+
+
+def layer_coordinates(layer: np.ndarray, major: np.ndarray, layer_spacing: float):
+    """Layers are placed side by side along the major axis, nodes are centered
+    in their layer
+
+    :return: major coordinate of every node
+    """
+    thickness = np.zeros(layer.max(initial=0) + 1)
+    np.maximum.at(thickness, layer, major)
+    layer_start = np.concatenate([[0], np.cumsum(thickness + layer_spacing)[:-1]])
+    return layer_start[layer] + (thickness[layer] - major) / 2
+
+
+def align_coordinates(
+    layer: np.ndarray,
+    pos: np.ndarray,
+    segments: Tuple[np.ndarray, np.ndarray],
+    minor: np.ndarray,
+    spacing: np.ndarray,
+):
+    """Nodes are stacked in order along the minor axis and shifted towards the
+    center of their neighbors without overlapping.
+
+    :return: minor coordinate of every node
+    """
+    n = len(layer)
+    order = np.lexsort((pos, layer))
+    sorted_layer = layer[order]
+    offset = _stack(sorted_layer, order, minor + spacing)
+
+    minor_pos = offset.copy()
+    if len(segments[0]):
+        for sweep in range(SWEEPS):
+            a, b = segments if sweep % 2 == 0 else segments[::-1]
+            center = minor_pos + minor / 2
+            sums = np.bincount(b, weights=center[a], minlength=n)
+            counts = np.bincount(b, minlength=n)
+            desired = np.where(
+                counts > 0, sums / np.maximum(counts, 1) - minor / 2, minor_pos
+            )
+            minor_pos = _pack(desired, offset, order, sorted_layer)
+
+    return minor_pos - minor_pos.min(initial=0)
+
+
+def _stack(sorted_layer: np.ndarray, order: np.ndarray, extent: np.ndarray):
+    """Minimal offset of each node from the first node of its layer"""
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_layer[1:] != sorted_layer[:-1]
+    total = np.cumsum(extent[order]) - extent[order]
+    base = np.maximum.accumulate(np.where(first, total, 0))
+    offset = np.empty(len(order))
+    offset[order] = total - base
+    return offset
+
+
+def grid_coordinates(
+    major: np.ndarray, minor: np.ndarray, major_spacing: float, minor_spacing: float
+):
+    """Arrange unconnected nodes in a square grid, in model order
+
+    :return: major and minor coordinate of every node
+    """
+    k = len(major)
+    columns = max(1, int(np.ceil(np.sqrt(k))))
+    column, row = np.arange(k) % columns, np.arange(k) // columns
+    thickness = np.zeros(columns)
+    np.maximum.at(thickness, column, major)
+    height = np.zeros(row.max(initial=0) + 1)
+    np.maximum.at(height, row, minor)
+    column_start = np.cumsum(thickness + major_spacing) - thickness - major_spacing
+    row_start = np.cumsum(height + minor_spacing) - height - minor_spacing
+    return column_start[column], row_start[row]
+
+
+def _pack(desired, offset, order, sorted_layer):
+    """Positions close to `desired` that keep the order and spacing of the
+    nodes within their layers, averaging the placements that resolve overlaps
+    by pushing nodes forward and by pushing them back
+    """
+    slack = desired[order] - offset[order]
+    # keep the running extremes from leaking between layers
+    lift = (np.abs(slack).max(initial=0) + 1) * 2 * sorted_layer
+    forward = np.maximum.accumulate(slack + lift) - lift
+    backward = np.minimum.accumulate((slack + lift)[::-1])[::-1] - lift
+    result = np.empty(len(order))
+    result[order] = offset[order] + (forward + backward) / 2
+    return result
+
+
+def _place_edge_labels(edge: Dict, points: List[Tuple[float, float]]):
+    """Stack the labels of the edge above the middle of its route"""
+    mid = len(points) // 2
+    mx = (points[mid - 1][0] + points[mid][0]) / 2
+    my = (points[mid - 1][1] + points[mid][1]) / 2
+    for label in edge.get("labels") or []:
+        lw, lh = _fill_size(label)
+        label["x"] = mx - lw / 2
+        label["y"] = my - lh - LABEL_SPACING
+        my -= lh + LABEL_SPACING
+
+
+def _size(el: Dict, key: str) -> float:
+    return float(el.get(key) or 0)
+
+
+def _fill_size(label: Dict) -> Tuple[float, float]:
+    width, height = _size(label, "width"), _size(label, "height")
+    label["width"], label["height"] = width, height
+    return width, height
+
+
+def _endpoint(edge: Dict, end: str) -> Optional[str]:
+    many = edge.get(f"{end}s")
+    if many:
+        return many[0]
+    return edge.get(end)
+
+
+def _padding(value) -> Tuple[float, float, float, float]:
+    sides = dict(top=12.0, left=12.0, bottom=12.0, right=12.0)
+    for side, amount in PADDING_PATTERN.findall(str(value)):
+        sides[side] = float(amount)
+    return sides["top"], sides["left"], sides["bottom"], sides["right"]
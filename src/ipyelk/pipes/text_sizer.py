@@ -2,14 +2,23 @@
 
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import asyncio
+from collections import OrderedDict
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+
 import traitlets as T
 
 from ..constants import EXTENSION_NAME, EXTENSION_SPEC_VERSION
-from ..elements import Label, index
+from ..elements import Label, Node, convert_elkjson, index, serialize_element, trusted
 from ..styled_widget import StyledWidget
 from . import flows as F
 from .base import Pipe, SyncedPipe
-from .util import wait_for_change
+from .tracing import tracer
+
+# text, css classes and style hash of a label
+SizeKey = Tuple[str, str, int]
+Size = Tuple[float, float]
 
 
 class TextSizer(Pipe):
@@ -55,7 +64,7 @@ def size_nested_label(label: Label) -> Label:
 
     for sublabel in label.labels or []:
         ls = size_nested_label(sublabel)
-        layout_opts = sublabel.layoutOptions
+        layout_opts = sublabel.peek("layoutOptions")
         spacing = float(layout_opts.get("org.eclipse.elk.spacing.labelLabel", 0))
         width += ls.width or 0 + spacing
         height = max(height, ls.height or 0)
@@ -65,8 +74,84 @@ def size_nested_label(label: Label) -> Label:
     return label
 
 
+class TextSizeCache(T.HasTraits):
+    """Least recently used cache of the sizes of label texts measured in the
+    browser, keyed by the text, css classes of the label and the hash of the
+    style it was measured with.
+
+    Attributes
+    ----------
+    maxsize: int
+        number of sizes to keep, `0` disables the cache
+    hits: int
+        number of lookups that found a size
+    misses: int
+        number of lookups that did not find a size
+
+    """
+
+    maxsize: int = T.Int(default_value=10_000, min=0)
+    hits: int = T.Int(default_value=0)
+    misses: int = T.Int(default_value=0)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sizes: OrderedDict = OrderedDict()
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def get(self, key: SizeKey) -> Optional[Size]:
+        size = self._sizes.get(key)
+        if size is None:
+            self.misses += 1
+        else:
+            self._sizes.move_to_end(key)
+            self.hits += 1
+        return size
+
+    def put(self, key: SizeKey, size: Size):
+        if not self.maxsize:
+            return
+        self._sizes[key] = size
+        self._sizes.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        self._sizes.clear()
+        self.hits = self.misses = 0
+
+    @T.observe("maxsize")
+    def _evict(self, change=None):
+        while len(self._sizes) > self.maxsize:
+            self._sizes.popitem(last=False)
+
+
+# shared by all text sizers, so sizes persist across diagrams
+TEXT_SIZES = TextSizeCache()
+
+
+def is_sized(label: Label) -> bool:
+    """If the label shape has a width and height, which are not measured"""
+    shape = label.peek("properties").shape
+    return bool(shape is not None and shape.width and shape.height)
+
+
 class BrowserTextSizer(SyncedPipe, StyledWidget, TextSizer):
-    """Jupyterlab widget for getting rendered text sizes from the DOM"""
+    """Jupyterlab widget for getting rendered text sizes from the DOM.
+
+    The labels are sized in a copy of the inlet value, which becomes the
+    outlet value, and the inlet value is left as it is. Only labels whose
+    text, css classes and style were not measured before are sent to the
+    browser, each distinct one once. The sizes are kept in a `cache` that is
+    shared by all text sizers by default.
+
+    Attributes
+    ----------
+    cache: :py:class:`TextSizeCache`
+        measured sizes of label texts
+
+    """
 
     _model_name = T.Unicode("ELKTextSizerModel").tag(sync=True)
     _model_module = T.Unicode(EXTENSION_NAME).tag(sync=True)
@@ -75,19 +160,100 @@ class BrowserTextSizer(SyncedPipe, StyledWidget, TextSizer):
     _view_module = T.Unicode(EXTENSION_NAME).tag(sync=True)
     _view_module_version = T.Unicode(EXTENSION_SPEC_VERSION).tag(sync=True)
 
+    cache: TextSizeCache = T.Instance(TextSizeCache)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._request_ids = count()
+        self.on_msg(self._handle_measured)
+
+    @T.default("cache")
+    def _default_cache(self):
+        return TEXT_SIZES
+
+    @property
+    def style_hash(self) -> int:
+        """Hash of the css the labels are measured with"""
+        return hash(self.raw_css)
+
     async def run(self):
-        """Go measure some DOM"""
-        # watch once
+        """Size the labels from the cache and measure the others in the DOM"""
         if self.outlet is None:
             return
+        value = self.inlet.value
+        if value is not None:
+            value = self.copy_inlet()
+            await self.size_labels(value)
 
-        # signal to browser and wait for done
-        future_value = wait_for_change(self.outlet, "value")
+        if value is self.outlet.value:
+            # force refresh if same instance
+            self.outlet._notify_trait("value", None, value)
+        else:
+            self.outlet.value = value
+        self.outlet.persist()
 
-        self.send({"action": "run"})
+    def copy_inlet(self) -> Node:
+        """Copy of the inlet value, with the ids of its elements"""
+        with self.inlet.index.context:
+            with tracer.span("serialize", "serialize"):
+                data = serialize_element(self.inlet.value)
+            with tracer.span("copy", "deserialize"), trusted:
+                return convert_elkjson(data)
 
-        # wait to return until
-        # TODO if there is no change to the input text the
-        # outlet value doesn't trigger
-        await future_value
-        self.outlet.persist()
+    async def size_labels(self, root: Node):
+        """Set the width and height of the labels in the hierarchy that are not
+        sized by their shape
+        """
+        style = self.style_hash
+        cache = self.cache
+        missing: Dict[SizeKey, List[Label]] = {}
+        labels = 0
+        for el in index.iter_elements(root):
+            if not isinstance(el, Label) or is_sized(el):
+                continue
+            labels += 1
+            key = (el.text, el.peek("properties").cssClasses or "", style)
+            if key in missing:
+                missing[key].append(el)
+                continue
+            size = cache.get(key)
+            if size is None:
+                missing[key] = [el]
+            else:
+                el.width, el.height = size
+        tracer.annotate(labels=labels, measured=len(missing))
+        if not missing:
+            return
+
+        keys = list(missing)
+        sizes = await self.measure([
+            {"text": text, "properties": {"cssClasses": css}} for text, css, _ in keys
+        ])
+        for key, size in zip(keys, sizes):
+            cache.put(key, size)
+            for label in missing[key]:
+                label.width, label.height = size
+
+    async def measure(self, labels: List[Dict]) -> List[Size]:
+        """Measure the elk json labels in the browser
+
+        :param labels: labels with a `text` and `properties.cssClasses`
+        :return: width and height of the labels in the same order
+        """
+        request = next(self._request_ids)
+        future = self._requests[request] = asyncio.get_running_loop().create_future()
+        try:
+            with tracer.span("browser", "browser", labels=len(labels)):
+                self.send({"action": "measure", "request": request, "labels": labels})
+                sizes = await future
+        finally:
+            self._requests.pop(request, None)
+        return [(float(width), float(height)) for width, height in sizes]
+
+    def _handle_measured(self, _, content, buffers):
+        if content.get("action") != "measured":
+            return
+        future = self._requests.get(content.get("request"))
+        if future is not None and not future.done():
+            future.set_result(content["sizes"])
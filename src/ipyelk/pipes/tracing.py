@@ -0,0 +1,142 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import json
+import os
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from ..elements.common import CounterContextManager, JSONValue
+
+
+class Span:
+    """Timing of a named step, with the steps it is made of
+
+    :param name: name of the step
+    :param category: kind of work, e.g. `pipe`, `serialize`, `browser`
+    :param args: counts of the work, e.g. `elements` or `bytes`
+    """
+
+    __slots__ = ("args", "category", "children", "end", "name", "start")
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any]):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = perf_counter_ns()
+        self.end: Optional[int] = None
+        self.children: List[Span] = []
+
+    def __repr__(self):
+        return f"<Span {self.name!r} {self.category} {self.duration:.6f}s>"
+
+    @property
+    def duration(self) -> float:
+        """Seconds the step took, or has taken so far"""
+        end = perf_counter_ns() if self.end is None else self.end
+        return (end - self.start) / 1e9
+
+    def walk(self) -> Iterator["Span"]:
+        """The span and all the spans within it"""
+        stack = [self]
+        while stack:
+            span = stack.pop()
+            yield span
+            stack.extend(reversed(span.children))
+
+    def find(self, name: str) -> List["Span"]:
+        """Spans within this span, or this span, with the name"""
+        return [span for span in self.walk() if span.name == name]
+
+
+class Tracer(CounterContextManager):
+    """Records nested :py:class:`Span` timings of pipes while active, as in
+    `with tracer: ...`. Completed top level spans are kept in a rolling
+    `history` and can be exported as Chrome trace events, e.g. for
+    `chrome://tracing` or `Perfetto <https://ui.perfetto.dev>`_.
+
+    :param history: number of top level spans to keep
+    """
+
+    def __init__(self, history: int = 32):
+        self.history: deque = deque(maxlen=history)
+        self._current: ContextVar[Optional[Span]] = ContextVar(
+            f"ipyelk-span-{id(self)}", default=None
+        )
+
+    @property
+    def current(self) -> Optional[Span]:
+        """Innermost open span of the running task"""
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, category: str = "pipe", **args):
+        """Time the body as a span within the current span, if tracing is active
+
+        :param name: name of the step
+        :param category: kind of work
+        :param args: counts of the work
+        """
+        if not self.active:
+            yield None
+            return
+        parent = self._current.get()
+        span = Span(name, category, args)
+        token = self._current.set(span)
+        try:
+            yield span
+        finally:
+            span.end = perf_counter_ns()
+            self._current.reset(token)
+            if parent is None:
+                self.history.append(span)
+            else:
+                parent.children.append(span)
+
+    def annotate(self, **args):
+        """Add counts to the current span, if there is one"""
+        span = self._current.get()
+        if span is not None:
+            span.args.update(args)
+
+    def clear(self):
+        self.history.clear()
+
+    def to_chrome(self, spans: Optional[List[Span]] = None) -> Dict:
+        """Chrome trace events of the spans, by default the history. Every top
+        level span gets its own track.
+        """
+        pid = os.getpid()
+        events = []
+        for tid, root in enumerate(self.history if spans is None else spans):
+            for span in root.walk():
+                end = perf_counter_ns() if span.end is None else span.end
+                events.append({
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start / 1e3,
+                    "dur": (end - span.start) / 1e3,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": span.args,
+                })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Union[str, Path], spans: Optional[List[Span]] = None):
+        """Write the Chrome trace events of the spans to a json file"""
+        text = json.dumps(self.to_chrome(spans), default=str)
+        Path(path).write_text(text, encoding="utf-8")
+
+
+tracer = Tracer()
+
+
+def json_bytes(data: JSONValue) -> int:
+    """Size of the data as json, only measured when tracing is active"""
+    if not tracer.active or data is None:
+        return 0
+    return len(json.dumps(data, separators=(",", ":")).encode("utf-8"))
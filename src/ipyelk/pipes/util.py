@@ -11,7 +11,8 @@ def wait_for_change(widget, value):
 
     def getvalue(change):
         """Make the new value available"""
-        future.set_result(change.new)
+        if not future.done():
+            future.set_result(change.new)
 
     def unobserve(f):
         """Unobserves the `getvalue` callback"""
@@ -9,9 +9,21 @@ from ..elements import EdgeReport, IDReport, Node
 from . import flows as F
 from .base import Pipe
 from .marks import MarkIndex
+from .tracing import tracer
 
 
 class ValidationPipe(Pipe):
+    """Check the ids of the elements and the owners of edges and fix them.
+
+    Attributes
+    ----------
+    incremental: bool
+        keep the reports of a live index between runs and only recheck the
+        elements touched since the last check, see
+        :py:class:`~ipyelk.elements.validation.IncrementalValidation`
+
+    """
+
     observes = TypedTuple(T.Unicode(), default_value=(F.New,))
     reports = TypedTuple(T.Unicode(), default_value=(F.Layout,))
     fix_null_id = T.Bool(default_value=True)
@@ -21,28 +33,38 @@ class ValidationPipe(Pipe):
     edge_report = T.Instance(EdgeReport, kw={})
     schema_report = T.Dict(kw={})
     errors = T.Dict(kw={})
+    incremental: bool = T.Bool(default_value=True)
 
     async def run(self):
         index: MarkIndex = self.inlet.build_index()
+        tracer.annotate(elements=len(index.elements.elements))
         with index.context:
-            self.get_reports(index)
+            with tracer.span("inlet reports", "compute"):
+                self.get_reports(index)
             self.errors = self.collect_errors()
             if self.errors:
                 raise ValueError("Inlet value is not valid")
-            value = self.apply_fixes(index)
+            with tracer.span("fixes", "compute"):
+                value = self.apply_fixes(index)
 
             if value is self.outlet.value:
                 # force refresh if same instance
                 self.outlet._notify_trait("value", None, value)
             else:
                 self.outlet.value = value
-            self.get_reports(self.outlet.build_index())
+            with tracer.span("outlet reports", "compute"):
+                self.get_reports(self.outlet.build_index())
             self.errors = self.collect_errors()
             if self.errors:
                 raise ValueError("Outlet value is not valid")
 
     def get_reports(self, index: MarkIndex):
-        self.edge_report, self.id_report = index.elements.get_reports()
+        elements = index.elements
+        if self.incremental and elements.is_live():
+            reports = elements.validation().reports()
+        else:
+            reports = elements.get_reports()
+        self.edge_report, self.id_report = reports
 
     def collect_errors(self) -> Dict:
         errors = {}
@@ -1,22 +1,257 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+from collections import defaultdict
+from typing import Dict, List, Mapping, Optional, Set
 
 import traitlets as T
 from ipywidgets.widgets.trait_types import TypedTuple
 
 from ..elements import (
+    BaseElement,
+    Edge,
+    ElkJSONBuilder,
+    Node,
     Registry,
     VisIndex,
-    convert_elkjson,
     exclude_hidden,
     exclude_layout,
     index,
+    serialize_element,
+    trusted,
 )
 from . import flows as F
 from .base import Pipe
+from .tracing import tracer
+
+
+class Projection:
+    """Visible elements of a diagram with slack ports and edges in place of
+    hidden elements, which can be updated when the hidden state of nodes
+    changes.
+
+    The ids of the elements are the ids the inlet `context` generated for them.
+    """
+
+    def __init__(self, root: Node, context: Registry):
+        self.root = root
+        self.context = context
+        self.registry = Registry(compact=True, prefix="_v")
+        self.flagged: Set[str] = set()
+        self.value: Optional[Node] = None
+        self.vis_index: Optional[VisIndex] = None
+        self.builder: Optional[ElkJSONBuilder] = None
+        self.edges: Dict[str, Edge] = {}
+        self._endpoints: Optional[Dict[str, List[Edge]]] = None
+        self._owners: Dict[str, str] = {}
+
+    def build(self, flagged: Set[str]) -> Node:
+        """Project the whole diagram"""
+        root = self.root
+        with self.context:
+            # generate an index of hidden elements
+            self.vis_index = vis_index = VisIndex.from_els(root)
+
+            # clear old slack css classes from elements
+            vis_index.clear_slack(root)
+
+            # serialize the elements excluding hidden, keeping the ids the inlet
+            # generated for unnamed elements
+            with exclude_hidden, exclude_layout:
+                data = serialize_element(root)
+
+        # new root node with slack edges / ports introduced due to hidden
+        # elements. the data was serialized from validated elements so it is
+        # rebuilt without validating again
+        with self.registry, trusted:
+            self.builder = ElkJSONBuilder(vis_index=vis_index)
+            self.value = self.builder.from_dict(data)
+            self._track(self.value)
+        self.flagged = flagged
+        return self.value
+
+    def update(self, flagged: Set[str], elements: Mapping[str, BaseElement]) -> bool:
+        """Reproject the subtrees of nodes whose hidden state changed
+
+        :param flagged: ids of the inlet elements that are hidden
+        :param elements: inlet elements by id
+        :return: if the projection could be updated, otherwise it needs to be
+            built again
+        """
+        projected = self.builder.index.elements
+        toggled = flagged ^ self.flagged
+        nodes = [elements.get(key) for key in toggled]
+        if not all(isinstance(node, Node) for node in nodes):
+            return False
+        with self.context:
+            tops = []
+            for node in nodes:
+                parent = node.get_parent()
+                if parent is None:
+                    return False
+                if any(n.get_id() in toggled for n in _ancestors(parent)):
+                    continue
+                if parent.get_id() not in projected:
+                    # still inside a hidden node
+                    continue
+                tops.append(node)
+            if tops and self._endpoints is None:
+                self._index_edges()
+            with exclude_hidden, exclude_layout, trusted:
+                for node in tops:
+                    self._reproject(node)
+        self.flagged = flagged
+        return True
+
+    def can_update(self, root: Node, value: Optional[Node], context: Registry) -> bool:
+        """If this is the projection of `root` in `context` and `value` is still
+        the projected node
+        """
+        return self.root is root and self.value is value and self.context is context
+
+    def _index_edges(self):
+        """Look up the inlet edges by their endpoints"""
+        self._endpoints = defaultdict(list)
+        for owner, edge in index.iter_edges(self.root):
+            self._owners[edge.get_id()] = owner.get_id()
+            self._endpoints[edge.source.get_id()].append(edge)
+            self._endpoints[edge.target.get_id()].append(edge)
+
+    def _reproject(self, node: Node):
+        subtree = list(index.iter_elements(node))
+        keys = {el.get_id() for el in subtree}
+        self._drop_projection(node, keys)
+        self._update_hidden(node, keys)
+        if not node.peek("properties").hidden:
+            self._project(node)
+        self._reproject_connections(subtree, keys)
+
+    def _drop_projection(self, node: Node, keys: Set[str]):
+        """Remove the previous projection of the subtree and the slack ports
+        standing in for its hidden elements
+        """
+        for key in keys:
+            self._remove_slack_port(key)
+        projected = self.builder.index.elements.get(node.get_id())
+        if isinstance(projected, Node):
+            _remove(projected.get_parent().children, projected)
+            projected.set_parent(None)
+            self._untrack(projected)
+
+    def _update_hidden(self, node: Node, keys: Set[str]):
+        """Hidden state of the subtree below its visible parent"""
+        vis_index = self.vis_index
+        for key in keys:
+            vis_index.hidden.pop(key, None)
+            vis_index.last_visible.pop(key, None)
+        for el, is_hidden, last in index.iter_visible(
+            node, hidden=False, last_visible=node.get_parent()
+        ):
+            if is_hidden:
+                key = el.get_id()
+                vis_index.hidden[key] = el
+                vis_index.last_visible[key] = last.get_id()
+
+    def _project(self, node: Node):
+        """Insert a new projection of the subtree among the visible siblings"""
+        parent = node.get_parent()
+        data = serialize_element(node)
+        position = 0
+        for child in parent.children:
+            if child is node:
+                break
+            if child.get_id() not in self.vis_index.hidden:
+                position += 1
+        projected_parent = self.builder.index.elements[parent.get_id()]
+        with self.registry:
+            value = self.builder.from_dict(data)
+            self._track(value)
+        projected_parent.children.insert(position, value.set_parent(projected_parent))
+
+    def _reproject_connections(self, subtree: List[BaseElement], keys: Set[str]):
+        """Reproject the edges owned outside of the subtree that connect to it
+        and drop the slack ports that are no longer connected
+        """
+        affected: Dict[str, Edge] = {}
+        slack: Set[str] = set()
+        for el in subtree:
+            if isinstance(el, Edge):
+                slack.update((el.source.get_id(), el.target.get_id()))
+        for key in keys:
+            for edge in self._endpoints.get(key, ()):
+                edge_id = edge.get_id()
+                if self._owners[edge_id] not in keys:
+                    affected[edge_id] = edge
+                slack.update((edge.source.get_id(), edge.target.get_id()))
+        self._reproject_edges(affected)
+
+        for key in slack - keys:
+            if key in self.vis_index.hidden and not any(
+                edge.get_id() in self.edges for edge in self._endpoints.get(key, ())
+            ):
+                self._remove_slack_port(key)
+
+    def _reproject_edges(self, edges: Dict[str, Edge]):
+        elements = self.builder.index.elements
+        # drop the previous projections in one pass over each owner's edges
+        stale: Dict[str, Set[int]] = defaultdict(set)
+        for edge_id in edges:
+            previous = self.edges.pop(edge_id, None)
+            if previous is not None:
+                stale[self._owners[edge_id]].add(id(previous))
+        for owner_id, previous in stale.items():
+            owner = elements[owner_id]
+            owner.edges[:] = [e for e in owner.edges if id(e) not in previous]
+
+        for edge_id, edge in edges.items():
+            owner = elements.get(self._owners[edge_id])
+            if not isinstance(owner, Node) or edge.peek("properties").hidden:
+                continue
+            data = serialize_element(edge)
+            with self.registry:
+                projected = self.builder.index.build_edge(data)
+                if projected is not None:
+                    owner.edges.append(projected)
+                    self._track(projected)
+
+    def _remove_slack_port(self, key: str):
+        last_visible = self.vis_index.last_visible.get(key)
+        node = self.builder.index.elements.get(last_visible)
+        if not isinstance(node, Node):
+            return
+        for port in node.ports:
+            if port.peek("properties").key == key:
+                _remove(node.ports, port)
+                port.set_parent(None)
+                return
+
+    def _track(self, value: BaseElement):
+        """Record the projected elements and give them fixed ids"""
+        for el in index.iter_elements(value):
+            el.id = el.get_id()
+            if isinstance(el, Edge):
+                self.edges[el.id] = el
+
+    def _untrack(self, value: BaseElement):
+        elements = self.builder.index.elements
+        for el in index.iter_elements(value):
+            if isinstance(el, Edge):
+                self.edges.pop(el.id, None)
+            elif elements.get(el.id) is el:
+                del elements[el.id]
 
 
 class VisibilityPipe(Pipe):
+    """Project the diagram without hidden elements, connecting edges to the
+    closest visible ancestor of hidden elements with slack ports.
+
+    Attributes
+    ----------
+    incremental: bool
+        keep the projection between runs and only reproject the subtrees of
+        nodes whose hidden state changed, if nothing else changed
+
+    """
+
     observes = TypedTuple(
         T.Unicode(),
         default_value=(
@@ -24,6 +259,9 @@ class VisibilityPipe(Pipe):
             F.Layout,
         ),
     )
+    incremental: bool = T.Bool(default_value=True)
+
+    _projection: Optional[Projection] = None
 
     @T.default("reports")
     def _default_reports(self):
@@ -34,23 +272,47 @@ class VisibilityPipe(Pipe):
             return None
 
         root = self.inlet.index.root
-        # generate an index of hidden elements
-        vis_index = VisIndex.from_els(root)
+        flagged = self.flagged()
+        projection = self._projection
+        if (
+            self.incremental
+            and projection is not None
+            and projection.can_update(root, self.outlet.value, self.inlet.index.context)
+            and self.only_hidden_changed()
+            and projection.update(flagged, self.inlet.index.elements.elements)
+        ):
+            self.outlet.notify_value_changed()
+            return self.outlet
+
+        projection = Projection(root, self.inlet.index.context)
+        with tracer.span("project", "compute", hidden=len(flagged)):
+            self.outlet.value = projection.build(flagged)
+        self._projection = projection if self.incremental else None
+        return self.outlet
 
-        # clear old slack css classes from elements
-        vis_index.clear_slack(root)
+    def flagged(self) -> Set[str]:
+        """Ids of the inlet elements that are hidden"""
+        return {
+            key
+            for key, el in self.inlet.index.elements.items()
+            if el.peek("properties").hidden
+        }
 
-        # serialize the elements excluding hidden
-        with exclude_hidden, exclude_layout:
-            data = root.dict()
+    def only_hidden_changed(self) -> bool:
+        hidden = F.compile_flows((F.AnyHidden,))
+        flow = self.inlet.flow
+        return bool(flow) and all(hidden.match(f) for f in flow)
 
-        # new root node with slack edges / ports introduced due to hidden
-        # elements
-        with Registry():
-            value = convert_elkjson(data, vis_index)
 
-            for el in index.iter_elements(value):
-                el.id = el.get_id()
-        self.outlet.value = value
+def _ancestors(node: Optional[Node]):
+    while node is not None:
+        yield node
+        node = node.get_parent()
 
-        return self.outlet
+
+def _remove(items: List, item):
+    """Remove the item by identity rather than equality"""
+    for i, other in enumerate(items):
+        if other is item:
+            del items[i]
+            return
@@ -1,6 +1,20 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
 
-from .validator import SCHEMA, ElkSchemaValidator, validate_elk_json
+from .compiled import CompiledValidator
+from .validator import (
+    SCHEMA,
+    ElkCompiledValidator,
+    ElkSchemaValidator,
+    format_errors,
+    validate_elk_json,
+)
 
-__all__ = ["SCHEMA", "ElkSchemaValidator", "validate_elk_json"]
+__all__ = [
+    "SCHEMA",
+    "CompiledValidator",
+    "ElkCompiledValidator",
+    "ElkSchemaValidator",
+    "format_errors",
+    "validate_elk_json",
+]
@@ -0,0 +1,332 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from numbers import Number
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import jsonschema
+
+# properties with nested elements, as in `ipyelk.pipes.patch`
+NESTED = ("children", "ports", "labels", "edges")
+
+# relative path, message and instance of an error
+Failure = Tuple[Tuple, str, object]
+Check = Callable[[object], Iterator[Failure]]
+
+# keywords that are compiled, other keywords are left to jsonschema
+KEYWORDS = {
+    "$ref",
+    "$schema",
+    "additionalProperties",
+    "definitions",
+    "description",
+    "items",
+    "properties",
+    "required",
+    "title",
+    "type",
+}
+
+TYPES: Dict[str, Callable[[object], bool]] = {
+    "array": lambda value: isinstance(value, list),
+    "boolean": lambda value: isinstance(value, bool),
+    "integer": lambda value: (isinstance(value, int) and not isinstance(value, bool))
+    or (isinstance(value, float) and value.is_integer()),
+    "null": lambda value: value is None,
+    "number": lambda value: isinstance(value, Number) and not isinstance(value, bool),
+    "object": lambda value: isinstance(value, dict),
+    "string": lambda value: isinstance(value, str),
+}
+
+
+class CompiledValidator:
+    """Draft 7 validation of elk json with a check compiled once per element
+    type of the schema definitions.
+
+    Every element is checked against its own definition, the elements nested
+    in its `children`, `ports`, `labels` and `edges` are checked in turn
+    rather than by recursing through the schema. Checks are compiled from the
+    `type`, `properties`, `required`, `additionalProperties`, `items` and
+    `$ref` keywords when first needed, any other keyword is left to a
+    :py:class:`jsonschema.Draft7Validator` of that part of the schema.
+
+    Elements can also be checked in their flat form from
+    :py:func:`~ipyelk.pipes.patch.flatten`, where nested elements are lists of
+    ids, e.g. only the ones changed by a patch.
+
+    :param schema: schema with `definitions` of the element types
+    :param root: definition of the top level element
+    """
+
+    def __init__(self, schema: Dict, root: str):
+        self.schema = schema
+        self.root = root
+        self._checks: Dict[str, Check] = {}
+        self._elements: Dict[str, Tuple[Check, Dict[str, str]]] = {}
+        self._fallback: Optional[jsonschema.Draft7Validator] = None
+
+    def iter_errors(
+        self, data: object, types: Optional[Dict[str, str]] = None
+    ) -> Iterator[jsonschema.ValidationError]:
+        """Errors of the elk json of the root element
+
+        :param data: elk json
+        :param types: filled with the definition of every element by id, as
+            needed by :py:meth:`iter_patch_errors`
+        """
+        stack: List[Tuple[object, str, Tuple]] = [(data, self.root, ())]
+        while stack:
+            el, name, path = stack.pop()
+            check, nested = self.element(name)
+            for rel, message, instance in check(el):
+                yield _error(message, (*path, *rel), instance)
+            if not isinstance(el, dict):
+                continue
+            if types is not None and isinstance(el.get("id"), str):
+                types[el["id"]] = name
+            for key, child in nested.items():
+                items = el.get(key)
+                if isinstance(items, list):
+                    stack.extend(
+                        (item, child, (*path, key, i))
+                        for i, item in reversed(list(enumerate(items)))
+                    )
+
+    def iter_patch_errors(
+        self, flat: Dict[str, Dict], ops: Iterable[Dict], types: Dict[str, str]
+    ) -> Iterator[jsonschema.ValidationError]:
+        """Errors of the elements added or updated by the patch operations
+
+        :param flat: flat elements after the patch
+        :param ops: operations from :py:func:`~ipyelk.pipes.patch.diff`
+        :param types: definition of the elements by id before the patch,
+            updated in place
+        """
+        changed = []
+        for op in ops:
+            key = op["id"]
+            if op["op"] == "remove":
+                types.pop(key, None)
+            else:
+                changed.append(key)
+        yield from self.iter_flat_errors(flat, changed, types)
+
+    def iter_flat_errors(
+        self, flat: Dict[str, Dict], keys: Iterable[str], types: Dict[str, str]
+    ) -> Iterator[jsonschema.ValidationError]:
+        """Errors of some of the flat elements
+
+        :param flat: flat elements
+        :param keys: ids of the elements to check, parents before children
+        :param types: definition of the elements by id, at least of the parents
+            of the elements, updated in place
+        """
+        for key in keys:
+            name = types.get(key)
+            if name is None:
+                yield _error(f"{key!r} is not nested in an element", (key,), None)
+                continue
+            entry = flat[key]
+            check, nested = self.element(name)
+            for rel, message, instance in check(entry):
+                yield _error(message, (key, *rel), instance)
+            # the lists of nested elements give the types of added elements
+            for prop, child in nested.items():
+                items = entry.get(prop)
+                if isinstance(items, list):
+                    for item in items:
+                        if isinstance(item, str):
+                            types[item] = child
+
+    def is_valid(self, data: object) -> bool:
+        return next(self.iter_errors(data), None) is None
+
+    def validate(self, data: object):
+        """Raise the first error of the elk json, if any"""
+        for error in self.iter_errors(data):
+            raise error
+
+    def element(self, name: str) -> Tuple[Check, Dict[str, str]]:
+        """Check of a single element of the definition, without the elements
+        nested in it, and the definitions of those by property
+        """
+        compiled = self._elements.get(name)
+        if compiled is None:
+            schema = self.schema["definitions"][name]
+            nested = {}
+            for prop in NESTED:
+                items = schema.get("properties", {}).get(prop, {}).get("items", {})
+                ref = _definition(items.get("$ref"))
+                if ref is not None and set(items) == {"$ref"}:
+                    nested[prop] = ref
+            if nested:
+                # nested elements are only checked to be listed
+                properties = dict(schema["properties"])
+                properties.update({prop: {"type": "array"} for prop in nested})
+                schema = {**schema, "properties": properties}
+            compiled = self._elements[name] = (self.compile(schema), nested)
+        return compiled
+
+    def compile(self, schema: object) -> Check:
+        """Check of a value against the (sub) schema"""
+        if schema is True or schema == {}:
+            return _valid
+        if not isinstance(schema, dict) or set(schema) - KEYWORDS:
+            return self._jsonschema(schema)
+        if "$ref" in schema:
+            # draft 7 ignores the keywords next to a reference
+            name = _definition(schema["$ref"])
+            return self._jsonschema(schema) if name is None else self._reference(name)
+        if not isinstance(schema.get("items", {}), dict):
+            return self._jsonschema(schema)
+        checks = [
+            compile_keyword(self, schema)
+            for keyword, compile_keyword in COMPILERS.items()
+            if keyword in schema
+        ]
+        return _all([check for check in checks if check is not None])
+
+    def compile_additional(self, schema: Dict) -> Optional[Check]:
+        """Check of additional properties, `None` if they are not allowed"""
+        additional = schema["additionalProperties"]
+        if additional is False:
+            return None
+        return self.compile(additional)
+
+    def _reference(self, name: str) -> Check:
+        checks = self._checks
+
+        def check(value):
+            compiled = checks.get(name)
+            if compiled is None:
+                compiled = checks[name] = self.compile(self.schema["definitions"][name])
+            return compiled(value)
+
+        return check
+
+    def _jsonschema(self, schema: object) -> Check:
+        if self._fallback is None:
+            self._fallback = jsonschema.Draft7Validator(self.schema)
+        validator = self._fallback.evolve(schema=schema)
+
+        def check(value):
+            for error in validator.iter_errors(value):
+                yield tuple(error.path), error.message, error.instance
+
+        return check
+
+
+def _definition(ref: Optional[str]) -> Optional[str]:
+    prefix = "#/definitions/"
+    if isinstance(ref, str) and ref.startswith(prefix):
+        name = ref[len(prefix) :]
+        if "/" not in name:
+            return name
+    return None
+
+
+def _error(message: str, path: Tuple, instance: object) -> jsonschema.ValidationError:
+    return jsonschema.ValidationError(message, path=path, instance=instance)
+
+
+def _valid(value) -> Iterator[Failure]:
+    return iter(())
+
+
+def _all(checks: List[Check]) -> Check:
+    if not checks:
+        return _valid
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value):
+        for each in checks:
+            yield from each(value)
+
+    return check
+
+
+def _type(types) -> Check:
+    types = [types] if isinstance(types, str) else list(types)
+    tests = [TYPES[t] for t in types]
+    reprs = ", ".join(repr(t) for t in types)
+
+    def check(value):
+        if not any(test(value) for test in tests):
+            yield (), f"{value!r} is not of type {reprs}", value
+
+    return check
+
+
+def _required(required: List[str]) -> Check:
+    def check(value):
+        if isinstance(value, dict):
+            for key in required:
+                if key not in value:
+                    yield (), f"{key!r} is a required property", value
+
+    return check
+
+
+def _properties(properties: Dict[str, Check]) -> Check:
+    def check(value):
+        if isinstance(value, dict):
+            for key, sub in value.items():
+                prop = properties.get(key)
+                if prop is not None:
+                    for rel, message, instance in prop(sub):
+                        yield (key, *rel), message, instance
+
+    return check
+
+
+def _additional(known: set, additional: Optional[Check]) -> Check:
+    def check(value):
+        if not isinstance(value, dict):
+            return
+        extras = [key for key in value if key not in known]
+        if not extras:
+            return
+        if additional is None:
+            extras = sorted(extras, key=str)
+            verb = "was" if len(extras) == 1 else "were"
+            joined = ", ".join(repr(extra) for extra in extras)
+            message = f"Additional properties are not allowed ({joined} {verb} "
+            yield (), f"{message}unexpected)", value
+            return
+        for key in extras:
+            for rel, message, instance in additional(value[key]):
+                yield (key, *rel), message, instance
+
+    return check
+
+
+def _items(item: Check) -> Check:
+    def check(value):
+        if isinstance(value, list):
+            for i, sub in enumerate(value):
+                for rel, message, instance in item(sub):
+                    yield (i, *rel), message, instance
+
+    return check
+
+
+def _compile_properties(validator: CompiledValidator, schema: Dict) -> Optional[Check]:
+    properties = {
+        key: validator.compile(sub) for key, sub in schema["properties"].items()
+    }
+    return _properties(properties) if properties else None
+
+
+def _compile_additional(validator: CompiledValidator, schema: Dict) -> Check:
+    known = set(schema.get("properties", {}))
+    return _additional(known, validator.compile_additional(schema))
+
+
+# checks of the compiled keywords by keyword, in the order they are reported
+COMPILERS: Dict[str, Callable[[CompiledValidator, Dict], Optional[Check]]] = {
+    "type": lambda _validator, schema: _type(schema["type"]),
+    "required": lambda _validator, schema: _required(schema["required"]),
+    "properties": _compile_properties,
+    "additionalProperties": _compile_additional,
+    "items": lambda validator, schema: _items(validator.compile(schema["items"])),
+}
@@ -4,28 +4,34 @@
 
 import json
 from pathlib import Path
-from typing import List
+from typing import Iterable, List
 
 import jsonschema
 
+from .compiled import CompiledValidator
+
 HERE = Path(__file__).parent
 SCHEMA = json.loads((HERE / "elkschema.json").read_text(encoding="utf-8"))
 SCHEMA["$ref"] = "#/definitions/AnyElkNode"
 
 
 ElkSchemaValidator = jsonschema.Draft7Validator(SCHEMA)
+ElkCompiledValidator = CompiledValidator(SCHEMA, root="AnyElkNode")
+
+
+def format_errors(errors: Iterable[jsonschema.ValidationError]) -> str:
+    msg = ""
+    for error in errors:
+        path = "/".join(map(str, error.path))
+        msg += f"\n#/{path}\n\t{error.message}"
+        msg += f"\n\t\t{json.dumps(error.instance, default=repr)[:70]}"
+    return msg
 
 
-def validate_elk_json(value) -> bool:
-    errors: List[jsonschema.ValidationError] = list(
-        ElkSchemaValidator.iter_errors(value)
-    )
+def validate_elk_json(value, compiled: bool = True) -> bool:
+    validator = ElkCompiledValidator if compiled else ElkSchemaValidator
+    errors: List[jsonschema.ValidationError] = list(validator.iter_errors(value))
 
     if errors:
-        msg = ""
-        for error in errors:
-            path = "/".join(map(str, error.path))
-            msg += f"\n#/{path}\n\t{error.message}"
-            msg += f"\n\t\t{json.dumps(error.instance)[:70]}"
-        raise jsonschema.ValidationError(msg)
+        raise jsonschema.ValidationError(format_errors(errors))
     return True
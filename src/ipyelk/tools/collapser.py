@@ -4,7 +4,7 @@
 import ipywidgets as W
 import traitlets as T
 
-from ..elements import BaseElement, Compartment, Node
+from ..elements import BaseElement, Compartment, LazyNode, Node
 from ..pipes import flows as F
 
 # from ..elements import Node
@@ -27,13 +27,21 @@ class ToggleCollapsedTool(Tool):
 
     async def run(self):
         should_refresh = False
+        expanded = False
         for selected in self.selection.elements():
+            if isinstance(selected, LazyNode) and not selected.loaded:
+                # build the children of the placeholder, which are visible
+                selected.expand()
+                expanded = True
+                continue
             for element in self.get_related(selected):
                 self.toggle(element)
                 should_refresh = True
 
         # trigger refresh if needed
-        if should_refresh:
+        if expanded:
+            self.tee.inlet.flow = (*self.reports, F.New)
+        elif should_refresh:
             self.tee.inlet.flow = self.reports
 
     def get_related(self, element: BaseElement):
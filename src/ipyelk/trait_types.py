@@ -1,15 +1,18 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
 
-import json
 from typing import List
 
 import jsonschema
 import traitlets
 
+from .schema import format_errors
+
 
 class Schema(traitlets.Any):
-    """any... but validated by a jsonschema.Validator"""
+    """any... but validated by a jsonschema.Validator, or a
+    :py:class:`~ipyelk.schema.CompiledValidator`
+    """
 
     _validator: jsonschema.Draft7Validator = None
 
@@ -22,10 +25,5 @@ class Schema(traitlets.Any):
             self._validator.iter_errors(value)
         )
         if errors:
-            msg = ""
-            for error in errors:
-                path = "/".join(map(str, error.path))
-                msg += f"\n#/{path}\n\t{error.message}"
-                msg += f"\n\t\t{json.dumps(error.instance)[:70]}"
-            raise traitlets.TraitError(msg)
+            raise traitlets.TraitError(format_errors(errors))
         return value
@@ -5,12 +5,17 @@
 from __future__ import annotations
 
 import json
+import random
 import re
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+import networkx as nx
 import pytest
 
+from ipyelk.elements import Edge, Label, Node, Port, convert_elkjson
+from ipyelk.loaders import NXLoader
+
 UTF8 = {"encoding": "utf-8"}
 
 HERE = Path(__file__).parent
@@ -24,6 +29,16 @@ CHANGELOG_MD = ROOT / "CHANGELOG.md"
 PACKAGE_JSON = ROOT / "package.json"
 PYPROJECT_TOML = ROOT / "pyproject.toml"
 README_MD = ROOT / "README.md"
+EXAMPLES = ROOT / "examples"
+
+NX_VINFO = tuple(map(int, nx.__version__.split(".")[:2]))
+NX_EDGES = "edges" if NX_VINFO >= (3, 4) else "link"
+
+EXAMPLE_GRAPHS = {
+    "simple": ("simple.json", None),
+    "flat_graph": ("flat_graph.json", None),
+    "hier_ports": ("hier_ports.json", "hier_tree.json"),
+}
 
 PIXI_PATTERNS = {
     CI_YML: (5, r"pixi-version: v(.*)"),
@@ -109,3 +124,72 @@ def the_readme_text() -> str:
     if not README_MD.exists():
         pytest.skip("Not in repo")
     return README_MD.read_text(**UTF8)
+
+
+def load_nx_graph(name: str) -> nx.MultiDiGraph:
+    data = json.loads((EXAMPLES / name).read_text(**UTF8))
+    return nx.readwrite.json_graph.node_link_graph(data, **{NX_EDGES: "links"})
+
+
+@pytest.fixture(params=sorted(EXAMPLE_GRAPHS))
+def an_example_root(request: pytest.FixtureRequest) -> Node:
+    """Provide the root element of an example graph, with generated ids."""
+    name, tree = EXAMPLE_GRAPHS[request.param]
+    if name == "simple.json":
+        return convert_elkjson(json.loads((EXAMPLES / name).read_text(**UTF8)))
+    hierarchy = None if tree is None else load_nx_graph(tree)
+    return NXLoader().load(load_nx_graph(name), hierarchy=hierarchy).value
+
+
+def _common(source: Node | Port, target: Node | Port) -> list[Node]:
+    a = source if isinstance(source, Node) else source.get_parent()
+    b = target if isinstance(target, Node) else target.get_parent()
+    ancestors = []
+    while a is not None:
+        ancestors.append(a)
+        a = a.get_parent()
+    while b is not None and b not in ancestors:
+        b = b.get_parent()
+    return ancestors[ancestors.index(b) :] if b is not None else []
+
+
+@pytest.fixture
+def make_root() -> Callable[..., Node]:
+    """Provide a factory of diagrams with a row of linked nodes."""
+
+    def make(size: int = 2, name: str = "root") -> Node:
+        root = Node(id=name)
+        nodes = [
+            root.add_child(Node(id=f"n{i}", width=10, height=10)) for i in range(size)
+        ]
+        for node in nodes:
+            node.add_port(Port(id=f"{node.id}_port", width=5, height=5))
+            node.labels.append(Label(id=f"{node.id}_label", text="x"))
+        for a, b in zip(nodes, nodes[1:]):
+            root.edges.append(Edge(id=f"{a.id}-{b.id}", source=a.ports[0], target=b))
+        return root
+
+    return make
+
+
+@pytest.fixture
+def random_root() -> Callable[..., Node]:
+    """Provide a factory of random trees with edges owned by common ancestors."""
+
+    def make(rng: random.Random, size: int = 40) -> Node:
+        root = Node(id="root")
+        nodes = [root]
+        for i in range(size):
+            parent = rng.choice(nodes)
+            node = parent.add_child(Node(id=f"n{i}", labels=[Label(text=f"n{i}")]))
+            if rng.random() < 0.3:
+                node.add_port(Port(id=f"n{i}_port"))
+            nodes.append(node)
+        endpoints = [p for n in nodes[1:] for p in [n, *n.ports]]
+        for i in range(size):
+            source, target = rng.sample(endpoints, 2)
+            owner = rng.choice([root, *_common(source, target)])
+            owner.edges.append(Edge(id=f"e{i}", source=source, target=target))
+        return root
+
+    return make
@@ -0,0 +1,118 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import json
+from contextlib import nullcontext
+
+from ipyelk.elements import (
+    Label,
+    Node,
+    Registry,
+    convert_elkjson,
+    iter_elements,
+    serialize_element,
+    shapes,
+    trusted,
+)
+
+
+def test_trusted_examples(an_example_root: Node):
+    """Trusted construction should rebuild the same elements"""
+    with Registry():
+        data = serialize_element(an_example_root)
+        with trusted:
+            root = convert_elkjson(data)
+        assert json.dumps(serialize_element(root)) == json.dumps(data)
+        for el in iter_elements(root):
+            if isinstance(el, Node):
+                assert all(child.get_parent() is el for child in el.children)
+
+
+def test_trusted_defaults():
+    """Missing fields get fresh defaults and nested models are converted"""
+    with trusted:
+        a = Node(labels=[{"text": "a"}], properties={"shape": {"type": "node:round"}})
+        b = Node()
+    assert isinstance(a.labels[0], Label)
+    assert isinstance(a.properties.shape, shapes.NodeShape)
+    assert a.properties is not b.properties
+    assert a.__fields_set__ == {"labels", "properties"}
+    assert b.ports == []
+    assert b.ports is not a.ports
+
+
+def test_lazy_defaults():
+    """Unset properties, metadata and layout options are allocated on access"""
+    for construction in (nullcontext, lambda: trusted):
+        with construction():
+            a, b = Label(text="a"), Label(text="b")
+        fields = ("properties", "metadata", "layoutOptions")
+        assert not any(key in a.__dict__ for key in fields)
+        assert a.peek("properties") is b.peek("properties")
+        assert a.peek("properties").selectable is False
+        data = a.dict()
+        assert list(data)[:3] == ["id", "layoutOptions", "properties"]
+
+        a.properties.hidden = True
+        assert a.properties is a.__dict__["properties"]
+        assert not b.peek("properties").hidden
+        assert b.peek("metadata") is not a.metadata
+        assert list(a.__dict__)[:4] == ["id", "labels", "metadata", "properties"]
+        properties = {**data["properties"], "hidden": True}
+        assert a.dict() == {**data, "properties": properties}
+
+
+def test_shared_options():
+    """Default layout options are shared until they are changed"""
+    opts = {"org.eclipse.elk.direction": "DOWN"}
+    a = Node().set_default_options(opts)
+    b = Node(layoutOptions={}).set_default_options(dict(opts))
+    assert a.peek("layoutOptions") is b.peek("layoutOptions")
+    assert a.peek("layoutOptions") is not opts
+    with Registry():
+        assert serialize_element(a)["layoutOptions"] == opts
+        assert a.dict()["layoutOptions"] == opts
+
+    a.layoutOptions["org.eclipse.elk.direction"] = "UP"
+    assert b.layoutOptions == opts
+    assert a.peek("layoutOptions") == {"org.eclipse.elk.direction": "UP"}
+
+
+def test_lazy_json():
+    """Unallocated fields are serialized as they were before they were lazy"""
+    node = Node(id="a", x=1)
+    node.add_child(Node(id="b"))
+    properties = {"cssClasses": "", "shape": None, "key": None, "hidden": None}
+    child = {
+        "id": "b",
+        "layoutOptions": {},
+        "properties": properties,
+        "x": None,
+        "y": None,
+        "width": 0,
+        "height": 0,
+        "labels": [],
+        "ports": [],
+        "children": [],
+        "edges": [],
+    }
+    expected = {
+        "id": "a",
+        "labels": [],
+        "layoutOptions": {},
+        "metadata": {},
+        "properties": properties,
+        "x": 1.0,
+        "y": None,
+        "width": None,
+        "height": None,
+        "ports": [],
+        "children": [child],
+        "edges": [],
+    }
+    assert node.json() == json.dumps(expected)
+    assert json.loads(node.children[0].json())["metadata"] == {}
+    assert "properties" not in node.__dict__
+    assert json.loads(node.json(exclude_unset=True)) == {"id": "a", "x": 1.0}
+    data = json.loads(node.json(exclude_none=True, include={"id", "properties"}))
+    assert data == {"id": "a", "properties": {"cssClasses": ""}}
+    assert "properties" not in node.copy().__dict__
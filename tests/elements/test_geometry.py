@@ -0,0 +1,84 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import copy
+import pickle  # noqa: S403 round trips elements the test built itself
+
+import pytest
+
+from ipyelk.elements import (
+    GeometryStore,
+    Node,
+    Registry,
+    iter_elements,
+    serialize_element,
+)
+from ipyelk.elements.elements import ShapeElement
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def root(make_root) -> Node:
+    root = make_root(3)
+    root.x, root.y = 1, 2
+    for i, child in enumerate(root.children):
+        child.width += i
+        child.labels[0].x = 3
+    return root
+
+
+def test_geometry_bind(root: Node):
+    """Bound elements should read and write their geometry in the store"""
+    with Registry():
+        expected = serialize_element(root)
+    store = GeometryStore(capacity=2).bind(root)
+    shapes = [el for el in iter_elements(root) if isinstance(el, ShapeElement)]
+    assert len(store) == len(shapes) == 10
+    assert all(el in store and "x" not in el.__dict__ for el in shapes)
+    assert (root.x, root.y, root.width) == (1, 2, None)
+    assert list(store.width[[store.slot(c) for c in root.children]]) == [10, 11, 12]
+
+    with Registry():
+        assert serialize_element(root) == expected
+        assert root.dict() == expected
+
+    child = root.children[0]
+    child.x = 7
+    assert store.x[store.slot(child)] == 7
+    child.x = None
+    assert child.x is None
+    store.update(root.children, np.ones((3, 4)))
+    assert [c.geometry() for c in root.children] == [
+        dict(x=1, y=1, width=1, height=1)
+    ] * 3
+    np.testing.assert_array_equal(store.rows([child]), [[1, 1, 1, 1]])
+
+
+def test_geometry_release(root: Node):
+    """Released elements should keep their geometry"""
+    store = GeometryStore().bind(root)
+    port = root.children[1].ports[0]
+    store.discard(port)
+    assert port not in store
+    assert port.__dict__["width"] == 5
+    assert store.add(port) == store.slot(port)
+    store.release()
+    assert len(store) == 0
+    assert root.__dict__["x"] == 1
+    assert root.children[2].width == 12
+    assert root._store is None
+
+
+def test_geometry_copies(root: Node):
+    """Copies of bound elements should not share the store"""
+    GeometryStore().bind(root)
+    label = root.children[0].labels[0]
+    for clone in (
+        label.copy(),
+        copy.deepcopy(label),
+        pickle.loads(pickle.dumps(label)),  # noqa: S301 pickled just above
+    ):
+        assert clone._store is None
+        assert clone.x == 3
+        clone.x = 4
+        assert label.x == 3
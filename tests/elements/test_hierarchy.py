@@ -0,0 +1,56 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import random
+
+import networkx as nx
+import pytest
+
+from ipyelk.elements import HierarchyIndex
+from ipyelk.exceptions import NotFoundError
+
+
+def random_tree(size: int, seed: int) -> nx.DiGraph:
+    rng = random.Random(seed)  # noqa: S311 seeded, not secret
+    tree = nx.DiGraph()
+    tree.add_node(0)
+    for i in range(1, size):
+        tree.add_edge(rng.randrange(i), i)
+    return tree
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_hierarchy_lca(seed):
+    """The lowest common ancestors should match networkx"""
+    tree = random_tree(200, seed)
+    hierarchy = HierarchyIndex.from_nx(tree)
+    rng = random.Random(seed)  # noqa: S311 seeded, not secret
+    for _ in range(200):
+        u, v = rng.randrange(200), rng.randrange(200)
+        expected = nx.lowest_common_ancestor(tree, u, v)
+        assert hierarchy.lca(u, v) == expected
+        assert hierarchy.is_ancestor(u, v) == (expected == u)
+        assert hierarchy.depth(v) == nx.shortest_path_length(tree, 0, v)
+        assert hierarchy.children(v) == list(tree.successors(v))
+        assert set(hierarchy.subtree(v)) == {v, *nx.descendants(tree, v)}
+
+
+def test_hierarchy_forest():
+    """Keys in different trees should have no common ancestor"""
+    hierarchy = HierarchyIndex([("a", "b"), ("c", "d")], nodes=["e"])
+    assert len(hierarchy) == 5
+    assert hierarchy.lca("b", "a") == "a"
+    assert hierarchy.lca("b", "d") is None
+    assert hierarchy.lca("e", "e") == "e"
+    assert hierarchy.parent("d") == "c"
+    assert hierarchy.parent("c") is None
+    assert not hierarchy.is_ancestor("a", "d")
+    with pytest.raises(NotFoundError):
+        hierarchy.lca("a", "z")
+
+
+def test_hierarchy_invalid():
+    """Keys with many parents and cycles are not a hierarchy"""
+    with pytest.raises(ValueError, match="more than one parent"):
+        HierarchyIndex([("a", "c"), ("b", "c")])
+    with pytest.raises(ValueError, match="has a cycle"):
+        HierarchyIndex([("r", "s"), ("a", "b"), ("b", "c"), ("c", "a")])
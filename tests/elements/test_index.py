@@ -0,0 +1,80 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import ElementIndex, Label, Node, Port, Registry
+from ipyelk.exceptions import IndexConsistencyError
+
+
+def live_index(root: Node) -> ElementIndex:
+    return ElementIndex.from_els(
+        root, live=True, context=Registry(), check_consistency=True
+    )
+
+
+def test_live_index_mutations():
+    """A live index should track hierarchy changes without being rebuilt"""
+    root = Node(id="root")
+    index = live_index(root)
+    assert index.is_live(root)
+
+    child = root.add_child(Node(id="child", labels=[Label(id="child_label")]))
+    assert index["child"] is child
+    assert index["child_label"] is child.labels[0]
+
+    port = child.add_port(Port(id="port"))
+    edge = root.add_edge(source=port, target=root)
+    edge.labels.append(Label(id="edge_label"))
+    assert index["port"] is port
+    assert index["edge_label"] is edge.labels[0]
+
+    child.id = "renamed"
+    assert index["renamed"] is child
+    assert "child" not in index.elements
+
+    root.remove_child(child)
+    for key in ["renamed", "child_label", "port"]:
+        assert key not in index.elements
+    assert child._index is None
+
+    root.children = [child]
+    assert index["renamed"] is child
+    assert index.verify()
+
+
+def test_live_index_generated_ids():
+    """Elements without ids should be keyed by the index's registry"""
+    root = Node()
+    index = live_index(root)
+    child = root.add_child(Node())
+    with index.context:
+        assert index[child.get_id()] is child
+        assert index.root() is root
+
+
+def test_live_index_detects_drift():
+    """Changes that bypass the element lists are caught by the consistency check"""
+    root = Node(id="root")
+    index = live_index(root)
+    list.append(root.children, Node(id="sneaky"))
+    with pytest.raises(IndexConsistencyError):
+        index.verify()
+
+
+@pytest.mark.parametrize("deep", [False, True])
+def test_copies_are_not_live(deep: bool):
+    """Copies of indexed elements are detached from the live index"""
+    root = Node(id="root")
+    index = live_index(root)
+    child = root.add_child(Node(id="child", width=1))
+    copy = child.copy(deep=deep)
+    assert copy._index is None
+    copy.id = "copy"
+    assert index["child"] is child
+    assert "copy" not in index.elements
+    assert index.verify()
+
+    copy._index = index
+    copy.id = "stray"
+    assert "stray" not in index.elements, "only held elements are rekeyed"
+    assert index.verify()
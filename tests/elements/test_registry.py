@@ -0,0 +1,52 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from ipyelk.elements import Node, Port, Registry
+from ipyelk.elements.registry import base36
+
+
+def test_base36():
+    assert [base36(i) for i in [0, 9, 10, 35, 36, 1295, 1296]] == [
+        "0",
+        "9",
+        "a",
+        "z",
+        "10",
+        "zz",
+        "100",
+    ]
+
+
+def test_compact_ids():
+    """Compact registries hand out short sequential ids that are stable for
+    the same element
+    """
+    root = Node()
+    child = root.add_child(Node())
+    port = child.add_port(Port())
+    with Registry(compact=True):
+        assert [root.get_id(), child.get_id(), port.get_id()] == ["_0", "_1", "_1._2"]
+        assert root.get_id() == "_0"
+
+    with Registry(compact=True, prefix="x") as context:
+        assert child.get_id() == "x:0"
+    assert context[child] == "x:0"
+    assert len(Registry()[root]) == 36
+
+
+def test_prefixed_ids_are_distinct():
+    """Counters of different prefixes never run into each other"""
+    plain, prefixed = Registry(compact=True), Registry(compact=True, prefix="_n")
+    plain_ids = {plain.next_id() for _ in range(36**3)}
+    assert base36(828) == "n0"
+    assert "_n0" in plain_ids
+    assert not plain_ids & {prefixed.next_id() for _ in range(100)}
+
+
+def test_namespaced_counters():
+    """Every registry counts on its own, namespaces keep registries apart"""
+    first = Registry(compact=True, prefix="_s", namespace="a")
+    second = Registry(compact=True, prefix="_s", namespace="b")
+    again = Registry(compact=True, prefix="_s", namespace="a")
+    assert [first.next_id(), first.next_id()] == ["a_s:0", "a_s:1"]
+    assert second.next_id() == "b_s:0"
+    assert again.next_id() == "a_s:0"
@@ -0,0 +1,102 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from ipyelk.elements import (
+    Compartment,
+    ElkJSONBuilder,
+    Label,
+    Node,
+    Partition,
+    Port,
+    Record,
+    Registry,
+    convert_elkjson,
+    exclude_layout,
+    iter_elements,
+    load_elkjson,
+    serialize_element,
+    shapes,
+)
+
+
+def assert_equivalent(root: Node):
+    for exclude_none in [False, True]:
+        expected = json.dumps(root.dict(exclude_none=exclude_none))
+        assert json.dumps(serialize_element(root, exclude_none=exclude_none)) == (
+            expected
+        )
+        with exclude_layout:
+            expected = json.dumps(root.dict(exclude_none=exclude_none))
+            observed = json.dumps(serialize_element(root, exclude_none=exclude_none))
+            assert observed == expected
+
+
+def test_serialize_examples(an_example_root: Node):
+    with Registry():
+        assert_equivalent(an_example_root)
+
+
+@pytest.mark.parametrize("with_ids", [True, False])
+def test_serialize_extended(with_ids: bool):
+    """Shapes, hidden elements and subclasses with custom `dict`"""
+    root = Node(properties={"shape": shapes.Ellipse(rx=3)})
+    compartment = root.add_child(
+        Compartment().make_labels(headings=["heading"], content=["a", "b"])
+    )
+    record = root.add_child(Record())
+    partition = root.add_child(Partition())
+    edge = partition[compartment:record:"label"]
+    edge.sections = [{"startPoint": {"x": 0, "y": 1}, "endPoint": {"x": 2, "y": 3}}]
+    port = record.add_port(Port(properties={"shape": shapes.PortShape(width=4)}))
+    port.labels.append(Label(text="port", properties={"hidden": True}))
+    root.add_child(Node(properties={"hidden": True}))
+    root.layoutOptions = {"nested": {"value": [1, 2.5, None]}}
+    with Registry():
+        if with_ids:
+            for el in iter_elements(root):
+                el.id = el.get_id()
+        assert_equivalent(root)
+
+
+def as_json(root: Node) -> str:
+    with Registry():
+        return json.dumps(serialize_element(root, exclude_none=True), sort_keys=True)
+
+
+@pytest.fixture(params=["ijson", "json"])
+def a_json_parser(request: pytest.FixtureRequest, monkeypatch) -> str:
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setitem(sys.modules, "ijson", None)
+    return request.param
+
+
+def test_load_elkjson(an_example_root: Node, a_json_parser: str, tmp_path: Path):
+    """Streaming from files or chunks builds the same hierarchy as a dict"""
+    with Registry():
+        text = json.dumps(serialize_element(an_example_root, exclude_none=True))
+    expected = as_json(convert_elkjson(json.loads(text)))
+
+    path = tmp_path / "graph.json"
+    path.write_text(text, encoding="utf-8")
+    assert as_json(load_elkjson(path)) == expected
+
+    chunks = [text[i : i + 7] for i in range(0, len(text), 7)]
+    root = load_elkjson(iter(chunks))
+    assert as_json(root) == expected
+    with Registry():
+        for el in iter_elements(root):
+            if isinstance(el, (Node, Port)) and el.get_parent():
+                assert el in el.get_parent().children + el.get_parent().ports
+
+
+def test_from_events_needs_a_node():
+    for events in [[("start_array", None), ("end_array", None)], [("null", None)]]:
+        with pytest.raises(TypeError, match="not a node"):
+            ElkJSONBuilder().from_events(events)
@@ -0,0 +1,68 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import sys
+
+from ipyelk.elements import (
+    Edge,
+    Label,
+    Node,
+    Order,
+    Port,
+    iter_edges,
+    iter_elements,
+    iter_hierarchy,
+    iter_visible,
+    walk,
+)
+
+
+def chain(depth: int) -> Node:
+    root = node = Node(id="0")
+    for i in range(1, depth):
+        node = node.add_child(Node(id=str(i)))
+    return root
+
+
+def test_deep_hierarchy():
+    """Traversal should not be limited by the recursion limit"""
+    depth = sys.getrecursionlimit() * 2
+    root = chain(depth)
+    assert len(list(iter_elements(root))) == depth
+    assert len(list(iter_hierarchy(root))) == depth - 1
+
+
+def test_walk_order_and_types():
+    root = Node(id="root", labels=[Label(id="root_label")])
+    child = root.add_child(Node(id="child"))
+    port = child.add_port(Port(id="port"))
+    root.add_edge(source=port, target=root)
+
+    pre = [el.id for el, _ in walk(root, types=(Node, Port))]
+    post = [el.id for el, _ in walk(root, types=(Node, Port), order=Order.post)]
+    assert pre == ["root", "child", "port"]
+    assert post == ["port", "child", "root"]
+
+    edges = list(iter_edges(root))
+    assert len(edges) == 1
+    owner, edge = edges[0]
+    assert owner is root
+    assert isinstance(edge, Edge)
+
+
+def test_walk_visits_once():
+    """Elements reachable along several paths are only visited once"""
+    shared = Node(id="shared")
+    assert len(list(iter_elements(shared, shared))) == 1
+
+
+def test_iter_visible_siblings():
+    """Hidden state is inherited from parents but not from siblings"""
+    root = Node(id="root")
+    hidden = root.add_child(Node(id="hidden", properties={"hidden": True}))
+    nested = hidden.add_child(Node(id="nested"))
+    visible = root.add_child(Node(id="visible"))
+
+    state = {el.id: (is_hidden, last.id) for el, is_hidden, last in iter_visible(root)}
+    assert state[hidden.id] == (True, "root")
+    assert state[nested.id] == (True, "root")
+    assert state[visible.id] == (False, "visible")
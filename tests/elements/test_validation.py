@@ -0,0 +1,92 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import random
+
+import pytest
+
+from ipyelk.elements import Edge, ElementIndex, Node, Registry, iter_elements
+from ipyelk.pipes import MarkElementWidget, ValidationPipe
+
+
+def summary(edge_report, id_report):
+    return (
+        {id(el) for el in edge_report.orphans},
+        {id(e): (id(a), id(b)) for e, (a, b) in edge_report.lca_mismatch.items()},
+        {k: {id(el) for el in v} for k, v in id_report.duplicated.items()},
+        {id(el) for el in id_report.null_ids},
+    )
+
+
+def mutate(rng: random.Random, root: Node, i: int):
+    nodes = [el for el in iter_elements(root) if isinstance(el, Node)]
+    edges = [(n, e) for n in nodes for e in n.edges]
+    action = rng.randrange(6)
+    if action == 0 and edges:
+        # move an edge to another owner
+        owner, edge = rng.choice(edges)
+        owner.edges.remove(edge)
+        rng.choice(nodes).edges.append(edge)
+    elif action == 1:
+        rng.choice(nodes).add_child(Node(id=f"new{i}"))
+    elif action == 2 and edges:
+        rng.choice(edges)[1].target = rng.choice(nodes)
+    elif action == 3:
+        # nodes with equal fields would be confused by `remove_child`
+        ports = [p for n in nodes for p in n.ports]
+        el, key = rng.choice([
+            (rng.choice(nodes[1:]), f"renamed{i}"),
+            (rng.choice(ports or nodes[1:]), "n0"),
+            (rng.choice(edges or [(None, nodes[-1])])[1], None),
+        ])
+        el.id = key
+    elif action == 4:
+        # move a subtree, with the edges it owns
+        node = rng.choice(nodes[1:])
+        parent = node.get_parent()
+        if parent is not None:
+            # not into its own subtree
+            below = {id(el) for el in iter_elements(node)}
+            parent.remove_child(node)
+            candidates = [n for n in nodes if id(n) not in below and n is not parent]
+            rng.choice(candidates or [parent]).add_child(node)
+    elif action == 5 and edges:
+        owner, edge = rng.choice(edges)
+        owner.edges.remove(edge)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_validation(seed: int, random_root):
+    rng = random.Random(seed)  # noqa: S311 seeded, not secret
+    root = random_root(rng)
+    context = Registry()
+    index = ElementIndex.from_els(root, live=True, context=context)
+    validation = index.validation()
+    validation.reports()
+    assert validation.checked == len(list(iter_elements(root)))
+
+    for i in range(30):
+        mutate(rng, root, i)
+        reports = validation.reports()
+        expected = ElementIndex.from_els(root, context=context).get_reports()
+        assert summary(*reports) == summary(*expected)
+
+
+@pytest.mark.asyncio
+async def test_validation_pipe_rechecks_touched():
+    root = Node(id="root")
+    a, b = root.add_child(Node(id="a")), root.add_child(Node(id="b"))
+    a.add_child(Node(id="c"))
+    root.edges.append(Edge(id="kept", source=a, target=b))
+    misplaced = a.edges
+    misplaced.append(Edge(id="misplaced", source=a, target=b))
+    pipe = ValidationPipe()
+    pipe.inlet = MarkElementWidget(value=root)
+    pipe.outlet.index = pipe.inlet.index
+    await pipe.run()
+    assert pipe.edge_report.lca_mismatch == {}
+    assert not any(e.id == "misplaced" for e in misplaced), "fixes were applied"
+    validation = pipe.inlet.index.elements.validation()
+    assert validation.checked == 1, "only the moved edge is rechecked"
+
+    await pipe.run()
+    assert validation.checked == 0, "an unchanged graph is not rechecked"
@@ -0,0 +1,66 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from __future__ import annotations
+
+import random
+from typing import Callable
+
+import networkx as nx
+import pytest
+
+from ipyelk.elements import Node, Port, index
+
+
+@pytest.fixture
+def outline() -> Callable[[Node], dict]:
+    """Provide a summary of the hierarchy, ports, edges, labels and layout
+    options of the nodes, without generated ids.
+    """
+
+    def summarize(root: Node) -> dict:
+        def end(el):
+            return el.properties.key if isinstance(el, Port) else el.id
+
+        return {
+            el.id: (
+                [child.id for child in el.children],
+                sorted((port.properties.key, port.width) for port in el.ports),
+                sorted(
+                    (end(edge.source), end(edge.target), str(edge.layoutOptions))
+                    for edge in el.edges
+                ),
+                [(label.text, label.layoutOptions) for label in el.labels],
+                el.layoutOptions,
+            )
+            for el in index.iter_elements(root)
+            if isinstance(el, Node)
+        }
+
+    return summarize
+
+
+@pytest.fixture
+def random_graph() -> Callable[[int], tuple[nx.MultiDiGraph, nx.DiGraph]]:
+    """Provide a factory of seeded random multigraphs with ports and a hierarchy."""
+
+    def make(seed: int) -> tuple[nx.MultiDiGraph, nx.DiGraph]:
+        rng = random.Random(seed)  # noqa: S311 seeded, not secret
+        graph = nx.MultiDiGraph()
+        for i in range(50):
+            graph.add_node(i, **({"labels": [{"text": f"n{i}"}]} if i % 7 == 0 else {}))
+        for _ in range(120):
+            data = {}
+            kind = rng.random()
+            if kind < 0.2:
+                data["sourcePort"] = f"p{rng.randrange(3)}"
+            elif kind < 0.3:
+                data["port"] = "shared"
+            elif kind < 0.4:
+                data["targetPort"] = f"t{rng.randrange(2)}"
+            graph.add_edge(rng.randrange(50), rng.randrange(50), **data)
+        hierarchy = nx.DiGraph()
+        for i in range(1, 30):
+            hierarchy.add_edge(rng.randrange(i), i)
+        return graph, hierarchy
+
+    return make
@@ -0,0 +1,86 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+from typing import List
+
+import pytest
+
+from ipyelk.elements import LazyNode, Node, Registry, index, serialize_element
+from ipyelk.loaders import ElkJSONLoader, LazyHierarchy, NXLoader
+
+
+def unloaded(root: Node) -> List[LazyNode]:
+    return [
+        el
+        for el in index.iter_elements(root)
+        if isinstance(el, LazyNode) and not el.loaded
+    ]
+
+
+def check_edges(root: Node):
+    """Every edge should connect elements of the diagram"""
+    elements = set(map(id, index.iter_elements(root)))
+    for _, edge in index.iter_edges(root):
+        assert id(edge.source) in elements
+        assert id(edge.target) in elements
+
+
+def expand_all(root: Node):
+    while unloaded(root):
+        unloaded(root)[0].expand()
+        check_edges(root)
+
+
+def proxies(root: Node) -> list:
+    return [
+        edge
+        for _, edge in index.iter_edges(root)
+        if LazyHierarchy.proxy_style in edge.properties.cssClasses
+    ]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_lazy_nx(seed, outline, random_graph):
+    """Expanding all nodes should build the same diagram as the default loader"""
+    graph, hierarchy = random_graph(seed)
+    expected = NXLoader().load(graph, hierarchy).value
+    value = NXLoader(lazy=True).load(graph, hierarchy).value
+    check_edges(value)
+    placeholders = unloaded(value)
+    assert placeholders
+    for node in placeholders:
+        assert node.properties.childCount
+        assert LazyNode.lazy_style in node.properties.cssClasses
+        assert not node.children
+    assert len(list(index.iter_elements(value))) < len(
+        list(index.iter_elements(expected))
+    )
+
+    expand_all(value)
+    assert not proxies(value)
+    assert outline(value) == outline(expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_lazy_elkjson(seed, outline, random_graph):
+    """Expanding all nodes of lazy elk json should match the default loader"""
+    graph, hierarchy = random_graph(seed)
+    with Registry():
+        data = serialize_element(NXLoader().load(graph, hierarchy).value)
+    value = ElkJSONLoader(lazy=True).load(data).value
+    check_edges(value)
+    expand_all(value)
+    assert not proxies(value)
+    assert outline(value) == outline(ElkJSONLoader().load(data).value)
+
+
+def test_lazy_expand_once(random_graph):
+    """Placeholders should only build their children once"""
+    graph, hierarchy = random_graph(0)
+    value = NXLoader(lazy=True).load(graph, hierarchy).value
+    node = unloaded(value)[0]
+    count = node.properties.childCount
+    assert len(node.expand()) == count
+    assert node.loaded
+    assert node.properties.childCount is None
+    assert node.expand() == []
+    assert len(node.children) == count
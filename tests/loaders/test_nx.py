@@ -0,0 +1,69 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+
+import networkx as nx
+import pytest
+
+from ipyelk.elements import Node, index, iter_elements
+from ipyelk.loaders import NXLoader
+from ipyelk.pipes import MarkElementWidget
+
+from ..conftest import EXAMPLE_GRAPHS, load_nx_graph
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_nx_bulk_random(seed, trusted, outline, random_graph):
+    """The bulk loader should build the same diagram as the default loader"""
+    graph, hierarchy = random_graph(seed)
+    expected = NXLoader().load(graph, hierarchy).value
+    value = NXLoader(bulk=True, trusted=trusted).load(graph, hierarchy).value
+    assert outline(value) == outline(expected)
+    ids = [el.id for el in index.iter_elements(value)]
+    assert None not in ids
+    assert len(set(ids)) == len(ids)
+
+
+@pytest.mark.parametrize("name", ["flat_graph", "hier_ports"])
+def test_nx_bulk_examples(name, outline):
+    """The bulk loader should load the example graphs like the default loader"""
+    graph_name, tree_name = EXAMPLE_GRAPHS[name]
+    graph = load_nx_graph(graph_name)
+    hierarchy = None if tree_name is None else load_nx_graph(tree_name)
+    loader = NXLoader(root_id="root")
+    expected = loader.load(graph, hierarchy).value
+    loader.bulk = True
+    assert outline(loader.load(graph, hierarchy).value) == outline(expected)
+
+
+@pytest.mark.parametrize("mode", ["default", "bulk", "lazy"])
+def test_reloaded_ids_are_stable(mode: str, random_graph):
+    """Loading the same graph again generates the same ids"""
+    graph, hierarchy = random_graph(0)
+    kwargs = {} if mode == "default" else {mode: True}
+
+    def ids():
+        root = NXLoader(**kwargs).load(graph, hierarchy).value
+        return [el.id for el in iter_elements(root)]
+
+    first = ids()
+    assert first == ids()
+    assert any(str(key).startswith("_") for key in first), "ids are generated"
+
+
+def test_generated_ids_do_not_collide():
+    """Ids from the loader, separate loads and the index registry stay apart"""
+    first, second = (
+        NXLoader(root_id=name).load(nx.MultiDiGraph(nx.cycle_graph(nodes))).value
+        for name, nodes in (("first", "abcd"), ("second", "efgh"))
+    )
+    root = Node(id="root", children=[first, second])
+    for _ in range(900):
+        root.add_child(Node())
+
+    widget = MarkElementWidget(value=root)
+    index = widget.build_index()
+    with index.context:
+        ids = [el.get_id() for el in iter_elements(root)]
+    ids = [key for key in ids if key is not None]
+    assert len(ids) == len(set(ids)) > 900
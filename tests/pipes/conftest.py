@@ -0,0 +1,112 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+"""Shared fixtures of the pipe tests"""
+
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pytest
+
+from ipyelk.elements import convert_elkjson, serialize_element
+from ipyelk.pipes import ElkWorkerPool, Pipe
+from ipyelk.pipes.columns import pack_layout
+from ipyelk.pipes.patch import NESTED
+
+# stand in for elkjs that places nodes in a row
+FAKE_ELK = """
+module.exports = class ELK {
+  async layout(graph) {
+    if (graph.id === 'broken') {
+      throw new Error('cannot lay out');
+    }
+    if (graph.id === 'slow') {
+      await new Promise((resolve) => setTimeout(resolve, 500));
+    }
+    if (graph.id === 'noisy') {
+      console.error('x'.repeat(1 << 20));
+    }
+    if (graph.id === 'exit') {
+      console.error('exiting');
+      process.exit(3);
+    }
+    (graph.children || []).forEach((child, i) => {
+      child.x = i * 20;
+      child.y = 0;
+    });
+    graph.x = graph.y = 0;
+    graph.width = (graph.children || []).length * 20;
+    graph.height = 10;
+    return graph;
+  }
+};
+"""
+
+
+@pytest.fixture
+def a_pool(tmp_path: Path):
+    elkjs = tmp_path / "fake_elk.js"
+    elkjs.write_text(FAKE_ELK)
+    return ElkWorkerPool(size=2, elkjs=str(elkjs))
+
+
+def fake_layout(data: dict, offset: float = 0) -> dict:
+    """Place every shape at a new position and route edges with a bend"""
+    stack = [data]
+    i = 0
+    while stack:
+        el = stack.pop()
+        i += 1
+        if "sources" in el:
+            el["sections"] = [
+                {
+                    "id": f"{el['id']}_s0",
+                    "startPoint": {"x": 0, "y": i},
+                    "bendPoints": [{"x": 1, "y": i}],
+                    "endPoint": {"x": 2, "y": i},
+                    "incomingShape": el["sources"][0],
+                }
+            ]
+        else:
+            el["x"] = el["y"] = offset + i
+        for key in NESTED:
+            stack.extend(el.get(key) or [])
+    return data
+
+
+def answer(pipe: Pipe, content: dict, sent: List[dict], error: Optional[str]):
+    if content["action"] == "measure":
+        sizes = [
+            [7.0 * len(label["text"]) + len(label["properties"]["cssClasses"]), 12.0]
+            for label in content["labels"]
+        ]
+        reply = {"action": "measured", "request": content["request"], "sizes": sizes}
+        pipe._handle_measured(pipe, reply, [])
+        return
+    # every layout places the shapes at new positions
+    with pipe.inlet.index.context:
+        data = fake_layout(serialize_element(pipe.inlet.value), 100 * len(sent) - 100)
+        if not pipe.binary:
+            pipe.outlet.value = convert_elkjson(data)
+            return
+    header, buffers = pack_layout(data)
+    header.update(action="layout_columns", revision=pipe.outlet.revision + 1)
+    if error:
+        header["error"] = error
+    pipe._handle_columns(pipe, header, list(map(memoryview, buffers)))
+
+
+@pytest.fixture
+def fake_browser() -> Callable[..., List[dict]]:
+    """Provide a stand in for the browser that answers the messages of a pipe"""
+
+    def install(pipe: Pipe, error: Optional[str] = None) -> List[dict]:
+        sent = []
+
+        def send(content: dict):
+            sent.append(content)
+            answer(pipe, content, sent, error)
+
+        pipe.send = send
+        return sent
+
+    return install
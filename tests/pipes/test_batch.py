@@ -0,0 +1,49 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import shutil
+
+import pytest
+
+from ipyelk.elements import Node
+from ipyelk.exceptions import LayoutError
+from ipyelk.pipes import BatchLayout, HeadlessElkJS
+from ipyelk.tools import PipelineProgressBar
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+
+
+@pytest.mark.asyncio
+async def test_batch_layout(a_pool, make_root):
+    progress = PipelineProgressBar()
+    values = []
+
+    def on_progress(pipe):
+        progress.update(pipe)
+        values.append(progress.bar.value)
+
+    async with a_pool:
+        batch = BatchLayout(
+            engine=HeadlessElkJS(pool=a_pool), chunk_size=2, on_progress=on_progress
+        )
+        roots = [make_root(i + 1, name=f"root{i}") for i in range(5)]
+        results = await batch.layout(*roots)
+
+    assert [r.id for r in results] == [r.id for r in roots]
+    for root, result in zip(roots, results):
+        assert result is not root
+        assert result.width == len(root.children) * 20
+        xs = [child.x for child in result.children]
+        assert xs == [i * 20 for i in range(len(root.children))]
+    assert values == sorted(values)
+    assert values[-1] == 1
+    assert 0 < values[1] < 1
+
+
+@pytest.mark.asyncio
+async def test_batch_layout_error(a_pool, make_root):
+    async with a_pool:
+        batch = BatchLayout(engine=HeadlessElkJS(pool=a_pool))
+        with pytest.raises(LayoutError):
+            await batch.layout(make_root(1, name="ok"), Node(id="broken"))
+    assert batch.status.exception is not None
+    assert batch.get_progress_value() == 0
@@ -0,0 +1,78 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import Node, iter_elements
+from ipyelk.elements.elements import ShapeElement
+from ipyelk.pipes import ElkJS, MarkElementWidget
+from ipyelk.pipes.base import PipeStatus
+from ipyelk.pipes.cache import structure_hash
+
+
+def positions(root: Node):
+    return {
+        el.id: (el.x, el.y)
+        for el in iter_elements(root)
+        if isinstance(el, ShapeElement)
+    }
+
+
+@pytest.mark.asyncio
+async def test_layout_cache(make_root, fake_browser):
+    pipe = ElkJS()
+    sent = fake_browser(pipe)
+    root = make_root()
+    pipe.inlet = MarkElementWidget(value=root)
+    pipe.outlet.index = pipe.inlet.index
+
+    await pipe.run()
+    assert len(sent) == 1
+    first = positions(pipe.outlet.value)
+    assert (pipe.cache.hits, pipe.cache.misses) == (0, 1)
+
+    # styling changes reuse the cached layout
+    root.children[0].properties.cssClasses = "highlight"
+    await pipe.run()
+    assert len(sent) == 1
+    assert (pipe.cache.hits, pipe.cache.misses) == (1, 1)
+    outlet = pipe.outlet.value
+    assert positions(outlet) == first
+    assert outlet.children[0].properties.cssClasses == "highlight"
+    assert outlet.edges[0].source is outlet.children[0].ports[0]
+
+    # size changes need a new layout
+    shown = []
+    pipe.observe(lambda change: shown.append(change.new.cache_misses), "status")
+    root.children[1].width = 20
+    await pipe.run()
+    assert len(sent) == 2
+    assert (pipe.cache.hits, pipe.cache.misses) == (1, 2)
+    assert shown == [2], "the status shows the counts of the latest lookup"
+
+    pipe.status_update(PipeStatus.finished())
+    assert pipe.status.cache_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_layout_cache_eviction(make_root, fake_browser):
+    pipe = ElkJS()
+    pipe.cache.maxsize = 1
+    sent = fake_browser(pipe)
+    root = make_root()
+    pipe.inlet = MarkElementWidget(value=root)
+    pipe.outlet.index = pipe.inlet.index
+
+    await pipe.run()
+    root.children[1].width = 20
+    await pipe.run()
+    root.children[1].width = 10
+    await pipe.run()
+    assert len(sent) == 3
+    assert len(pipe.cache) == 1
+
+
+def test_structure_hash_sizes():
+    """Sizes given as ints hash like the floats a layout returns"""
+    data = {"id": "root", "width": 0, "children": [{"id": "a", "height": 10}]}
+    laid_out = {"id": "root", "width": 0.0, "children": [{"id": "a", "height": 10.0}]}
+    assert structure_hash(data) == structure_hash(laid_out)
@@ -0,0 +1,78 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import Edge, iter_elements, serialize_element
+from ipyelk.elements.elements import ShapeElement
+from ipyelk.exceptions import LayoutError
+from ipyelk.pipes import ElkJS, MarkElementWidget
+
+
+@pytest.mark.asyncio
+async def test_binary_layout(make_root, fake_browser):
+    pipe = ElkJS(binary=True)
+    sent = fake_browser(pipe)
+    root = make_root()
+    pipe.inlet = MarkElementWidget(value=root)
+    pipe.outlet.index = pipe.inlet.index
+
+    await pipe.layout(None)
+
+    assert sent == [{"action": "run"}]
+    value = pipe.outlet.value
+    assert value is not root
+    assert pipe.outlet.revision == 1
+    shapes = [el for el in iter_elements(value) if isinstance(el, ShapeElement)]
+    assert all(el.x is not None and el.x == el.y for el in shapes)
+
+    # the inlet keeps its elements, the copy gets an index of its own
+    assert root.children[0].x is None
+    assert value._index is not root._index
+    assert value._index.is_live(value)
+    assert value._index.get("n0") is value.children[0]
+
+    (edge,) = [el for el in iter_elements(value) if isinstance(el, Edge)]
+    (section,) = edge.sections
+    assert section.incomingShape == edge.source.id == "n0_port"
+    points = [section.startPoint, *section.bendPoints, section.endPoint]
+    y = points[0].y
+    assert [(p.x, p.y) for p in points] == [(0, y), (1, y), (2, y)]
+    assert serialize_element(value) == value.dict()
+
+
+@pytest.mark.asyncio
+async def test_binary_layout_error(make_root, fake_browser):
+    pipe = ElkJS(binary=True)
+    fake_browser(pipe, error="cannot lay out")
+    pipe.inlet = MarkElementWidget(value=make_root())
+    pipe.outlet.index = pipe.inlet.index
+    with pytest.raises(LayoutError):
+        await pipe.layout(None)
+
+
+@pytest.mark.asyncio
+async def test_binary_layout_store(make_root, fake_browser):
+    """Copies of elements bound to a geometry store should be laid out in a
+    store of their own
+    """
+    pytest.importorskip("numpy")
+    from ipyelk.elements import GeometryStore
+
+    pipe = ElkJS(binary=True)
+    fake_browser(pipe)
+    root = make_root()
+    store = GeometryStore().bind(root)
+    pipe.inlet = MarkElementWidget(value=root)
+    pipe.outlet.index = pipe.inlet.index
+    await pipe.layout(None)
+
+    value = pipe.outlet.value
+    copied = value._store
+    assert copied is not None
+    assert copied is not store
+    shapes = [el for el in iter_elements(value) if isinstance(el, ShapeElement)]
+    assert all(copied.holds(el) and "x" not in el.__dict__ for el in shapes)
+    assert all(el.x is not None and el.x == el.y for el in shapes)
+    assert sorted(copied.x) == sorted(el.x for el in shapes)
+    assert serialize_element(value) == value.dict()
+    assert root.children[0].x is None
@@ -0,0 +1,76 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import asyncio
+import shutil
+
+import pytest
+
+from ipyelk.exceptions import LayoutError
+from ipyelk.pipes import ElkWorkerPool, HeadlessElkJS, MarkElementWidget
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+
+
+@pytest.mark.asyncio
+async def test_headless_pipe(a_pool: ElkWorkerPool, make_root):
+    async with a_pool:
+        pipe = HeadlessElkJS(pool=a_pool)
+        root = make_root(3)
+        root.children[1].properties.cssClasses = "keep me"
+        pipe.inlet = MarkElementWidget(value=root)
+        pipe.outlet.index = pipe.inlet.index
+        await pipe.run()
+
+        value = pipe.outlet.value
+        assert value is not root
+        assert [child.x for child in value.children] == [0, 20, 40]
+        assert value.children[1].properties.cssClasses == "keep me"
+        assert pipe.outlet.index.elements["n2_port"] is value.children[2].ports[0]
+
+
+@pytest.mark.asyncio
+async def test_headless_pool(a_pool: ElkWorkerPool, make_root):
+    async with a_pool:
+        results = await asyncio.gather(*[
+            a_pool.layout(make_root(i, name=f"g{i}").dict()) for i in range(6)
+        ])
+        assert [r["width"] for r in results] == [i * 20 for i in range(6)]
+        assert len(a_pool._workers) == 2
+
+        with pytest.raises(LayoutError, match="cannot lay out"):
+            await a_pool.layout({"id": "broken"})
+        # workers survive errors in the layout
+        result = await a_pool.layout(make_root(1, name="again").dict())
+        assert result["width"] == 20
+    assert not a_pool._workers
+
+
+@pytest.mark.asyncio
+async def test_headless_cancelled_layout(a_pool: ElkWorkerPool, make_root):
+    async with ElkWorkerPool(size=1, elkjs=a_pool.elkjs) as pool:
+        # start the worker, so the slow layout is cancelled after the request
+        await pool.layout(make_root(1, name="before").dict())
+        (worker,) = pool._workers
+        process = worker.process
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.layout({"id": "slow"}), timeout=0.1)
+        assert process.returncode is not None, "the killed worker is reaped"
+        # the answer to the cancelled layout arrives, and must not be taken as
+        # the answer to the next layouts
+        await asyncio.sleep(0.6)
+        for i in range(3):
+            result = await pool.layout(make_root(i, name=f"after{i}").dict())
+            assert result["width"] == i * 20
+        assert len(pool._workers) == 1
+
+
+@pytest.mark.asyncio
+async def test_headless_worker_output(a_pool: ElkWorkerPool, make_root):
+    async with a_pool:
+        with pytest.raises(LayoutError, match="exited with 3: exiting"):
+            await a_pool.layout({"id": "exit"})
+        # more error output than a pipe buffers does not block the worker
+        result = await asyncio.wait_for(a_pool.layout({"id": "noisy"}), timeout=5)
+        assert result["id"] == "noisy"
+        result = await a_pool.layout(make_root(1, name="again").dict())
+        assert result["width"] == 20
@@ -0,0 +1,70 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import itertools
+
+import pytest
+
+from ipyelk.elements import Edge, Node, iter_elements
+from ipyelk.elements.elements import ShapeElement
+from ipyelk.pipes import LayeredLayout, MarkElementWidget, Pipeline
+
+pytest.importorskip("numpy")
+
+
+async def run_layout(root: Node, **kwargs) -> Node:
+    pipeline = Pipeline(pipes=(LayeredLayout(**kwargs),))
+    pipeline.inlet = MarkElementWidget(value=root, flow=("Layout",))
+    await pipeline.run()
+    return pipeline.outlet.value
+
+
+def assert_no_overlaps(node: Node):
+    for a, b in itertools.combinations(node.children, 2):
+        assert (
+            a.x + a.width <= b.x
+            or b.x + b.width <= a.x
+            or a.y + a.height <= b.y
+            or b.y + b.height <= a.y
+        ), f"{a.id} overlaps {b.id}"
+    for child in node.children:
+        assert child.x >= 0
+        assert child.x + child.width <= node.width
+        assert child.y >= 0
+        assert child.y + child.height <= node.height
+        assert_no_overlaps(child)
+
+
+@pytest.mark.asyncio
+async def test_layered_examples(an_example_root: Node):
+    value = await run_layout(an_example_root)
+    for el in iter_elements(value):
+        if isinstance(el, ShapeElement):
+            assert None not in {el.x, el.y, el.width, el.height}, el.id
+        elif isinstance(el, Edge):
+            assert len(el.sections) == 1, el.id
+    assert_no_overlaps(value)
+
+
+def chain(*ids: str) -> Node:
+    root = Node(id="root")
+    nodes = [root.add_child(Node(id=i, width=10, height=10)) for i in ids]
+    for a, b in zip(nodes, nodes[1:]):
+        root.add_edge(source=a, target=b)
+    return root
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(("direction", "axis"), [("RIGHT", "x"), ("DOWN", "y")])
+async def test_layered_direction(direction: str, axis: str):
+    root = chain("a", "b", "c", "d")
+    # close the cycle
+    root.add_edge(source=root.children[-1], target=root.children[0])
+    value = await run_layout(root, options={"org.eclipse.elk.direction": direction})
+    coords = [getattr(child, axis) for child in value.children]
+    assert coords == sorted(coords)
+    assert len(set(coords)) == 4
+    assert_no_overlaps(value)
+
+    # the long edge closing the cycle is routed around the nodes in between
+    section = value.edges[-1].sections[0]
+    assert len(section.bendPoints) == 2
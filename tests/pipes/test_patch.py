@@ -0,0 +1,115 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import Node, serialize_element
+from ipyelk.pipes import MarkElementWidget
+from ipyelk.pipes.patch import apply_patch, diff, flatten, unflatten
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    sent = []
+    # widgets pass the buffers as a keyword
+    monkeypatch.setattr(
+        MarkElementWidget, "_send", lambda _widget, msg, **_kw: sent.append(msg)
+    )
+    return sent
+
+
+def test_patch_roundtrip(make_root):
+    old = serialize_element(make_root(10))
+    root = make_root(10)
+    root.children[1].x = 5
+    root.children[2].properties.cssClasses = "selected"
+    root.children[3].properties.hidden = True
+    root.children[0].labels.clear()
+    new = serialize_element(root)
+    old_flat, new_flat = flatten(old), flatten(new)
+    ops = diff(old_flat, new_flat)
+    assert {op["op"] for op in ops} == {"update", "remove"}
+    assert unflatten(apply_patch(old_flat, ops), "root") == new
+
+
+def test_widget_sends_patch(messages, make_root):
+    widget = MarkElementWidget(value=make_root(10))
+    assert widget.revision == 0
+
+    root = make_root(10)
+    root.children[4].x = 20
+    widget.value = root
+    (msg,) = messages
+    assert msg["method"] == "custom"
+    patch = msg["content"]
+    assert patch["action"] == "patch"
+    assert (patch["base"], patch["revision"]) == (0, 1)
+    assert patch["ops"] == [{"op": "update", "id": "n4", "set": {"x": 20}, "unset": []}]
+    assert widget.revision == 1
+
+    # a different tree is synced in full
+    messages.clear()
+    widget.value = Node(id="other")
+    (msg,) = messages
+    assert msg["method"] == "update"
+    assert msg["state"]["revision"] == 2
+    assert msg["state"]["value"]["id"] == "other"
+
+
+def test_widget_applies_frontend_patch(messages, make_root):
+    widget = MarkElementWidget(value=make_root(10))
+    old = flatten(serialize_element(widget.value, exclude_none=True))
+    data = serialize_element(widget.value, exclude_none=True)
+    data["children"][3]["x"] = 42
+    ops = diff(old, flatten(data))
+    messages.clear()
+
+    changes = []
+    widget.observe(changes.append, "value")
+    patch = {"action": "patch", "base": 0, "revision": 1, "root": "root", "ops": ops}
+    widget._handle_patch_msg(widget, patch, [])
+    assert not messages
+    assert widget.revision == 1
+    assert widget.value.children[3].x == 42
+    assert len(changes) == 1
+
+    # an outdated patch makes the kernel send the full value
+    widget._handle_patch_msg(widget, patch, [])
+    (msg,) = messages
+    assert msg["state"]["revision"] == 2
+    assert msg["state"]["value"]["children"][3]["x"] == 42
+
+
+def test_widget_checks_schema_of_patch(messages, make_root):
+    root = make_root(10)
+    root.children[3].properties.key = "k"
+    widget = MarkElementWidget(value=root)
+    error = "Additional properties are not allowed ('key' was unexpected)"
+    assert widget.schema_errors == {"n3": {"properties": error}}
+
+    root = make_root(10)
+    root.children[3].properties.key = "k"
+    root.children[4].x = 20
+    widget.value = root
+    assert messages[-1]["content"]["action"] == "patch"
+    assert widget.schema_errors == {"n3": {"properties": error}}
+
+    widget.value = make_root(10)
+    assert messages[-1]["content"]["action"] == "patch"
+    assert widget.schema_errors == {}
+
+
+def test_widget_holds_patch(messages, make_root):
+    widget = MarkElementWidget(value=make_root(10))
+    messages.clear()
+
+    root = make_root(10)
+    root.children[4].x = 20
+    with widget.hold_sync():
+        widget.value = root
+        widget.flow = ("layout",)
+        assert not messages, "nothing is sent while syncing is held"
+    update, patch = messages
+    assert update["method"] == "update"
+    assert list(update["state"]) == ["flow"]
+    assert patch["content"]["action"] == "patch"
+    assert patch["content"]["revision"] == widget.revision == 1
@@ -1,9 +1,14 @@
 # Copyright (c) 2024 ipyelk contributors.
 # Distributed under the terms of the Modified BSD License.
+import asyncio
+
 import pytest
+import traitlets as T
 
+from ipyelk import Diagram
 from ipyelk.elements import Node
 from ipyelk.pipes import MarkElementWidget, Pipe, Pipeline
+from ipyelk.pipes import flows as F
 
 
 @pytest.mark.asyncio
@@ -78,3 +83,147 @@ async def test_pipeline_check_dirty():
     assert not p.status.dirty(), "Pipeline should not still be dirty"
     assert not p1.status.dirty(), "`p1` should not still be dirty"
     assert not p2.status.dirty(), "`p2` should not still be dirty"
+
+
+def test_flow_matcher():
+    matcher = F.FlowMatcher((F.Layout, F.AnyHidden, F.Node.size))
+    assert matcher.literals == {F.Layout}
+    assert matcher.match(F.Layout)
+    assert matcher.match(F.Edge.hidden)
+    assert matcher.match("nodeXsize"), "observes are regular expressions"
+    assert not matcher.match(F.Text.text)
+    assert not matcher.match(f"{F.Layout}s"), "observes match whole flows"
+    assert matcher.any((F.Text.text, F.Port.hidden))
+    assert not matcher.any(())
+
+    layout = F.FlowMatcher((F.Anythinglayout,))
+    assert layout.match(F.Node.size)
+    assert not layout.match(F.Node.color_css)
+    assert F.compile_flows((F.Layout,)) is F.compile_flows((F.Layout,))
+
+
+def test_pipeline_dependencies():
+    p1 = Pipe(observes=("a",), reports=("b",))
+    p2 = Pipe(observes=("b",), reports=("c",))
+    p3 = Pipe(observes=("c|d",))
+    nested = Pipeline(pipes=(Pipe(observes=("c",), reports=("e",)),))
+    p4 = Pipe(observes=("e",))
+    p = Pipeline(pipes=(p1, p2, p3, nested, p4))
+    p.inlet = MarkElementWidget(flow=("a",))
+
+    assert p.check_dirty()
+    assert all(pipe.status.dirty() for pipe in (p1, p2, p3, nested, p4))
+    assert set(p.outlet.flow) == set("abce")
+    dependencies = p.dependencies()
+    assert dependencies.mask(("c",)) == 0b100
+    assert p.dependencies() is dependencies
+
+    p.inlet.flow = ("d",)
+    assert not p.check_dirty(), "only pipes with reports make the pipeline dirty"
+    assert [pipe.status.dirty() for pipe in p.pipes] == [0, 0, 1, 0, 0]
+    assert p.reports == ()
+
+    p2.observes = ("a",)
+    assert p.dependencies() is not dependencies
+
+
+class CountingPipe(Pipe):
+    runs = T.List()
+
+    async def run(self):
+        self.runs = [*self.runs, self.inlet.flow]
+        await asyncio.sleep(0.01)
+        self.outlet.value = self.inlet.value
+
+
+@pytest.mark.asyncio
+async def test_schedule_run_coalesces():
+    p = CountingPipe(inlet=MarkElementWidget())
+    futures = []
+    for flow in ["a", "b", "a", "c"]:
+        p.inlet.flow = (flow,)
+        futures.append(p.schedule_run())
+    assert all(f is futures[0] for f in futures), "requests merge into one run"
+    await futures[0]
+    assert p.runs == [("a", "b", "c")]
+
+    # requests during a run are queued behind it
+    first = p.schedule_run()
+    await asyncio.sleep(0.001)
+    assert p.scheduler.running
+    assert not p.scheduler.pending
+    p.inlet.flow = ("d",)
+    second = p.schedule_run()
+    third = p.schedule_run()
+    assert first is not second
+    assert second is third
+    await second
+    assert first.done()
+    assert len(p.runs) == 3
+    assert p.runs[-1] == ("d",)
+
+
+@pytest.mark.asyncio
+async def test_schedule_run_debounce():
+    p = CountingPipe(inlet=MarkElementWidget(), debounce=0.02)
+    future = p.schedule_run()
+    for i in range(3):
+        await asyncio.sleep(0.01)
+        p.inlet.flow = (str(i),)
+        assert p.schedule_run() is future
+        assert not p.runs, "waits for the requests to settle"
+    await future
+    assert p.runs == [("0", "1", "2")]
+
+
+class HangingPipe(CountingPipe):
+    async def run(self):
+        self.runs = [*self.runs, self.inlet.flow]
+        if len(self.runs) == 1:
+            await asyncio.Event().wait()
+        self.outlet.value = self.inlet.value
+
+
+@pytest.mark.asyncio
+async def test_schedule_run_supersedes_stuck_run():
+    p = HangingPipe(inlet=MarkElementWidget(), timeout=0.02)
+    stuck = p.schedule_run()
+    await asyncio.sleep(0.01)
+    assert p.schedule_run() is not stuck
+    assert not stuck.done(), "queued behind the run until it times out"
+    await asyncio.sleep(0.02)
+    p.inlet.flow = ("a",)
+    future = p.schedule_run()
+    await asyncio.wait_for(future, 1)
+    assert stuck.cancelled()
+    assert p.runs[-1] == ("a",)
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_runs():
+    p = HangingPipe(inlet=MarkElementWidget())
+    stuck = p.schedule_run()
+    await asyncio.sleep(0.01)
+    queued = p.schedule_run()
+    p.close()
+    await asyncio.sleep(0)
+    assert stuck.cancelled()
+    assert queued.cancelled()
+    assert not p.scheduler.running
+
+
+@pytest.mark.asyncio
+async def test_diagram_cancels_runs():
+    old = HangingPipe()
+    diagram = Diagram(pipe=old)
+    stuck = diagram.refresh()
+    await asyncio.sleep(0.01)
+    assert old.runs, "the first run hangs"
+    diagram.pipe = HangingPipe()
+    await asyncio.sleep(0)
+    assert stuck.cancelled(), "replaced pipes stop running"
+    await asyncio.sleep(0.01)
+    refresh = diagram.refresh()
+    diagram.close()
+    await asyncio.sleep(0)
+    assert refresh.cancelled()
@@ -0,0 +1,63 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import Label, Node
+from ipyelk.elements.elements import LabelProperties, LabelShape
+from ipyelk.pipes import BrowserTextSizer, MarkElementWidget
+from ipyelk.pipes.text_sizer import TextSizeCache
+
+
+def make_labels(root: Node) -> Node:
+    """Add labels with a style, a new text and a fixed size to the nodes"""
+    root.children[0].labels.append(Label(text="x", properties={"cssClasses": "b"}))
+    root.children[1].labels.append(Label(text=f"only {len(root.children)}"))
+    shape = LabelShape(width=3, height=4)
+    root.children[2].labels.append(
+        Label(text="fixed", properties=LabelProperties(shape=shape))
+    )
+    return root
+
+
+@pytest.mark.asyncio
+async def test_text_sizer_measures_new_labels_once(make_root, fake_browser):
+    cache = TextSizeCache()
+    pipe = BrowserTextSizer(cache=cache)
+    sent = fake_browser(pipe)
+    pipe.inlet = MarkElementWidget(value=make_labels(make_root(6)))
+    await pipe.run()
+
+    (msg,) = sent
+    assert msg["action"] == "measure"
+    measured = [(el["text"], el["properties"]["cssClasses"]) for el in msg["labels"]]
+    assert sorted(measured) == [("only 6", ""), ("x", ""), ("x", "b")]
+    root = pipe.outlet.value
+    assert root is not pipe.inlet.value
+    sizes = {(label.width, label.height) for n in root.children for label in n.labels}
+    assert sizes == {(7.0, 12.0), (8.0, 12.0), (42.0, 12.0), (3.0, 4.0)}
+    assert [n.id for n in root.children] == [f"n{i}" for i in range(6)]
+    assert len(cache) == 3
+
+    # the source labels are left as they are
+    source = pipe.inlet.value
+    sizes = {(label.width, label.height) for n in source.children for label in n.labels}
+    assert sizes == {(None, None)}
+
+    # a new diagram with the same texts is sized without the browser
+    other = BrowserTextSizer(cache=cache)
+    other_sent = fake_browser(other)
+    other.inlet = MarkElementWidget(value=make_labels(make_root(6)))
+    await other.run()
+    assert not other_sent
+    assert other.outlet.value.children[5].labels[0].width == pytest.approx(7)
+    assert (cache.hits, cache.misses) == (8, 3)
+
+    # the style labels are measured with is part of the key
+    other.style = {" .elklabel": {"font-size": "20px"}}
+    await other.run()
+    assert len(other_sent) == 1
+    assert len(cache) == 6
+
+
+def test_text_sizes_are_shared():
+    assert BrowserTextSizer().cache is BrowserTextSizer().cache
@@ -0,0 +1,66 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import json
+
+import pytest
+
+from ipyelk.pipes import (
+    ElkJS,
+    MarkElementWidget,
+    Pipeline,
+    ValidationPipe,
+    VisibilityPipe,
+)
+from ipyelk.pipes import flows as F
+from ipyelk.pipes.tracing import Tracer, tracer
+
+
+@pytest.mark.asyncio
+async def test_pipeline_trace(tmp_path, make_root, fake_browser):
+    elkjs = ElkJS(binary=True)
+    fake_browser(elkjs)
+    pipeline = Pipeline(pipes=(ValidationPipe(), VisibilityPipe(), elkjs))
+    pipeline.inlet = MarkElementWidget(value=make_root(), flow=(F.New,))
+    tracer.clear()
+
+    with tracer:
+        await pipeline.run()
+    (trace,) = tracer.history
+    assert trace.name == "Pipeline"
+    names = [span.name for span in trace.children]
+    assert names == ["ValidationPipe", "VisibilityPipe", "ElkJS"]
+    assert trace.children[0].args["elements"] == 8
+    assert trace.find("ElkJS")[0].args["cached"] is False
+    (browser,) = trace.find("browser")
+    assert browser.args["bytes"] > 0
+    (columns,) = trace.find("apply columns")
+    assert columns.args["elements"] == 8
+    assert all(span.end >= span.start for span in trace.walk())
+    assert trace.duration >= sum(span.duration for span in trace.children)
+
+    events = tracer.to_chrome()["traceEvents"]
+    assert len(events) == len(list(trace.walk()))
+    assert {e["ph"] for e in events} == {"X"}
+    path = tmp_path / "trace.json"
+    tracer.save(path)
+    assert json.loads(path.read_text())["traceEvents"] == json.loads(json.dumps(events))
+
+    pipeline.inlet.flow = (F.New,)
+    await pipeline.run()
+    assert len(tracer.history) == 1, "nothing is recorded unless tracing is active"
+    tracer.clear()
+
+
+def test_tracer_history():
+    history = Tracer(history=2)
+    with history:
+        for i in range(3):
+            run = history.span(f"run {i}")
+            with run, history.span("step", "compute", elements=i) as step:
+                history.annotate(bytes=10)
+    assert [span.name for span in history.history] == ["run 1", "run 2"]
+    assert step.args == {"elements": 2, "bytes": 10}
+    assert history.current is None
+    with history.span("inactive") as span:
+        assert span is None
+    assert len(history.history) == 2
@@ -0,0 +1,69 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import random
+
+import pytest
+
+from ipyelk.elements import Node, Port, iter_elements
+from ipyelk.pipes import MarkElementWidget, VisibilityPipe
+from ipyelk.pipes import flows as F
+
+
+def canonical(root: Node):
+    """Projected nodes, ports and edges by id with their connections"""
+    result = {}
+    for el in iter_elements(root):
+        if isinstance(el, Node):
+            for edge in el.edges:
+                result[edge.id] = (
+                    el.id,
+                    edge.source.id,
+                    edge.target.id,
+                    edge.properties.cssClasses,
+                )
+        if isinstance(el, (Node, Port)):
+            parent = el.get_parent()
+            result[el.id] = (
+                type(el).__name__,
+                parent.id if parent else None,
+                el.properties.cssClasses,
+            )
+    return result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("seed", range(5))
+async def test_incremental_visibility(seed: int, random_root):
+    rng = random.Random(seed)  # noqa: S311 seeded, not secret
+    root = random_root(rng, 60)
+    pipe = VisibilityPipe()
+    pipe.inlet = MarkElementWidget(value=root, flow=(F.Layout,))
+    pipe.inlet.build_index()
+    pipe.outlet.index = pipe.inlet.index
+    await pipe.run()
+    value = pipe.outlet.value
+
+    nodes = [el for el in iter_elements(root) if isinstance(el, Node)][1:]
+    full = VisibilityPipe(incremental=False)
+    full.inlet = pipe.inlet
+    for _ in range(10):
+        for node in rng.sample(nodes, 3):
+            node.properties.hidden = not node.properties.hidden
+        pipe.inlet.flow = (F.Node.hidden,)
+        await pipe.run()
+        assert pipe.outlet.value is value, "projection should be updated in place"
+        await full.run()
+        assert canonical(value) == canonical(full.outlet.value)
+
+
+@pytest.mark.asyncio
+async def test_visibility_rebuilds_on_other_changes(random_root):
+    root = random_root(random.Random(0))  # noqa: S311 seeded, not secret
+    pipe = VisibilityPipe()
+    pipe.inlet = MarkElementWidget(value=root, flow=(F.Layout,))
+    pipe.inlet.build_index()
+    await pipe.run()
+    value = pipe.outlet.value
+    pipe.inlet.flow = (F.Layout,)
+    await pipe.run()
+    assert pipe.outlet.value is not value
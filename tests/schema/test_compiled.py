@@ -0,0 +1,73 @@
+# Copyright (c) 2024 ipyelk contributors.
+# Distributed under the terms of the Modified BSD License.
+import pytest
+
+from ipyelk.elements import Label, elk_serialization
+from ipyelk.pipes.patch import diff, flatten
+from ipyelk.schema import ElkCompiledValidator, ElkSchemaValidator
+
+INVALID = [
+    {
+        "id": "root",
+        "width": True,
+        "layoutOptions": {"a": 1},
+        "properties": {"shape": {"x": "0"}, "unknown": 1},
+        "children": [
+            {"id": "a", "labels": [{"text": 1, "labels": [{"id": 2}]}]},
+            {"ports": [{"id": "p", "x": "1"}], "extra": None},
+            "b",
+        ],
+        "edges": [
+            {
+                "id": "e",
+                "sources": ["a"],
+                "targets": "b",
+                "sections": [{"id": "s", "startPoint": {"x": 1}, "endPoint": {}}],
+            }
+        ],
+    },
+    {"id": "root", "children": {}},
+    [],
+    None,
+]
+
+
+def errors(validator, data):
+    return sorted(
+        (tuple(map(str, e.path)), e.message) for e in validator.iter_errors(data)
+    )
+
+
+@pytest.mark.parametrize("data", INVALID)
+def test_compiled_matches_jsonschema(data):
+    compiled = errors(ElkCompiledValidator, data)
+    assert compiled
+    assert compiled == errors(ElkSchemaValidator, data)
+
+
+def test_compiled_valid(make_root):
+    data = elk_serialization["to_json"](make_root(), None)
+    assert ElkCompiledValidator.is_valid(data)
+    assert ElkSchemaValidator.is_valid(data)
+
+
+def test_patch_only_checks_changed(make_root):
+    data = elk_serialization["to_json"](make_root(), None)
+    data["children"][1]["width"] = "wide"
+    old = flatten(data)
+    types = {"root": ElkCompiledValidator.root}
+    (error,) = ElkCompiledValidator.iter_flat_errors(old, list(old), types)
+    assert list(error.path) == ["n1", "width"]
+    assert types["n0_label"] == "AnyElkLabelWithProperties"
+
+    root = make_root()
+    root.children[0].x = 3
+    root.children[0].labels.append(Label(id="added", text="new"))
+    new = flatten(elk_serialization["to_json"](root, None))
+    new["added"]["text"] = 1
+    ops = diff(old, new)
+    found = ElkCompiledValidator.iter_patch_errors(new, ops, types)
+    assert [(list(e.path), e.message) for e in found] == [
+        (["added", "text"], "1 is not of type 'string'")
+    ]
+    assert types["added"] == "AnyElkLabelWithProperties"